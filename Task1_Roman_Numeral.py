@@ -1,15 +1,172 @@
+import collections
+import csv
+import functools
+import itertools
 import math
+import re
+import sys
 
+# Таблицы цифр по разрядам: индекс - значение цифры в разряде
+_THOUSANDS = ('', 'M', 'MM', 'MMM')
+_HUNDREDS = ('', 'C', 'CC', 'CCC', 'CD', 'D', 'DC', 'DCC', 'DCCC', 'CM')
+_TENS = ('', 'X', 'XX', 'XXX', 'XL', 'L', 'LX', 'LXX', 'LXXX', 'XC')
+_ONES = ('', 'I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX')
 
+_ROMAN_VALUES = {'I': 1, 'V': 5, 'X': 10, 'L': 50, 'C': 100, 'D': 500, 'M': 1000}
+
+# Двусторонняя таблица канонических римских чисел 1..3999 (индекс 0 - пустая строка)
+_INT_TO_ROMAN = tuple(th + h + t + o for th in _THOUSANDS for h in _HUNDREDS for t in _TENS for o in _ONES)
+_ROMAN_TO_INT = {roman: number for number, roman in enumerate(_INT_TO_ROMAN) if number}
+
+# Каноническая запись: тысячи, затем по одной цифре сотен, десятков и единиц
+_CANONICAL_RE = re.compile(r'(M*)(CM|CD|D?C{0,3})(XC|XL|L?X{0,3})(IX|IV|V?I{0,3})')
+_HUNDRED_VALUES = {digit: value * 100 for value, digit in enumerate(_HUNDREDS)}
+_TEN_VALUES = {digit: value * 10 for value, digit in enumerate(_TENS)}
+_ONE_VALUES = {digit: value for value, digit in enumerate(_ONES)}
+
+# Надчеркивание (винкулум) умножает цифру на 1000; по умолчанию - комбинируемая черта сверху
+VINCULUM = '\u0305'
+
+# Размер LRU-кэша для строк, которых нет в таблице
+CACHE_SIZE = 4096
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _parse_roman(roman_num, strict, vinculum=VINCULUM):
+    """Перевод римского числа вне таблицы; None, если строка не является римским числом.
+
+    В строгом режиме принимается только каноническая запись, которую проверяет
+    и разбирает за один проход скомпилированное регулярное выражение. В нестрогом
+    режиме регистр и пробелы по краям игнорируются, а цифры складываются
+    по правилу вычитания без проверки порядка (IIII = 4, IM = 999).
+    """
+    if vinculum and vinculum in roman_num:
+        return _parse_extended(roman_num, strict, vinculum)
+
+    if strict:
+        match = _CANONICAL_RE.fullmatch(roman_num)
+        if match is None:
+            return None
+        thousands, hundreds, tens, ones = match.groups()
+        return len(thousands) * 1000 + _HUNDRED_VALUES[hundreds] + _TEN_VALUES[tens] + _ONE_VALUES[ones]
+
+    int_value = 0
+    prev_value = 0
+    for char in reversed(roman_num.strip().upper()):
+        value = _ROMAN_VALUES.get(char)
+        if value is None:
+            return None
+        if value < prev_value:
+            int_value -= value
+        else:
+            int_value += value
+        prev_value = value
+    return int_value
+
+
+def _parse_extended(roman_num, strict, vinculum):
+    """Разбор записи с винкулумом: k черт после цифры умножают ее на 1000 ** k"""
+    segments = []
+    step = len(vinculum)
+    i = 0
+    while i < len(roman_num):
+        char = roman_num[i]
+        i += 1
+        level = 0
+        while roman_num.startswith(vinculum, i):
+            level += 1
+            i += step
+        if segments and segments[-1][0] == level:
+            segments[-1][1].append(char)
+        else:
+            segments.append((level, [char]))
+
+    int_value = 0
+    for level, chars in segments:
+        part = _roman_to_int(''.join(chars), strict, None)
+        if part is None:
+            return None
+        int_value += part * 1000 ** level
+    # Каноническая запись единственна, поэтому достаточно сравнить с результатом перевода обратно
+    if strict and _to_extended_roman(int_value, vinculum) != roman_num:
+        return None
+    return int_value
+
+
+def _to_extended_roman(number, vinculum):
+    """Перевод в запись с винкулумом: длина результата растет логарифмически"""
+    parts = []
+    level = 0
+    while number >= 4000:
+        number, group = divmod(number, 1000)
+        parts.append(_overline(_INT_TO_ROMAN[group], vinculum * level))
+        level += 1
+    parts.append(_overline(_INT_TO_ROMAN[number], vinculum * level))
+    return ''.join(reversed(parts))
+
+
+def _overline(roman_num, marks):
+    if not marks or not roman_num:
+        return roman_num
+    return marks.join(roman_num) + marks
+
+
+def _roman_to_int(roman_num, strict=True, vinculum=VINCULUM):
+    """Перевод через таблицу, а для остальных строк - через LRU-кэш"""
+    int_value = _ROMAN_TO_INT.get(roman_num)
+    if int_value is None:
+        int_value = _parse_roman(roman_num, strict, vinculum)
+    return int_value
+
+
+@functools.total_ordering
 class RomanNumeral:
-    """Класс представляет Римское число"""
+    """Класс представляет Римское число.
+
+    Значение хранится как целое число, а строковая запись строится лениво,
+    поэтому арифметика над римскими числами не проходит через строки.
+    """
+
+    __slots__ = ('_roman_num', 'strict', 'roman_num_bool', 'int_value')
+
+    def __init__(self, roman_num, strict=True, vinculum=VINCULUM):
+        """Метод инициализации.
 
-    def __init__(self, roman_num):
-        """Метод инициализации"""
-        self.roman_num = roman_num
-        self.roman_num_bool = None
-        if self.is_valid():
-            self.int_value = self.to_int()
+        strict=False включает нестрогий разбор (IIII, IM, xiv).
+        vinculum - знак, которым в расширенной записи отмечены цифры, умноженные на 1000.
+        """
+        self.strict = strict
+        if isinstance(roman_num, int):
+            self._roman_num = None
+            self.roman_num_bool = True
+            self.int_value = roman_num
+            return
+        self._roman_num = roman_num
+        # Проверка и перевод выполняются за один разбор строки
+        int_value = _roman_to_int(roman_num, strict, vinculum)
+        self.roman_num_bool = int_value is not None
+        if self.roman_num_bool:
+            self.int_value = int_value
+
+    @classmethod
+    def _from_int(cls, int_value):
+        """Создание римского числа из целого без разбора строки"""
+        roman = cls.__new__(cls)
+        roman._roman_num = None
+        roman.strict = True
+        roman.roman_num_bool = True
+        roman.int_value = int_value
+        return roman
+
+    @property
+    def roman_num(self):
+        """Строковая запись числа; для чисел, полученных из int, строится при первом обращении"""
+        if self._roman_num is None:
+            if self.int_value < 0:
+                self._roman_num = '-' + RomanNumeral.to_roman(-self.int_value)
+            else:
+                self._roman_num = RomanNumeral.to_roman(self.int_value)
+        return self._roman_num
 
     def __repr__(self):
         return str(self.roman_num)
@@ -17,56 +174,66 @@ class RomanNumeral:
     def __str__(self):
         return str(self.roman_num)
 
+    def __int__(self):
+        if not self.roman_num_bool:
+            raise ValueError("Roman numeral must be valid for conversion")
+        return self.int_value
+
+    def __eq__(self, other):
+        if not isinstance(other, RomanNumeral):
+            return NotImplemented
+        if self.roman_num_bool and other.roman_num_bool:
+            return self.int_value == other.int_value
+        return self.roman_num_bool == other.roman_num_bool and self.roman_num == other.roman_num
+
+    def __lt__(self, other):
+        if not isinstance(other, RomanNumeral):
+            return NotImplemented
+        if not self.roman_num_bool or not other.roman_num_bool:
+            raise ValueError("Both Roman numerals must be valid for comparison")
+        return self.int_value < other.int_value
+
+    def __hash__(self):
+        if self.roman_num_bool:
+            return hash(self.int_value)
+        return hash(self._roman_num)
+
     def is_valid(self):
-        if isinstance(self.roman_num, int):
-            return True
-        roman_numerals = {
-            'I': 1,
-            'V': 5,
-            'X': 10,
-            'L': 50,
-            'C': 100,
-            'D': 500,
-            'M': 1000
-        }
-        prev_value = 0
-        sum_num = 0
-
-        for char in self.roman_num:
-            if char not in roman_numerals:
-                self.roman_num_bool = False
-                return False
-
-            current_value = roman_numerals[char]
-
-            if current_value > prev_value:
-                sum_num += current_value - 2 * prev_value
-            else:
-                sum_num += current_value
+        """Проверка римского числа; в строгом режиме - на каноническую запись.
 
-            prev_value = current_value
-        self.roman_num_bool = True
-        return True
+        Проверка выполняется один раз в конструкторе вместе с переводом.
+        """
+        return self.roman_num_bool
 
     def to_int(self):
-        """Перевод римского числа в арабское"""
-        roman_dict = {'I': 1, 'V': 5, 'X': 10, 'L': 50, 'C': 100, 'D': 500, 'M': 1000}
-        int_value = 0
-        prev_value = 0
-
-        for char in reversed(self.roman_num):
-            value = roman_dict[char]
-            if value < prev_value:
-                int_value -= value
-            else:
-                int_value += value
-            prev_value = value
+        """Перевод римского числа в арабское. Для невалидного числа возвращает False"""
+        if self.roman_num_bool:
+            return self.int_value
+        return False
+
+    @staticmethod
+    def cache_info():
+        """Статистика LRU-кэша (hits, misses, maxsize, currsize) для строк вне таблицы"""
+        return _parse_roman.cache_info()
 
-        return int_value
+    @staticmethod
+    def cache_clear():
+        """Очистка LRU-кэша и его счетчиков"""
+        _parse_roman.cache_clear()
 
     @staticmethod
-    def to_roman(number):
-        """Перевод арабского числа в римское"""
+    def to_roman(number, extended=False, vinculum=VINCULUM):
+        """Перевод арабского числа в римское.
+
+        extended=True включает запись с винкулумом для чисел от 4000:
+        тысячи записываются надчеркнутыми цифрами (4000 = IV с чертой), а не N буквами M.
+        """
+        if 0 <= number < 4000:
+            return _INT_TO_ROMAN[number]
+        if extended and number > 0:
+            if not vinculum:
+                raise ValueError("Vinculum mark must be a non-empty string")
+            return _to_extended_roman(number, vinculum)
         total = ''
         int_ = [1000, 900, 500, 400, 100, 90, 50, 40, 10, 9, 5, 4, 1]
         rom_ = ['M', 'CM', 'D', 'CD', 'C', 'XC', 'L', 'XL', 'X', 'IX', 'V', 'IV', 'I']
@@ -75,69 +242,304 @@ class RomanNumeral:
             number %= int_val
         return total
 
+    @staticmethod
+    def to_roman_many(numbers, extended=False, vinculum=VINCULUM):
+        """Пакетный перевод арабских чисел в римские.
+
+        Принимает любой iterable или массив NumPy. Для массива возвращает массив
+        той же формы, для остальных входных данных - список строк. extended - как в to_roman.
+        """
+        values, np = _unwrap_array(numbers)
+        if not isinstance(values, (list, tuple)):
+            values = list(values)
+        result = None
+        try:
+            # Все числа в 0..3999 - только индексация таблицы, без ветвлений и int() на элемент
+            # (min отсекает отрицательные индексы). Числа от 4000 (IndexError) и не int (TypeError)
+            # переводятся поэлементно
+            if min(values, default=0) >= 0:
+                table = _INT_TO_ROMAN
+                result = [table[number] for number in values]
+        except (IndexError, TypeError):
+            pass
+        if result is None:
+            result = _to_roman_each(values, extended, vinculum)
+        if np is not None:
+            return np.array(result).reshape(numbers.shape)
+        return result
+
+    @staticmethod
+    def to_int_many(roman_nums, strict=True, vinculum=VINCULUM):
+        """Пакетный перевод римских чисел в арабские.
+
+        Принимает любой iterable строк или массив NumPy. Для массива возвращает
+        массив целых чисел той же формы, для остальных входных данных - список.
+        Невалидное римское число приводит к ValueError, strict - как в конструкторе.
+        """
+        values, np = _unwrap_array(roman_nums)
+        table = _ROMAN_TO_INT
+        result = []
+        append = result.append
+        for roman_num in values:
+            int_value = table.get(roman_num)
+            if int_value is None:
+                int_value = _parse_roman(roman_num, strict, vinculum)
+                if int_value is None:
+                    raise ValueError(f"Invalid Roman numeral: {roman_num!r}")
+            append(int_value)
+        if np is not None:
+            return np.array(result, dtype=np.int64).reshape(roman_nums.shape)
+        return result
+
     def __add__(self, other):
         """Операция сложения"""
         if not self.roman_num_bool or not other.roman_num_bool:
             raise ValueError("Both Roman numerals must be valid for addition")
 
-        result_int = self.int_value + other.int_value
-        result_roman = RomanNumeral.to_roman(result_int)
-        return RomanNumeral(result_roman)
+        return RomanNumeral._from_int(self.int_value + other.int_value)
 
     def __sub__(self, other):
         """Операция вычитания"""
         if not self.roman_num_bool or not other.roman_num_bool:
             raise ValueError("Both Roman numerals must be valid for addition")
 
-        result_int = self.int_value - other.int_value
-        result_roman = RomanNumeral.to_roman(result_int)
-        return RomanNumeral(result_roman)
+        return RomanNumeral._from_int(self.int_value - other.int_value)
 
     def __mul__(self, other):
         """Операция умножения"""
         if not self.roman_num_bool or not other.roman_num_bool:
             raise ValueError("Both Roman numerals must be valid for addition")
 
-        result_int = self.int_value * other.int_value
-        result_roman = RomanNumeral.to_roman(result_int)
-        return RomanNumeral(result_roman)
+        return RomanNumeral._from_int(self.int_value * other.int_value)
 
     def __truediv__(self, other):
         """Операция деления"""
         if not self.roman_num_bool or not other.roman_num_bool:
             raise ValueError("Both Roman numerals must be valid for division")
 
-        result_int = self.int_value // other.int_value
-        result_roman = RomanNumeral.to_roman(result_int)
-        return RomanNumeral(result_roman)
+        return RomanNumeral._from_int(self.int_value // other.int_value)
 
     def __mod__(self, other):
         """Операция остатка от деления"""
         if not self.roman_num_bool or not other.roman_num_bool:
             raise ValueError("Both Roman numerals must be valid for division")
 
-        result_int = self.int_value % other.int_value
-        result_roman = RomanNumeral.to_roman(result_int)
-        return RomanNumeral(result_roman)
-
-
-# Создаем римское число ХХХ = 30
-roman1 = RomanNumeral('XXX')
-# Проверка на валидность
-print(roman1.is_valid())  # True
-# Перевод римского числа в арабское 
-print(roman1.to_int())  #30
-print(roman1)
-
-a = 12
-# Перевод арабского числа в римское
-print(RomanNumeral.to_roman(a))
-
-# Складывание, вычитание, умножение, деление, нахождение остатка от дедения двух римских чисел
-roman2 = RomanNumeral('XXII')
-print(roman2)
-print(roman1 + roman2)
-print(roman1 - roman2)
-print(roman1 * roman2)
-print(roman1 / roman2)
-print(roman1 % roman2)
+        return RomanNumeral._from_int(self.int_value % other.int_value)
+
+
+def _to_roman_each(values, extended, vinculum):
+    """Поэлементный перевод для to_roman_many, когда не все числа есть в таблице"""
+    table, hundreds, tens, ones = _INT_TO_ROMAN, _HUNDREDS, _TENS, _ONES
+    result = []
+    append = result.append
+    for number in values:
+        number = int(number)
+        if 0 <= number < 4000:
+            append(table[number])
+        elif extended:
+            append(RomanNumeral.to_roman(number, True, vinculum))
+        elif number >= 4000:
+            append('M' * (number // 1000) + hundreds[number // 100 % 10]
+                   + tens[number // 10 % 10] + ones[number % 10])
+        else:
+            append(RomanNumeral.to_roman(number))
+    return result
+
+
+def _unwrap_array(values):
+    """Возвращает элементы для перебора и модуль numpy, если на входе массив NumPy"""
+    np = sys.modules.get('numpy')
+    if np is not None and isinstance(values, np.ndarray):
+        return values.ravel().tolist(), np
+    return values, None
+
+
+def _convert_value(value, to_int, strict, extended):
+    """Перевод одного значения; None, если значение не удалось перевести"""
+    value = value.strip()
+    if to_int:
+        int_value = _roman_to_int(value, strict)
+        return None if int_value is None else str(int_value)
+    try:
+        number = int(value)
+    except ValueError:
+        return None
+    return RomanNumeral.to_roman(number, extended) if number >= 0 else None
+
+
+def _convert_chunk(chunk, to_int, column, strict, extended, on_error):
+    """Перевод пачки строк (или строк CSV, если задан column); возвращает результат и число ошибок"""
+    converted = []
+    errors = 0
+    for row in chunk:
+        if column is not None and column >= len(row):
+            # Пустая или слишком короткая строка CSV: переводить нечего, строка остается как есть
+            if on_error == 'fail':
+                raise ValueError(f"Row {row!r} has no column {column}")
+            errors += 1
+            converted.append(row)
+            continue
+        value = row if column is None else row[column]
+        result = _convert_value(value, to_int, strict, extended)
+        if result is None:
+            if on_error == 'fail':
+                raise ValueError(f"Cannot convert value {value!r}")
+            errors += 1
+            result = value if on_error == 'keep' else ''
+        if column is None:
+            converted.append(result)
+        else:
+            row[column] = result
+            converted.append(row)
+    return converted, errors
+
+
+def convert_stream(infile, outfile, to_int=True, column=None, header=False, delimiter=',',
+                   strict=True, extended=False, on_error='fail', chunk_size=10000, jobs=1):
+    """Потоковый перевод файла пачками по chunk_size строк.
+
+    Без column каждая строка входа - одно значение, иначе вход читается как CSV
+    и переводится только указанный столбец (индекс или имя из заголовка).
+    В памяти одновременно находится не больше 2 * jobs пачек.
+    extended - запись с винкулумом при переводе в римские числа.
+    on_error: 'fail' - исключение, 'keep' - оставить значение, 'blank' - пустая строка.
+    Возвращает количество обработанных строк и количество ошибок.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    if column is None:
+        reader = (line.rstrip('\r\n') for line in infile)
+        if header:
+            first = next(reader, None)
+            if first is not None:
+                outfile.write(first + '\n')
+
+        def write(rows):
+            if rows:
+                outfile.write('\n'.join(rows) + '\n')
+    else:
+        reader = csv.reader(infile, delimiter=delimiter)
+        writer = csv.writer(outfile, delimiter=delimiter, lineterminator='\n')
+        names = next(reader, None) if header else None
+        if names is not None:
+            writer.writerow(names)
+        if not str(column).isdigit():
+            if names is None:
+                raise ValueError(f"Column {column!r} can only be selected by name with a header")
+            column = names.index(column)
+        column = int(column)
+        write = writer.writerows
+
+    chunks = iter(lambda: list(itertools.islice(reader, chunk_size)), [])
+    options = (to_int, column, strict, extended, on_error)
+    total = 0
+    errors = 0
+    if jobs > 1:
+        import multiprocessing
+
+        with multiprocessing.Pool(jobs) as pool:
+            pending = collections.deque()
+            for chunk in chunks:
+                pending.append(pool.apply_async(_convert_chunk, (chunk, *options)))
+                # Ограничиваем число пачек в работе, чтобы память не росла с размером входа
+                while len(pending) >= 2 * jobs or (pending and pending[0].ready()):
+                    rows, chunk_errors = pending.popleft().get()
+                    write(rows)
+                    total += len(rows)
+                    errors += chunk_errors
+            while pending:
+                rows, chunk_errors = pending.popleft().get()
+                write(rows)
+                total += len(rows)
+                errors += chunk_errors
+    else:
+        for chunk in chunks:
+            rows, chunk_errors = _convert_chunk(chunk, *options)
+            write(rows)
+            total += len(rows)
+            errors += chunk_errors
+    return total, errors
+
+
+def demo():
+    """Пример использования класса RomanNumeral"""
+    # Создаем римское число ХХХ = 30
+    roman1 = RomanNumeral('XXX')
+    # Проверка на валидность
+    print(roman1.is_valid())  # True
+    # Перевод римского числа в арабское
+    print(roman1.to_int())  #30
+    print(roman1)
+
+    a = 12
+    # Перевод арабского числа в римское
+    print(RomanNumeral.to_roman(a))
+
+    # Складывание, вычитание, умножение, деление, нахождение остатка от дедения двух римских чисел
+    roman2 = RomanNumeral('XXII')
+    print(roman2)
+    print(roman1 + roman2)
+    print(roman1 - roman2)
+    print(roman1 * roman2)
+    print(roman1 / roman2)
+    print(roman1 % roman2)
+
+
+def _positive_int(text):
+    import argparse
+
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: {value}")
+    return value
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Римские числа")
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.add_parser('demo', help="пример использования (по умолчанию)")
+
+    convert = subparsers.add_parser('convert', help="потоковый перевод файла")
+    direction = convert.add_mutually_exclusive_group(required=True)
+    direction.add_argument('--to-int', action='store_true', help="римские числа в арабские")
+    direction.add_argument('--to-roman', action='store_true', help="арабские числа в римские")
+    convert.add_argument('-i', '--input', default='-', help="входной файл ('-' - stdin)")
+    convert.add_argument('-o', '--output', default='-', help="выходной файл ('-' - stdout)")
+    convert.add_argument('-c', '--column', help="столбец CSV (индекс или имя); без него - одно значение на строку")
+    convert.add_argument('--header', action='store_true', help="первая строка - заголовок")
+    convert.add_argument('-d', '--delimiter', default=',', help="разделитель CSV")
+    convert.add_argument('--lenient', action='store_true', help="нестрогий разбор римских чисел")
+    convert.add_argument('--extended', action='store_true', help="запись с винкулумом для чисел от 4000")
+    convert.add_argument('--on-error', choices=('fail', 'keep', 'blank'), default='fail')
+    convert.add_argument('--chunk-size', type=_positive_int, default=10000)
+    convert.add_argument('-j', '--jobs', type=int, default=1, help="число процессов")
+    args = parser.parse_args(argv)
+
+    if args.command != 'convert':
+        demo()
+        return 0
+
+    infile = sys.stdin if args.input == '-' else open(args.input, newline='', encoding='utf-8')
+    outfile = sys.stdout if args.output == '-' else open(args.output, 'w', newline='', encoding='utf-8')
+    try:
+        total, errors = convert_stream(infile, outfile, to_int=args.to_int, column=args.column,
+                                       header=args.header, delimiter=args.delimiter,
+                                       strict=not args.lenient, extended=args.extended,
+                                       on_error=args.on_error,
+                                       chunk_size=args.chunk_size, jobs=args.jobs)
+    except ValueError as err:
+        print(f"Error: {err}", file=sys.stderr)
+        return 1
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+    print(f"Converted {total} rows, errors: {errors}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,61 @@
+import argparse
+import random
+import timeit
+
+from Task1_Roman_Numeral import RomanNumeral
+
+
+def bench_to_roman(numbers, repeat):
+    """Сравнение поэлементного и пакетного перевода в римские числа"""
+    scalar = min(timeit.repeat(lambda: [RomanNumeral.to_roman(n) for n in numbers], number=1, repeat=repeat))
+    batch = min(timeit.repeat(lambda: RomanNumeral.to_roman_many(numbers), number=1, repeat=repeat))
+    return scalar, batch
+
+
+def bench_to_int(roman_nums, repeat):
+    """Сравнение поэлементного и пакетного перевода в арабские числа"""
+    scalar = min(timeit.repeat(lambda: [RomanNumeral(r).to_int() for r in roman_nums], number=1, repeat=repeat))
+    batch = min(timeit.repeat(lambda: RomanNumeral.to_int_many(roman_nums), number=1, repeat=repeat))
+    return scalar, batch
+
+
+def bench_extended(max_exponent, repeat):
+    """Время перевода 10 ** k в римскую запись: обычную (N букв M) и с винкулумом"""
+    rows = []
+    for exponent in range(3, max_exponent + 1):
+        number = 10 ** exponent + 7
+        # Обычная запись 10 ** 12 заняла бы гигабайт, поэтому ее меряем только до 10 ** 8
+        plain = None
+        if exponent <= 8:
+            plain = min(timeit.repeat(lambda: RomanNumeral.to_roman(number), number=100, repeat=repeat)) / 100
+        extended = min(timeit.repeat(lambda: RomanNumeral.to_roman(number, extended=True),
+                                     number=100, repeat=repeat)) / 100
+        rows.append((exponent, plain, extended, len(RomanNumeral.to_roman(number, extended=True))))
+    return rows
+
+
+def report(name, scalar, batch, count):
+    print(f"{name}: scalar {scalar * 1e9 / count:.0f} ns/item, "
+          f"batch {batch * 1e9 / count:.0f} ns/item, speedup x{scalar / batch:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки перевода римских чисел")
+    parser.add_argument('-n', '--count', type=int, default=100_000)
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    numbers = [rng.randint(1, 3999) for _ in range(args.count)]
+    roman_nums = RomanNumeral.to_roman_many(numbers)
+
+    report("to_roman", *bench_to_roman(numbers, args.repeat), args.count)
+    report("to_int", *bench_to_int(roman_nums, args.repeat), args.count)
+
+    for exponent, plain, extended, length in bench_extended(12, args.repeat):
+        plain_text = f"{plain * 1e6:.1f} us" if plain is not None else "-"
+        print(f"10**{exponent}: plain {plain_text}, extended {extended * 1e6:.1f} us ({length} chars)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
+import io
 import unittest
-from Task1_Roman_Numeral import RomanNumeral
+from Task1_Roman_Numeral import RomanNumeral, convert_stream
 
 
 class TestRomanNumeral(unittest.TestCase):
@@ -64,5 +65,126 @@ class TestRomanNumeral(unittest.TestCase):
         with self.assertRaises(ValueError):
             result = roman1 % roman2
 
+    def test_to_roman_many(self):
+        numbers = [1, 4, 9, 14, 40, 90, 400, 1994, 3999]
+        expected = [RomanNumeral.to_roman(n) for n in numbers]
+        self.assertEqual(RomanNumeral.to_roman_many(numbers), expected)
+        self.assertEqual(RomanNumeral.to_roman_many(iter([4000, 5021])), ["MMMM", "MMMMMXXI"])
+        # Числа вне таблицы и не int переводятся так же, как поэлементно
+        self.assertEqual(RomanNumeral.to_roman_many([3999, 4000]), ["MMMCMXCIX", "MMMM"])
+        self.assertEqual(RomanNumeral.to_roman_many([5, 5.0, True, "12"]), ["V", "V", "I", "XII"])
+        self.assertEqual(RomanNumeral.to_roman_many([10, -1]), ["X", RomanNumeral.to_roman(-1)])
+        self.assertEqual(RomanNumeral.to_roman_many([]), [])
+
+    def test_to_int_many(self):
+        self.assertEqual(RomanNumeral.to_int_many(["XXX", "XIV", "MCMXCIV", "XXX"]), [30, 14, 1994, 30])
+        with self.assertRaises(ValueError):
+            RomanNumeral.to_int_many(["X", "56"])
+
+    def test_many_numpy(self):
+        try:
+            import numpy as np
+        except ImportError:
+            self.skipTest("numpy is not installed")
+        result = RomanNumeral.to_roman_many(np.arange(1, 4000))
+        self.assertIsInstance(result, np.ndarray)
+        self.assertTrue((RomanNumeral.to_int_many(result) == np.arange(1, 4000)).all())
+        # Форма массива сохраняется
+        matrix = np.array([[1, 2, 3], [4000, 5, 6]])
+        roman_matrix = RomanNumeral.to_roman_many(matrix)
+        self.assertEqual(roman_matrix.shape, (2, 3))
+        self.assertEqual(roman_matrix[1, 0], "MMMM")
+        self.assertTrue((RomanNumeral.to_int_many(roman_matrix) == matrix).all())
+
+    def test_lookup_table(self):
+        for number in (1, 4, 9, 49, 444, 1994, 3999):
+            roman = RomanNumeral.to_roman(number)
+            self.assertEqual(RomanNumeral(roman).to_int(), number)
+        self.assertIs(RomanNumeral("56").to_int(), False)
+
+    def test_cache_counters(self):
+        RomanNumeral.cache_clear()
+        RomanNumeral("MMMMX")
+        RomanNumeral("MMMMX")
+        RomanNumeral("XXX")  # из таблицы, кэш не затрагивается
+        info = RomanNumeral.cache_info()
+        self.assertEqual(info.misses, 1)
+        self.assertGreaterEqual(info.hits, 1)
+        self.assertEqual(info.currsize, 1)
+
+    def test_strict_rejects_non_canonical(self):
+        for roman_num in ("IIII", "IM", "VV", "IL", "XCX", "MCMC"):
+            roman = RomanNumeral(roman_num)
+            self.assertFalse(roman.is_valid(), roman_num)
+            self.assertIs(roman.to_int(), False)
+        self.assertEqual(RomanNumeral("MMMMCMXCIX").to_int(), 4999)
+
+    def test_lenient_parsing(self):
+        self.assertEqual(RomanNumeral("IIII", strict=False).to_int(), 4)
+        self.assertEqual(RomanNumeral("IM", strict=False).to_int(), 999)
+        self.assertEqual(RomanNumeral(" xiv ", strict=False).to_int(), 14)
+        self.assertFalse(RomanNumeral("56", strict=False).is_valid())
+        self.assertEqual(RomanNumeral.to_int_many(["IIII", "XIV"], strict=False), [4, 14])
+
+    def test_arithmetic_chain(self):
+        result = RomanNumeral("X") + RomanNumeral("V") + RomanNumeral("I") - RomanNumeral("II")
+        self.assertEqual(result.int_value, 14)
+        self.assertEqual(str(result), "XIV")
+        self.assertEqual(str(RomanNumeral("V") - RomanNumeral("VIII")), "-III")
+
+    def test_comparison_and_hash(self):
+        self.assertEqual(RomanNumeral("XIV"), RomanNumeral(14))
+        self.assertLess(RomanNumeral("IX"), RomanNumeral("X"))
+        self.assertGreaterEqual(RomanNumeral("X"), RomanNumeral("IX"))
+        counts = {RomanNumeral("X"): 1}
+        counts[RomanNumeral("V") + RomanNumeral("V")] += 1
+        self.assertEqual(counts, {RomanNumeral("X"): 2})
+        with self.assertRaises(ValueError):
+            RomanNumeral("X") < RomanNumeral("56")
+
+    def test_slots(self):
+        roman = RomanNumeral("X")
+        self.assertFalse(hasattr(roman, "__dict__"))
+
+    def test_convert_stream_lines(self):
+        output = io.StringIO()
+        total, errors = convert_stream(io.StringIO("XIV\nMMXXIV\nIV\n"), output, to_int=True, chunk_size=2)
+        self.assertEqual((total, errors), (3, 0))
+        self.assertEqual(output.getvalue(), "14\n2024\n4\n")
+
+    def test_convert_stream_csv_column(self):
+        source = io.StringIO("id,number\n1,14\n2,abc\n3,2024\n")
+        output = io.StringIO()
+        total, errors = convert_stream(source, output, to_int=False, column="number", header=True,
+                                       on_error="blank")
+        self.assertEqual((total, errors), (3, 1))
+        self.assertEqual(output.getvalue(), "id,number\n1,XIV\n2,\n3,MMXXIV\n")
+        with self.assertRaises(ValueError):
+            convert_stream(io.StringIO("1,abc\n"), io.StringIO(), to_int=False, column=1)
+
+    def test_convert_stream_missing_column(self):
+        output = io.StringIO()
+        total, errors = convert_stream(io.StringIO("1,14\n\n2\n3,4\n"), output, to_int=False, column=1,
+                                       on_error="keep")
+        self.assertEqual((total, errors), (4, 2))
+        self.assertEqual(output.getvalue(), '1,XIV\n\n2\n3,IV\n')
+        with self.assertRaises(ValueError):
+            convert_stream(io.StringIO("1,14\n\n"), io.StringIO(), to_int=False, column=1)
+        with self.assertRaises(ValueError):
+            convert_stream(io.StringIO("XIV\n"), io.StringIO(), chunk_size=0)
+
+    def test_extended_notation(self):
+        self.assertEqual(RomanNumeral.to_roman(3999, extended=True), "MMMCMXCIX")
+        self.assertEqual(RomanNumeral.to_roman(4000, extended=True), "I\u0305V\u0305")
+        self.assertEqual(RomanNumeral.to_roman(10 ** 6, extended=True, vinculum="_"), "M_")
+        for number in (4000, 12345, 3999999, 10 ** 9 + 1, 10 ** 12):
+            roman = RomanNumeral.to_roman(number, extended=True)
+            self.assertLess(len(roman), 80)
+            self.assertEqual(RomanNumeral(roman).to_int(), number)
+            custom = RomanNumeral.to_roman(number, extended=True, vinculum="_")
+            self.assertEqual(RomanNumeral(custom, vinculum="_").to_int(), number)
+        self.assertFalse(RomanNumeral("I\u0305I\u0305I\u0305I\u0305").is_valid())
+        self.assertEqual(RomanNumeral("I\u0305I\u0305I\u0305I\u0305", strict=False).to_int(), 4000)
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,36 +1,558 @@
-import json
+import bisect
+import contextlib
+import functools
+import itertools
 import os
-from datetime import datetime
+import sys
+from array import array
+from collections import Counter
+from datetime import date, timedelta
+
+from Task2_auth import PASSWORD_ITERATIONS, hash_password, needs_rehash, verify_password
+from Task2_storage import (TaskJournal, iter_json_users, read_jsonl_tasks, read_task_rows, scan_jsonl, write_json,
+                           write_jsonl, write_task_rows)
+
+# С какого числа незагруженных задач generate_global_report считает в пуле процессов. Последовательно отчет
+# идет около 3 мкс на задачу, запуск пула и обмен с ним - от 5-10 мс (fork) до десятых долей секунды (spawn);
+# на 50 000 задач (около 150 мс) пул из двух процессов окупает запуск. Замер - bench_global_report
+GLOBAL_REPORT_POOL_MIN_TASKS = 50_000
 
 
 class User:
-    def __init__(self, username, password):
+    # Атрибуты, которые создаются при загрузке задач
+    _TASK_ATTRIBUTES = ('_tasks', '_status_counts', '_priority_counts', '_deadline_index', '_pending_deadlines',
+                        '_overdue_day', '_overdue_count', '_children', '_next_task_id')
+
+    def __init__(self, username, password, loader=None):
         self.username = username
         self.password = password
-        self.tasks = []
+        if loader is None:
+            self._clear_tasks()
+        else:
+            # Ленивая загрузка: loader() вызывается при первом обращении к задачам
+            self._loader = loader
 
     def __str__(self):
         return f'User {self.username}'
 
+    def __getattr__(self, name):
+        # Вызывается, только если атрибута нет, то есть задачи еще не загружены
+        if name not in type(self)._TASK_ATTRIBUTES or '_loader' not in self.__dict__:
+            raise AttributeError(f"'User' object has no attribute '{name}'")
+        self.load_tasks()
+        return getattr(self, name)
+
+    @property
+    def tasks_loaded(self):
+        return '_loader' not in self.__dict__
+
+    def load_tasks(self):
+        loader = self.__dict__.pop('_loader', None)
+        if loader is not None:
+            self._clear_tasks()
+            for task in loader():
+                self.add_task(task)
+
+    def _clear_tasks(self):
+        # Задачи по task_id; словарь сохраняет порядок добавления
+        self._tasks = {}
+        # Вторичные индексы: счетчики по статусу и приоритету и отсортированный список (срок, task_id).
+        # Индексируемые поля нужно менять через методы User, чтобы индексы не устаревали
+        self._status_counts = Counter()
+        self._priority_counts = Counter()
+        self._deadline_index = []
+        # Сроки из add_tasks, еще не слитые с индексом: сливаются одной сортировкой при первом чтении индекса
+        self._pending_deadlines = []
+        # Число просроченных задач на день _overdue_day - начало индекса сроков;
+        # меняется вместе с индексом и досчитывается вперед по индексу при смене дня
+        self._overdue_day = None
+        self._overdue_count = 0
+        self._clear_children()
+
+    def _clear_children(self):
+        # Подзадачи по id родителя; вложенный словарь - упорядоченное множество id с удалением за O(1).
+        # Запись о детях удаленной задачи остается, чтобы при повторном добавлении связь восстановилась
+        self._children = {}
+        # Следующий свободный id: больше любого добавленного, в том числе уже удаленного
+        self._next_task_id = 1
+
+    @property
+    def tasks(self):
+        """Кортеж задач в порядке добавления. Добавлять и удалять задачи нужно через add_task/remove_task:
+        изменение копии не попало бы в индексы, поэтому возвращается неизменяемый кортеж
+        """
+        return tuple(self._tasks.values())
+
+    @tasks.setter
+    def tasks(self, tasks):
+        self._clear_tasks()
+        for task in tasks:
+            self.add_task(task)
+
+    def add_task(self, task):
+        if task.task_id in self._tasks:
+            return False
+        self._tasks[task.task_id] = task
+        self._status_counts[task.status] += 1
+        self._priority_counts[task.priority] += 1
+        self._index_deadline(task.deadline_date, task.task_id)
+        self._index_parent(task)
+        self._index_task_id(task.task_id)
+        return True
+
+    def add_tasks(self, tasks):
+        """Добавление пачки задач: счетчики и индекс сроков обновляются один раз на пачку.
+        Задачи с уже занятыми id пропускаются; возвращает список добавленных задач.
+        """
+        added = []
+        for task in tasks:
+            if task.task_id not in self._tasks:
+                self._tasks[task.task_id] = task
+                added.append(task)
+        self._status_counts.update(task.status for task in added)
+        self._priority_counts.update(task.priority for task in added)
+        self._pending_deadlines.extend((task.deadline_date, task.task_id)
+                                       for task in added if task.deadline_date is not None)
+        for task in added:
+            self._index_parent(task)
+            self._index_task_id(task.task_id)
+        return added
+
+    def allocate_task_ids(self, count=1, above=None):
+        """Диапазон из count новых id (больше above, если задан);
+        выданные id не повторяются, даже если задачи удалены"""
+        if above is not None:
+            self._index_task_id(above)
+        start = self._next_task_id
+        self._next_task_id += count
+        return range(start, start + count)
+
+    def remove_task(self, task_id):
+        task = self._tasks.pop(task_id, None)
+        if task is not None:
+            self._status_counts[task.status] -= 1
+            self._priority_counts[task.priority] -= 1
+            self._unindex_deadline(task.deadline_date, task.task_id)
+            self._unindex_parent(task)
+        return task
+
+    def remove_subtree(self, task_id):
+        """Удаление задачи вместе со всеми подзадачами; возвращает удаленные задачи"""
+        task = self.get_task(task_id)
+        if task is None:
+            return []
+        removed = [task] + self.descendants(task_id)
+        for task in removed:
+            self.remove_task(task.task_id)
+        return removed
+
+    def get_task(self, task_id):
+        return self._tasks.get(task_id)
+
+    def update_task_status(self, task_id, new_status):
+        task = self._tasks.get(task_id)
+        if task is None:
+            return False
+        self._status_counts[task.status] -= 1
+        task.update_status(new_status)
+        self._status_counts[new_status] += 1
+        return True
+
+    def update_task_priority(self, task_id, new_priority):
+        task = self._tasks.get(task_id)
+        if task is None:
+            return False
+        self._priority_counts[task.priority] -= 1
+        task.update_priority(new_priority)
+        self._priority_counts[new_priority] += 1
+        return True
+
+    def update_task_title(self, task_id, new_title):
+        task = self._tasks.get(task_id)
+        if task is None:
+            return False
+        task.update_title(new_title)
+        return True
+
+    def update_task_description(self, task_id, new_description):
+        task = self._tasks.get(task_id)
+        if task is None:
+            return False
+        task.update_description(new_description)
+        return True
+
+    def update_task_deadline(self, task_id, new_deadline):
+        task = self._tasks.get(task_id)
+        if task is None:
+            return False
+        old_deadline = task.deadline_date
+        # При неверном формате update_deadline бросает ValueError до изменения задачи и индекса
+        task.update_deadline(new_deadline)
+        self._unindex_deadline(old_deadline, task.task_id)
+        self._index_deadline(task.deadline_date, task.task_id)
+        return True
+
+    def count_tasks(self):
+        return len(self._tasks)
+
+    def count_by_status(self, status):
+        return self._status_counts[status]
+
+    def count_by_priority(self, priority):
+        return self._priority_counts[priority]
+
+    def count_overdue(self, today=None):
+        today = today or date.today()
+        deadline_index = self._sorted_deadlines()
+        if today != self._overdue_day:
+            # Задача просрочена с начала дня дедлайна, как и в Task.check_overdue:
+            # (завтра,) меньше любой пары (завтра, task_id), поэтому попадают сроки до сегодня включительно.
+            # При переходе на следующий день поиск начинается с уже просроченных задач
+            lo = self._overdue_count if self._overdue_day is not None and today > self._overdue_day else 0
+            self._overdue_count = bisect.bisect_left(deadline_index, (today + timedelta(days=1),), lo)
+            self._overdue_day = today
+        return self._overdue_count
+
+    def report(self, today=None):
+        """Отчет из счетчиков, которые обновляются при каждом изменении задач, без прохода по задачам"""
+        return {
+            'total_tasks': self.count_tasks(),
+            'completed_tasks': self.count_by_status('completed'),
+            'overdue_tasks': self.count_overdue(today),
+            'high_priority_tasks': self.count_by_priority('high'),
+        }
+
+    def overdue_tasks(self, today=None):
+        """Просроченные задачи в порядке возрастания срока"""
+        end = self.count_overdue(today)
+        return [self._tasks[task_id] for _, task_id in self._deadline_index[:end]]
+
+    def _sorted_deadlines(self):
+        if self._pending_deadlines:
+            self._deadline_index.extend(self._pending_deadlines)
+            self._pending_deadlines.clear()
+            # Timsort сливает уже отсортированные отрезки почти за линейное время
+            self._deadline_index.sort()
+            self._overdue_day = None
+        return self._deadline_index
+
+    def children(self, task_id):
+        """Непосредственные подзадачи"""
+        return [self.get_task(child_id) for child_id in self._children.get(task_id, ())]
+
+    def descendants(self, task_id):
+        """Все подзадачи в порядке обхода в глубину; время пропорционально размеру поддерева"""
+        result = []
+        visited = {task_id}
+        stack = list(reversed(self._children.get(task_id, {})))
+        while stack:
+            child_id = stack.pop()
+            if child_id not in visited:
+                visited.add(child_id)
+                result.append(self.get_task(child_id))
+                stack.extend(reversed(self._children.get(child_id, {})))
+        return result
+
+    def ancestors(self, task_id):
+        """Родитель, родитель родителя и так далее до корня"""
+        result = []
+        seen = {task_id}
+        task = self.get_task(task_id)
+        while task is not None:
+            parent_task_id = getattr(task, 'parent_task_id', None)
+            if parent_task_id is None or parent_task_id in seen:
+                break
+            seen.add(parent_task_id)
+            task = self.get_task(parent_task_id)
+            if task is not None:
+                result.append(task)
+        return result
+
+    def subtree_completion(self, task_id):
+        """Процент выполненных задач в поддереве (сама задача и все подзадачи) или None"""
+        task = self.get_task(task_id)
+        if task is None:
+            return None
+        subtree = [task] + self.descendants(task_id)
+        completed = sum(1 for task in subtree if task.status == 'completed')
+        return completed * 100 / len(subtree)
+
+    def _index_task_id(self, task_id):
+        if isinstance(task_id, int) and task_id >= self._next_task_id:
+            self._next_task_id = task_id + 1
+
+    def _index_parent(self, task):
+        parent_task_id = getattr(task, 'parent_task_id', None)
+        if parent_task_id is not None:
+            self._children.setdefault(parent_task_id, {})[task.task_id] = None
+
+    def _unindex_parent(self, task):
+        parent_task_id = getattr(task, 'parent_task_id', None)
+        if parent_task_id is not None:
+            siblings = self._children[parent_task_id]
+            del siblings[task.task_id]
+            if not siblings:
+                del self._children[parent_task_id]
+
+    def _index_deadline(self, deadline, task_id):
+        if deadline is not None:
+            bisect.insort(self._sorted_deadlines(), (deadline, task_id))
+            if self._overdue_day is not None and deadline <= self._overdue_day:
+                self._overdue_count += 1
+
+    def _unindex_deadline(self, deadline, task_id):
+        if deadline is not None:
+            deadline_index = self._sorted_deadlines()
+            del deadline_index[bisect.bisect_left(deadline_index, (deadline, task_id))]
+            if self._overdue_day is not None and deadline <= self._overdue_day:
+                self._overdue_count -= 1
+
+
+class ColumnarUser(User):
+    """Пользователь, задачи которого хранятся по столбцам (TaskColumns), а не объектами Task.
+
+    get_task, tasks и overdue_tasks возвращают новые объекты Task, собранные из столбцов;
+    изменять задачи нужно через методы update_task_*.
+    """
+    _TASK_ATTRIBUTES = ('_columns', '_children', '_next_task_id')
+
+    def _clear_tasks(self):
+        self._columns = TaskColumns()
+        self._clear_children()
+
+    @property
+    def tasks(self):
+        return tuple(self._columns)
+
+    @tasks.setter
+    def tasks(self, tasks):
+        self._clear_tasks()
+        for task in tasks:
+            self.add_task(task)
+
+    def add_task(self, task):
+        if self._columns.append(task):
+            self._index_parent(task)
+            self._index_task_id(task.task_id)
+            return True
+        return False
+
+    def add_tasks(self, tasks):
+        # Столбцы обновляются за O(1) на задачу, отдельный путь для пачки не нужен
+        return [task for task in tasks if self.add_task(task)]
+
+    def remove_task(self, task_id):
+        task = self._columns.remove(task_id)
+        if task is not None:
+            self._unindex_parent(task)
+        return task
+
+    def get_task(self, task_id):
+        return self._columns.get(task_id)
+
+    def update_task_status(self, task_id, new_status):
+        return self._columns.update(task_id, 'status', new_status)
+
+    def update_task_priority(self, task_id, new_priority):
+        return self._columns.update(task_id, 'priority', new_priority)
+
+    def update_task_title(self, task_id, new_title):
+        return self._columns.update(task_id, 'title', new_title)
+
+    def update_task_description(self, task_id, new_description):
+        return self._columns.update(task_id, 'description', new_description)
+
+    def update_task_deadline(self, task_id, new_deadline):
+        return self._columns.update(task_id, 'deadline', new_deadline)
+
+    def count_tasks(self):
+        return len(self._columns)
+
+    def count_by_status(self, status):
+        return self._columns.count('status', status)
+
+    def count_by_priority(self, priority):
+        return self._columns.count('priority', priority)
+
+    def count_overdue(self, today=None):
+        return self._columns.count_overdue(today or date.today())
+
+    def overdue_tasks(self, today=None):
+        return self._columns.overdue_tasks(today or date.today())
+
+
+class TaskColumns:
+    """Задачи пользователя в виде столбцов: по массиву array на каждое поле.
+
+    Статус и приоритет хранятся кодами из общего словаря значений, срок - порядковым
+    номером даты (date.toordinal), поэтому отчеты и проверка просрочки - это
+    проходы по массивам чисел на уровне C (array.count, map, itertools.compress).
+    task_id и parent_task_id должны быть целыми числами.
+    При удалении на место задачи переносится последняя, так что порядок задач не сохраняется.
+    """
+    # Срок "нет дедлайна" больше любой даты, чтобы такие задачи не считались просроченными
+    _NO_DEADLINE = date.max.toordinal() + 1
+    _NO_PARENT = -1
+
+    def __init__(self):
+        self.task_ids = array('q')
+        self.titles = []
+        self.descriptions = []
+        self.statuses = array('H')
+        self.priorities = array('H')
+        self.deadlines = array('l')
+        self.is_subtask = array('b')
+        self.parent_ids = array('q')
+        self._rows = {}
+        # Словарь значений статуса и приоритета: код -> строка и строка -> код
+        self._values = []
+        self._codes = {}
+
+    def __len__(self):
+        return len(self.task_ids)
+
+    def __iter__(self):
+        return (self._task(row) for row in range(len(self.task_ids)))
+
+    def append(self, task):
+        if task.task_id in self._rows:
+            return False
+        parent_task_id = getattr(task, 'parent_task_id', None)
+        values = (task.task_id, task.title, task.description, self._code(task.status), self._code(task.priority),
+                  self._ordinal(task.deadline_date), isinstance(task, Subtask),
+                  self._NO_PARENT if parent_task_id is None else parent_task_id)
+        # Целые поля проверяются до записи: исключение на середине оставило бы столбцы разной длины
+        array('q', (values[0], values[-1]))
+        for column, value in zip(self._columns(), values):
+            column.append(value)
+        self._rows[task.task_id] = len(self.task_ids) - 1
+        return True
+
+    def remove(self, task_id):
+        row = self._rows.pop(task_id, None)
+        if row is None:
+            return None
+        task = self._task(row)
+        last = len(self.task_ids) - 1
+        for column in self._columns():
+            column[row] = column[last]
+            del column[last]
+        if row != last:
+            self._rows[self.task_ids[row]] = row
+        return task
+
+    def get(self, task_id):
+        row = self._rows.get(task_id)
+        return None if row is None else self._task(row)
+
+    def update(self, task_id, field, value):
+        row = self._rows.get(task_id)
+        if row is None:
+            return False
+        if field == 'status':
+            self.statuses[row] = self._code(value)
+        elif field == 'priority':
+            self.priorities[row] = self._code(value)
+        elif field == 'deadline':
+            self.deadlines[row] = self._ordinal(_parse_deadline(value))
+        elif field == 'title':
+            self.titles[row] = value
+        elif field == 'description':
+            self.descriptions[row] = value
+        else:
+            raise ValueError(f"Unknown field: {field}")
+        return True
+
+    def count(self, field, value):
+        code = self._codes.get(value)
+        if code is None:
+            return 0
+        return (self.statuses if field == 'status' else self.priorities).count(code)
+
+    def count_overdue(self, today):
+        return sum(map(today.toordinal().__ge__, self.deadlines))
+
+    def overdue_tasks(self, today):
+        rows = itertools.compress(range(len(self.task_ids)), map(today.toordinal().__ge__, self.deadlines))
+        rows = sorted(rows, key=lambda row: (self.deadlines[row], self.task_ids[row]))
+        return [self._task(row) for row in rows]
+
+    def _columns(self):
+        return (self.task_ids, self.titles, self.descriptions, self.statuses, self.priorities,
+                self.deadlines, self.is_subtask, self.parent_ids)
+
+    def _code(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            self._values.append(sys.intern(value))
+            code = self._codes[value] = len(self._values) - 1
+        return code
+
+    def _ordinal(self, deadline):
+        return self._NO_DEADLINE if deadline is None else deadline.toordinal()
+
+    def _task(self, row):
+        ordinal = self.deadlines[row]
+        deadline = None if ordinal == self._NO_DEADLINE else date.fromordinal(ordinal)
+        values = (self.task_ids[row], self.titles[row], self.descriptions[row], self._values[self.statuses[row]],
+                  deadline, self._values[self.priorities[row]])
+        if self.is_subtask[row]:
+            parent_task_id = self.parent_ids[row]
+            return Subtask(*values, None if parent_task_id == self._NO_PARENT else parent_task_id)
+        return Task(*values)
+
 
 class Task:
+    # Без __dict__ у каждой задачи; статус и приоритет интернируются - их значений немного
+    __slots__ = ('task_id', 'title', 'description', 'status', 'deadline_date', 'priority')
+
     def __init__(self, task_id, title, description, status, deadline, priority):
         self.task_id = task_id
         self.title = title
         self.description = description
-        self.status = status
-        self.deadline = deadline
-        self.priority = priority
+        self.status = sys.intern(status)
+        self.deadline_date = _parse_deadline(deadline)
+        self.priority = sys.intern(priority)
+
+    @property
+    def deadline(self):
+        """Срок в виде строки YYYY-MM-DD; внутри хранится разобранная дата.
+        Только для чтения: срок меняется через update_deadline (у задач пользователя - через update_task_deadline)
+        """
+        if self.deadline_date is None:
+            return ''
+        return self.deadline_date.isoformat()
 
     def __str__(self):
         return (f'Task {self.task_id}: {self.title} - Status: {self.status}, '
                 f'Deadline: {self.deadline}, Priority: {self.priority}')
 
+    def to_dict(self):
+        return {
+            'task_id': self.task_id,
+            'title': self.title,
+            'description': self.description,
+            'status': self.status,
+            'deadline': self.deadline,
+            'priority': self.priority,
+            'type': type(self).__name__,
+            'parent_task_id': None,
+        }
+
+    @staticmethod
+    def from_dict(task_data):
+        if task_data['type'] == 'Subtask':
+            return Subtask(task_data['task_id'], task_data['title'], task_data['description'],
+                           task_data['status'], task_data['deadline'], task_data['priority'],
+                           task_data['parent_task_id'])
+        return Task(task_data['task_id'], task_data['title'], task_data['description'],
+                    task_data['status'], task_data['deadline'], task_data['priority'])
+
     def update_status(self, new_status):
-        self.status = new_status
+        self.status = sys.intern(new_status)
 
     def update_priority(self, new_priority):
-        self.priority = new_priority
+        self.priority = sys.intern(new_priority)
 
     def update_description(self, new_description):
         self.description = new_description
@@ -39,16 +561,27 @@ class Task:
         self.title = new_title
 
     def update_deadline(self, new_deadline):
-        self.deadline = new_deadline
+        self.deadline_date = _parse_deadline(new_deadline)
 
-    def check_overdue(self):
-        if self.deadline:
-            deadline_date = datetime.strptime(self.deadline, '%Y-%m-%d')
-            return deadline_date < datetime.today()
+    def check_overdue(self, today=None):
+        # Задача просрочена с начала дня дедлайна; today можно вычислить один раз на всю проверку
+        if self.deadline_date is not None:
+            return self.deadline_date <= (today or date.today())
         return False
 
 
+def _parse_deadline(deadline):
+    """Разбор срока YYYY-MM-DD один раз при создании или изменении задачи"""
+    if not deadline:
+        return None
+    if isinstance(deadline, date):
+        return deadline
+    return date.fromisoformat(deadline)
+
+
 class Subtask(Task):
+    __slots__ = ('parent_task_id',)
+
     def __init__(self, task_id, title, description, status, deadline, priority, parent_task_id):
         super().__init__(task_id, title, description, status, deadline, priority)
         self.parent_task_id = parent_task_id
@@ -57,60 +590,223 @@ class Subtask(Task):
         return (f'Subtask {self.task_id}: {self.title} - Status: {self.status}, '
                 f'Deadline: {self.deadline}, Priority: {self.priority}, Parent Task ID: {self.parent_task_id}')
 
+    def to_dict(self):
+        task_data = super().to_dict()
+        task_data['parent_task_id'] = self.parent_task_id
+        return task_data
+
 
 class TaskManager:
-    def __init__(self):
-        self.users = []
+    def __init__(self, storage=None, columnar=False, password_iterations=PASSWORD_ITERATIONS):
+        """storage - хранилище из Task2_storage (JsonStorage, SQLiteStorage).
+        Без него данные сохраняются через save_tasks_to_file/load_tasks_from_file.
+        columnar=True - задачи пользователей хранятся по столбцам (ColumnarUser).
+        password_iterations - число итераций PBKDF2 для хэшей паролей.
+        """
+        self.password_iterations = password_iterations
+        self._user_class = ColumnarUser if columnar else User
+        # Пользователи по имени; словарь сохраняет порядок регистрации
+        self._users = {}
         self.logged_in_user = None
+        self.storage = storage
+        # Журнал изменений (см. enable_journal) и поколение журнала, вошедшее в загруженный снимок
+        self.journal = None
+        self.snapshot_file = None
+        self.compact_every = None
+        self._snapshot_generation = 0
+        # Следующий id задачи у пользователей, задачи которых остаются в хранилище (см. _pushdown)
+        self._next_stored_ids = {}
+        if storage is not None:
+            self._load_storage()
+
+    @property
+    def users(self):
+        return list(self._users.values())
 
     def register_user(self, username, password):
         if self.get_user_by_username(username):
             print("Username already exists!")
             return False
-        new_user = User(username, password)
-        self.users.append(new_user)
+        # Пароль хранится и сохраняется только в виде соленого хэша
+        self.add_user(username, hash_password(password, self.password_iterations))
         print(f"User {username} registered successfully.")
         return True
 
+    def add_user(self, username, password_hash, lock=None):
+        """Добавление пользователя с уже посчитанным хэшем пароля; False, если имя занято.
+        lock - блокировка для записи в хранилище и журнал (см. record_change)
+        """
+        if username in self._users:
+            return False
+        self._users[username] = self._new_user(username, password_hash)
+        self.record_change('register_user', lock, username=username, password=password_hash)
+        return True
+
+    def _new_user(self, username, password):
+        if self.storage is not None and self.storage.supports_queries:
+            # Задачи нового пользователя остаются в базе, как и у загруженных
+            loader = functools.partial(_load_storage_tasks, self.storage, username)
+            return self._user_class(username, password, loader)
+        return self._user_class(username, password)
+
     def login_user(self, username, password):
         user = self.get_user_by_username(username)
-        if user and user.password == password:
+        if user and self._check_password(user, password):
             self.logged_in_user = user
             print(f"User {username} logged in successfully.")
             return True
         print("Invalid username or password!")
         return False
 
+    def _check_password(self, user, password):
+        if not verify_password(password, user.password):
+            return False
+        if needs_rehash(user.password, self.password_iterations):
+            # Открытый пароль из старого файла или другое число итераций - пересчитываем хэш
+            user.password = hash_password(password, self.password_iterations)
+            self._log('set_password', username=user.username, password=user.password)
+        return True
+
     def logout_user(self):
         if self.logged_in_user:
             print(f"User {self.logged_in_user.username} logged out.")
             self.logged_in_user = None
 
     def get_user_by_username(self, username):
-        for user in self.users:
-            if user.username == username:
-                return user
-        return None
+        return self._users.get(username)
 
     def add_task(self, task):
-        if self.logged_in_user:
-            self.logged_in_user.tasks.append(task)
+        if self._pushdown():
+            if self.storage.get_task(self.logged_in_user.username, task.task_id) is None:
+                self._log('add_task', username=self.logged_in_user.username, task=task.to_dict())
+                return True
+            print(f"Task with ID {task.task_id} already exists!")
+        elif self.logged_in_user:
+            if self.logged_in_user.add_task(task):
+                self._log('add_task', username=self.logged_in_user.username, task=task.to_dict())
+                return True
+            print(f"Task with ID {task.task_id} already exists!")
         else:
             print("No user is logged in!")
+        return False
 
     def remove_task(self, task_id):
-        if self.logged_in_user:
-            for task in self.logged_in_user.tasks:
-                if task.task_id == task_id:
-                    self.logged_in_user.tasks.remove(task)
-                    return True
+        if self._pushdown():
+            if self.storage.get_task(self.logged_in_user.username, task_id) is None:
+                return False
+            self._log('remove_task', username=self.logged_in_user.username, task_id=task_id)
+            return True
+        if self.logged_in_user and self.logged_in_user.remove_task(task_id) is not None:
+            self._log('remove_task', username=self.logged_in_user.username, task_id=task_id)
+            return True
         return False
 
+    def next_task_id(self):
+        """Новый id задачи вошедшего пользователя; id не повторяются и после удаления задач"""
+        if self._pushdown():
+            return self._allocate_stored_ids(1)[0]
+        if self.logged_in_user:
+            return self.logged_in_user.allocate_task_ids()[0]
+        return None
+
+    def add_tasks(self, tasks, batch_size=10_000):
+        """Добавление задач пачками по batch_size: индексы обновляются и журнал пишется раз на пачку.
+
+        Задачам с task_id=None выдаются новые id, задачи с занятыми id пропускаются.
+        Возвращает число добавленных задач.
+        """
+        if not self.logged_in_user:
+            print("No user is logged in!")
+            return 0
+        user = self.logged_in_user
+        tasks = iter(tasks)
+        added_count = 0
+        while True:
+            batch = list(itertools.islice(tasks, batch_size))
+            if not batch:
+                break
+            new_tasks = [task for task in batch if task.task_id is None]
+            if new_tasks:
+                # Новые id больше явно заданных в той же пачке
+                above = max((task.task_id for task in batch if isinstance(task.task_id, int)), default=0)
+                task_ids = self._allocate_stored_ids(len(new_tasks), above) if self._pushdown() \
+                    else user.allocate_task_ids(len(new_tasks), above)
+                for task, task_id in zip(new_tasks, task_ids):
+                    task.task_id = task_id
+            if self._pushdown():
+                existing = self.storage.existing_task_ids(user.username, [task.task_id for task in batch])
+                added = []
+                for task in batch:
+                    if task.task_id not in existing:
+                        existing.add(task.task_id)
+                        added.append(task)
+            else:
+                added = user.add_tasks(batch)
+            if added and (self.journal or self.storage is not None):
+                self._log('add_tasks', username=user.username, tasks=[task.to_dict() for task in added])
+            added_count += len(added)
+        return added_count
+
+    def import_tasks(self, file_name, batch_size=10_000):
+        """Потоковый импорт задач из CSV или JSONL (формат read_task_rows) через add_tasks"""
+        return self.add_tasks(map(_load_task, read_task_rows(file_name)), batch_size)
+
+    def export_tasks(self, file_name, predicate=None, batch_size=10_000):
+        """Потоковый экспорт задач вошедшего пользователя в CSV или JSONL.
+        predicate(task) отбирает задачи; возвращает число записанных задач.
+        """
+        if self._pushdown():
+            tasks = map(_load_task, self.storage.load_tasks(self.logged_in_user.username))
+        elif self.logged_in_user:
+            tasks = self.logged_in_user.tasks
+        else:
+            print("No user is logged in!")
+            return 0
+        if predicate is not None:
+            tasks = filter(predicate, tasks)
+        return write_task_rows(file_name, (task.to_dict() for task in tasks), batch_size)
+
+    def _allocate_stored_ids(self, count, above=0):
+        username = self.logged_in_user.username
+        start = max(self._next_stored_ids.get(username, 1), (self.storage.max_task_id(username) or 0) + 1, above + 1)
+        self._next_stored_ids[username] = start + count
+        return range(start, start + count)
+
+    def remove_task_tree(self, task_id):
+        """Каскадное удаление задачи и всех ее подзадач"""
+        if not self.logged_in_user:
+            return False
+        removed = self.logged_in_user.remove_subtree(task_id)
+        for task in removed:
+            self._log('remove_task', username=self.logged_in_user.username, task_id=task.task_id)
+        return bool(removed)
+
+    def get_subtasks(self, task_id, recursive=False):
+        """Подзадачи задачи: непосредственные или (recursive=True) все в порядке обхода в глубину"""
+        if self.logged_in_user:
+            user = self.logged_in_user
+            return user.descendants(task_id) if recursive else user.children(task_id)
+        return []
+
+    def get_parent_tasks(self, task_id):
+        """Цепочка родительских задач от непосредственного родителя до корня"""
+        if self.logged_in_user:
+            return self.logged_in_user.ancestors(task_id)
+        return []
+
+    def get_task_completion(self, task_id):
+        """Процент выполненных задач в поддереве задачи"""
+        if self.logged_in_user:
+            return self.logged_in_user.subtree_completion(task_id)
+        return None
+
     def get_task_by_id(self, task_id):
+        if self._pushdown():
+            # Задача из базы - отдельный объект; менять ее нужно через update_task_*
+            task_data = self.storage.get_task(self.logged_in_user.username, task_id)
+            return Task.from_dict(task_data) if task_data else None
         if self.logged_in_user:
-            for task in self.logged_in_user.tasks:
-                if task.task_id == task_id:
-                    return task
+            return self.logged_in_user.get_task(task_id)
         return None
 
     def display_all_tasks(self):
@@ -121,107 +817,279 @@ class TaskManager:
             print("No user is logged in!")
 
     def save_tasks_to_file(self, file_name):
-        data = {
-            'users': [
-                {
-                    'username': user.username,
-                    'password': user.password,
-                    'tasks': [
-                        {
-                            'task_id': task.task_id,
-                            'title': task.title,
-                            'description': task.description,
-                            'status': task.status,
-                            'deadline': task.deadline,
-                            'priority': task.priority,
-                            'type': type(task).__name__,
-                            'parent_task_id': task.parent_task_id if isinstance(task, Subtask) else None
-                        } for task in user.tasks
-                    ]
-                } for user in self.users
-            ]
-        }
-        with open(file_name, 'w') as file:
-            json.dump(data, file)
+        if self.journal:
+            # Снимок при включенном журнале - это сжатие: иначе следующие изменения попали бы
+            # в журнал старого поколения, который загрузка пропускает как уже вошедший в снимок
+            self.compact(file_name)
+            return
+        self._write_snapshot(file_name, write_json)
+
+    def _write_snapshot(self, file_name, writer, metadata=None):
+        # Пользователи записываются по одному, файл подменяется атомарно
+        users = ((user.username, user.password, [task.to_dict() for task in user.tasks]) for user in self.users)
+        writer(file_name, users, metadata or {})
         print("Tasks saved to file.")
 
-    def load_tasks_from_file(self, file_name):
+    def load_tasks_from_file(self, file_name, journal_file=None):
         if os.path.exists(file_name):
-            with open(file_name, 'r') as file:
-                data = json.load(file)
-                if isinstance(data, dict) and 'users' in data:
-                    for user_data in data['users']:
-                        user = User(user_data['username'], user_data['password'])
-                        for task_data in user_data['tasks']:
-                            if task_data['type'] == 'Subtask':
-                                task = Subtask(task_data['task_id'], task_data['title'], task_data['description'],
-                                               task_data['status'], task_data['deadline'], task_data['priority'],
-                                               task_data['parent_task_id'])
-                            else:
-                                task = Task(task_data['task_id'], task_data['title'], task_data['description'],
-                                            task_data['status'], task_data['deadline'], task_data['priority'])
-                            user.tasks.append(task)
-                        self.users.append(user)
+            # Пользователи читаются из файла по одному, без загрузки всего документа в память
+            metadata = {}
+            for user_data in iter_json_users(file_name, metadata):
+                user = self._user_class(user_data['username'], user_data['password'])
+                for task_data in user_data['tasks']:
+                    user.add_task(_load_task(task_data))
+                self._users[user.username] = user
+            self._snapshot_generation = metadata.get('journal_generation', 0)
             print("Tasks loaded from file.")
+        if journal_file and os.path.exists(journal_file):
+            self._replay_journal(journal_file)
+
+    def save_tasks_to_jsonl(self, file_name):
+        """Сохранение в формате JSONL (одна задача на строку), который можно загружать лениво"""
+        if self.journal:
+            self.compact(file_name)
+            return
+        self._write_snapshot(file_name, write_jsonl)
+
+    def load_tasks_from_jsonl(self, file_name, journal_file=None, lazy=True):
+        """Загрузка файла JSONL. При lazy=True читаются только имена и пароли,
+        а задачи пользователя загружаются при первом обращении к ним
+        (файл не должен меняться, пока все пользователи не загружены).
+        """
+        if os.path.exists(file_name):
+            metadata, users = scan_jsonl(file_name)
+            for username, password, offset, count in users:
+                loader = functools.partial(_load_jsonl_tasks, file_name, offset, count)
+                user = self._user_class(username, password, loader)
+                if not lazy:
+                    user.load_tasks()
+                self._users[username] = user
+            self._snapshot_generation = metadata.get('journal_generation', 0)
+            print("Tasks loaded from file.")
+        if journal_file and os.path.exists(journal_file):
+            self._replay_journal(journal_file)
+
+    def enable_journal(self, journal_file, snapshot_file=None, fsync_every=1, compact_every=None):
+        """Режим журнала: каждое изменение дописывается в journal_file одной записью за O(1).
+
+        snapshot_file - снимок для compact() (JSON или .jsonl); при compact_every изменений
+        снимок пересохраняется автоматически, а журнал очищается.
+        Перед включением журнал нужно применить через load_tasks_from_file/load_tasks_from_jsonl.
+        """
+        self.journal = TaskJournal(journal_file, fsync_every)
+        self.snapshot_file = snapshot_file
+        self.compact_every = compact_every
+        if self.journal.generation != self._snapshot_generation:
+            # Журнал уже вошел в снимок (сбой во время сжатия) - начинаем его заново
+            self.journal.reset(self._snapshot_generation)
+
+    def compact(self, file_name=None):
+        """Сохранение снимка и очистка журнала"""
+        file_name = file_name or self.snapshot_file
+        if file_name is None:
+            raise ValueError("No snapshot file: pass file_name or enable_journal(..., snapshot_file)")
+        metadata = {}
+        if self.journal:
+            # Изменения из журнала текущего поколения входят в снимок
+            metadata['journal_generation'] = self.journal.generation + 1
+        self._write_snapshot(file_name, write_jsonl if file_name.endswith('.jsonl') else write_json, metadata)
+        if self.journal:
+            self._snapshot_generation = self.journal.generation + 1
+            self.journal.reset(self._snapshot_generation)
+
+    def close_journal(self):
+        if self.journal:
+            self.journal.close()
+            self.journal = None
+
+    def save(self):
+        """Сохранение изменений в хранилище"""
+        if self.storage is not None:
+            self.storage.save(self.users)
+
+    def close(self):
+        if self.storage is not None:
+            self.storage.close()
+        self.close_journal()
+
+    def _load_storage(self):
+        for username, password, tasks in self.storage.load_users():
+            if tasks is None:
+                loader = functools.partial(_load_storage_tasks, self.storage, username)
+                user = self._user_class(username, password, loader)
+            else:
+                user = self._user_class(username, password)
+                for task_data in tasks:
+                    user.add_task(_load_task(task_data))
+            self._users[username] = user
+
+    def _pushdown(self):
+        """Запросы выполняются в хранилище, если оно это умеет и задачи пользователя не загружены в память"""
+        return (self.logged_in_user is not None and self.storage is not None
+                and self.storage.supports_queries and not self.logged_in_user.tasks_loaded)
+
+    def record_change(self, op, lock=None, **fields):
+        """Запись изменения в хранилище и журнал без автоматического сжатия.
+        lock - блокировка, под которой выполняется запись, если хранилище и журнал общие для потоков
+        """
+        with lock or contextlib.nullcontext():
+            if self.storage is not None:
+                self.storage.record(op, **fields)
+            if self.journal:
+                self.journal.append(op, **fields)
+
+    def compaction_due(self):
+        """Набралось ли в журнале compact_every изменений для автоматического сжатия"""
+        return bool(self.journal and self.compact_every and self.snapshot_file
+                    and self.journal.records >= self.compact_every)
+
+    def _log(self, op, **fields):
+        self.record_change(op, **fields)
+        if self.compaction_due():
+            self.compact()
+
+    def _replay_journal(self, journal_file):
+        records = TaskJournal.read(journal_file)
+        header = next(records, None)
+        if header is None or header['generation'] != self._snapshot_generation:
+            return
+        for record in records:
+            op = record['op']
+            if op == 'register_user':
+                if record['username'] not in self._users:
+                    self._users[record['username']] = self._user_class(record['username'], record['password'])
+                continue
+            user = self._users[record['username']]
+            if op == 'set_password':
+                user.password = record['password']
+            elif op == 'add_task':
+                user.add_task(_load_task(record['task']))
+            elif op == 'add_tasks':
+                user.add_tasks([_load_task(task_data) for task_data in record['tasks']])
+            elif op == 'remove_task':
+                user.remove_task(record['task_id'])
+            elif op == 'update_task':
+                getattr(user, 'update_task_' + record['field'])(record['task_id'], record['value'])
 
     def update_task_status(self, task_id, new_status):
-        task = self.get_task_by_id(task_id)
-        if task:
-            task.update_status(new_status)
-            return True
-        return False
+        return self._update_task('status', task_id, new_status)
 
     def update_task_priority(self, task_id, new_priority):
-        task = self.get_task_by_id(task_id)
-        if task:
-            task.update_priority(new_priority)
-            return True
-        return False
+        return self._update_task('priority', task_id, new_priority)
 
     def update_task_title(self, task_id, new_title):
-        task = self.get_task_by_id(task_id)
-        if task:
-            task.update_title(new_title)
-            return True
-        return False
+        return self._update_task('title', task_id, new_title)
 
     def update_task_description(self, task_id, new_description):
-        task = self.get_task_by_id(task_id)
-        if task:
-            task.update_description(new_description)
-            return True
-        return False
+        return self._update_task('description', task_id, new_description)
 
     def update_task_deadline(self, task_id, new_deadline):
-        task = self.get_task_by_id(task_id)
-        if task:
-            task.update_deadline(new_deadline)
+        return self._update_task('deadline', task_id, new_deadline)
+
+    def _update_task(self, field, task_id, value):
+        user = self.logged_in_user
+        if self._pushdown():
+            if self.storage.get_task(user.username, task_id) is None:
+                return False
+            if field == 'deadline':
+                deadline = _parse_deadline(value)
+                value = deadline.isoformat() if deadline else ''
+            self._log('update_task', username=user.username, task_id=task_id, field=field, value=value)
+            return True
+        if user and getattr(user, 'update_task_' + field)(task_id, value):
+            # В журнал пишется нормализованное значение (срок - строкой YYYY-MM-DD)
+            self._log('update_task', username=user.username, task_id=task_id, field=field,
+                      value=getattr(user.get_task(task_id), field))
             return True
         return False
 
     def check_overdue_tasks(self):
-        overdue_tasks = []
+        if self._pushdown():
+            return [Task.from_dict(task_data)
+                    for task_data in self.storage.overdue_tasks(self.logged_in_user.username, date.today())]
         if self.logged_in_user:
-            for task in self.logged_in_user.tasks:
-                if task.check_overdue():
-                    overdue_tasks.append(task)
-        return overdue_tasks
+            return self.logged_in_user.overdue_tasks()
+        return []
 
     def generate_report(self):
+        if self._pushdown():
+            return self.storage.report(self.logged_in_user.username, date.today())
         if self.logged_in_user:
-            completed_tasks = [task for task in self.logged_in_user.tasks if task.status == 'completed']
-            overdue_tasks = self.check_overdue_tasks()
-            high_priority_tasks = [task for task in self.logged_in_user.tasks if task.priority == 'high']
-
-            report = {
-                'total_tasks': len(self.logged_in_user.tasks),
-                'completed_tasks': len(completed_tasks),
-                'overdue_tasks': len(overdue_tasks),
-                'high_priority_tasks': len(high_priority_tasks),
-            }
-            return report
+            return self.logged_in_user.report()
         return {}
 
+    def generate_global_report(self, processes=None, today=None, pool_min_tasks=GLOBAL_REPORT_POOL_MIN_TASKS):
+        """Сводный отчет по всем пользователям.
+
+        Для загруженных пользователей берутся их счетчики, для пользователей в SQLite - запрос к базе.
+        Пользователи из JSONL, задачи которых еще не загружены, считаются без загрузки задач в память менеджера:
+        в пуле из processes процессов (по умолчанию - число ядер), если у них вместе не меньше pool_min_tasks
+        задач (см. GLOBAL_REPORT_POOL_MIN_TASKS), иначе или при одном процессе - в этом процессе.
+        """
+        today = today or date.today()
+        totals = Counter({'users': len(self._users), 'total_tasks': 0, 'completed_tasks': 0,
+                          'overdue_tasks': 0, 'high_priority_tasks': 0})
+        loaders = []
+        for user in self.users:
+            if user.tasks_loaded:
+                totals.update(user.report(today))
+            elif self.storage is not None and self.storage.supports_queries:
+                totals.update(self.storage.report(user.username, today))
+            else:
+                loaders.append(user._loader)
+        processes = processes or os.cpu_count() or 1
+        if processes == 1 or len(loaders) < 2 or sum(map(_loader_size, loaders)) < pool_min_tasks:
+            for loader in loaders:
+                totals.update(_loader_report(loader, today))
+        else:
+            # Пул процессов загружает multiprocessing, поэтому импортируется только здесь
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                chunksize = max(1, len(loaders) // (processes * 4))
+                for report in executor.map(_loader_report, loaders, itertools.repeat(today), chunksize=chunksize):
+                    totals.update(report)
+        return dict(totals)
+
+
+def _load_task(task_data):
+    """Task.from_dict для задач из файлов, журнала и хранилищ.
+
+    Task() не принимает неверный срок, но старый tasks.json мог его содержать: такая задача
+    загружается без срока с сообщением, а не прерывает загрузку всего файла.
+    """
+    try:
+        return Task.from_dict(task_data)
+    except ValueError:
+        print(f"Invalid deadline {task_data['deadline']!r} in task {task_data['task_id']}: loaded without deadline")
+        return Task.from_dict(dict(task_data, deadline=''))
+
+
+def _load_jsonl_tasks(file_name, offset, count):
+    return [_load_task(task_data) for task_data in read_jsonl_tasks(file_name, offset, count)]
+
+
+def _loader_size(loader):
+    """Число задач, которые загрузит loader: у загрузчиков JSONL оно известно из scan_jsonl"""
+    if isinstance(loader, functools.partial) and loader.func is _load_jsonl_tasks:
+        return loader.args[2]
+    return 0
+
+
+def _loader_report(loader, today):
+    """Отчет по задачам из loader() одним проходом (выполняется в процессе пула)"""
+    report = {'total_tasks': 0, 'completed_tasks': 0, 'overdue_tasks': 0, 'high_priority_tasks': 0}
+    for task in loader():
+        report['total_tasks'] += 1
+        report['completed_tasks'] += task.status == 'completed'
+        report['overdue_tasks'] += task.check_overdue(today)
+        report['high_priority_tasks'] += task.priority == 'high'
+    return report
+
+
+def _load_storage_tasks(storage, username):
+    return [_load_task(task_data) for task_data in storage.load_tasks(username)]
+
 
 # Пример использования
 def main():
@@ -248,19 +1116,23 @@ def main():
 
         elif choice == '4':
             if task_manager.logged_in_user:
-                task_id = len(task_manager.logged_in_user.tasks) + 1
+                task_id = task_manager.next_task_id()
                 title = input("Enter title: ")
                 description = input("Enter description: ")
                 status = input("Enter status: ")
                 deadline = input("Enter deadline (YYYY-MM-DD): ")
                 priority = input("Enter priority: ")
                 is_subtask = input("Is this a subtask? (yes/no): ").lower() == 'yes'
-                if is_subtask:
-                    parent_task_id = int(input("Enter parent task ID: "))
-                    task = Subtask(task_id, title, description, status, deadline, priority, parent_task_id)
+                try:
+                    if is_subtask:
+                        parent_task_id = int(input("Enter parent task ID: "))
+                        task = Subtask(task_id, title, description, status, deadline, priority, parent_task_id)
+                    else:
+                        task = Task(task_id, title, description, status, deadline, priority)
+                except ValueError:
+                    print("Invalid deadline or task ID!")
                 else:
-                    task = Task(task_id, title, description, status, deadline, priority)
-                task_manager.add_task(task)
+                    task_manager.add_task(task)
             else:
                 print("No user is logged in! Please log in to add tasks.")
 
@@ -298,7 +1170,10 @@ def main():
                         task_manager.update_task_status(task_id, new_status)
                     elif update_choice == '4':
                         new_deadline = input("Enter new deadline (YYYY-MM-DD): ")
-                        task_manager.update_task_deadline(task_id, new_deadline)
+                        try:
+                            task_manager.update_task_deadline(task_id, new_deadline)
+                        except ValueError:
+                            print("Invalid deadline format!")
                     elif update_choice == '5':
                         new_priority = input("Enter new priority: ")
                         task_manager.update_task_priority(task_id, new_priority)
@@ -0,0 +1,141 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# hashlib, hmac, secrets и concurrent.futures (с OpenSSL и multiprocessing) импортируются в функциях,
+# которым они нужны, чтобы не замедлять импорт Task2_Task_Manager
+
+# Число итераций PBKDF2 для новых паролей; хэши с другим числом пересчитываются при входе
+PASSWORD_ITERATIONS = 200_000
+_ALGORITHM = 'pbkdf2_sha256'
+_HEX_DIGITS = frozenset('0123456789abcdef')
+
+# С какого числа проверок verify_many использует пул процессов. Проверка с PASSWORD_ITERATIONS итерациями -
+# около 45 мс, запуск пула - от нескольких мс (fork) до десятых долей секунды (spawn). На 8 входах пул
+# из 2 процессов не быстрее последовательной проверки (0.38 с против 0.35 с); с 16 проверок выигрыш
+# двух процессов (около 0.35 с) больше стоимости запуска. Замер по размерам пачки - bench_auth в Task2_benchmarks
+POOL_MIN_BATCH = 16
+
+
+def hash_password(password, iterations=PASSWORD_ITERATIONS, salt=None):
+    """Соленый хэш пароля в виде строки pbkdf2_sha256$итерации$соль$хэш"""
+    import hashlib
+
+    salt = salt or os.urandom(16)
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)
+    return f'{_ALGORITHM}${iterations}${salt.hex()}${digest.hex()}'
+
+
+def _parse_hash(stored):
+    """(итерации, соль, хэш) из строки hash_password или None, если это не хэш.
+    Открытый пароль вида pbkdf2_sha256$a$b$c из старого файла хэшем не считается
+    """
+    fields = stored.split('$')
+    if len(fields) != 4 or fields[0] != _ALGORITHM:
+        return None
+    _, iterations, salt, digest = fields
+    if not (iterations.isascii() and iterations.isdigit() and int(iterations) > 0):
+        return None
+    if not (salt and digest and len(salt) % 2 == 0 and _HEX_DIGITS.issuperset(salt + digest)):
+        return None
+    return int(iterations), bytes.fromhex(salt), digest
+
+
+def is_hashed(stored):
+    return _parse_hash(stored) is not None
+
+
+def verify_password(password, stored):
+    """Проверка пароля; stored, который не разбирается как хэш, - пароль в открытом виде из старых файлов"""
+    import hashlib
+    import hmac
+
+    parsed = _parse_hash(stored)
+    if parsed is None:
+        return hmac.compare_digest(password.encode(), stored.encode())
+    iterations, salt, digest = parsed
+    expected = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)
+    return hmac.compare_digest(expected.hex(), digest)
+
+
+def needs_rehash(stored, iterations=PASSWORD_ITERATIONS):
+    """Пароль хранится открытым или с другим числом итераций"""
+    parsed = _parse_hash(stored)
+    return parsed is None or parsed[0] != iterations
+
+
+def _verify_pair(pair):
+    password, stored = pair
+    return stored is not None and verify_password(password, stored)
+
+
+def verify_many(pairs, processes=None, min_batch=POOL_MIN_BATCH):
+    """Проверка пар (пароль, хэш или None); список результатов в том же порядке.
+
+    Пул из processes процессов (по умолчанию - число ядер) используется только для min_batch
+    и больше пар (POOL_MIN_BATCH = 16, см. замеры у константы); меньшие пачки и пачки при одном
+    процессе проверяются последовательно в этом процессе.
+    """
+    pairs = list(pairs)
+    processes = processes or os.cpu_count() or 1
+    if len(pairs) < max(2, min_batch) or processes == 1:
+        return [_verify_pair(pair) for pair in pairs]
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(_verify_pair, pairs, chunksize=max(1, len(pairs) // (processes * 4))))
+
+
+class SessionCache:
+    """Токены сессий с временем жизни ttl секунд (отсчет заново при каждом обращении).
+
+    Проверка токена - поиск в словаре за O(1), без пересчета хэша пароля.
+    Токены хранятся в порядке истечения, поэтому просроченные удаляются с начала
+    словаря при каждом создании сессии. Методы можно вызывать из разных потоков.
+    """
+
+    def __init__(self, ttl=3600, clock=time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        # Токен -> (имя пользователя, момент истечения)
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def create(self, username):
+        import secrets
+
+        token = secrets.token_urlsafe(16)
+        with self._lock:
+            now = self._clock()
+            self._evict(now)
+            self._sessions[token] = (username, now + self.ttl)
+        return token
+
+    def get(self, token):
+        """Имя пользователя сессии или None, если токена нет или он истек"""
+        with self._lock:
+            entry = self._sessions.get(token)
+            if entry is None:
+                return None
+            now = self._clock()
+            if entry[1] <= now:
+                del self._sessions[token]
+                return None
+            self._sessions[token] = (entry[0], now + self.ttl)
+            self._sessions.move_to_end(token)
+            return entry[0]
+
+    def remove(self, token):
+        with self._lock:
+            return self._sessions.pop(token, None) is not None
+
+    def _evict(self, now):
+        while self._sessions:
+            token, (_, expires) = next(iter(self._sessions.items()))
+            if expires > now:
+                break
+            del self._sessions[token]
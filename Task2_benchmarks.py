@@ -0,0 +1,413 @@
+import argparse
+import contextlib
+import io
+import os
+import random
+import json
+import tempfile
+import threading
+import timeit
+import tracemalloc
+from datetime import date
+
+from Task2_Task_Manager import GLOBAL_REPORT_POOL_MIN_TASKS, ColumnarUser, Subtask, Task, TaskManager, User
+from Task2_auth import POOL_MIN_BATCH, verify_many
+from Task2_concurrent import ConcurrentTaskManager
+from Task2_storage import SQLiteStorage, write_jsonl
+
+
+def make_manager(task_count, user_count=1, password_iterations=1):
+    """Менеджер с user_count пользователями; у первого из них task_count задач.
+    По умолчанию хэш пароля в одну итерацию, чтобы регистрация не занимала время бенчмарков.
+    """
+    task_manager = TaskManager(password_iterations=password_iterations)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(user_count):
+            task_manager.register_user(f'user{i}', 'password')
+        task_manager.login_user('user0', 'password')
+    for task_id in range(1, task_count + 1):
+        task_manager.add_task(Task(task_id, f'Task {task_id}', 'Description', 'in progress',
+                                   '2030-01-01', 'high' if task_id % 10 == 0 else 'low'))
+    return task_manager
+
+
+def bench_lookup(task_count, queries, repeat):
+    """Поиск задачи по id: индекс против линейного прохода по списку задач"""
+    task_manager = make_manager(task_count)
+    tasks = task_manager.logged_in_user.tasks
+    rng = random.Random(0)
+    ids = [rng.randint(1, task_count) for _ in range(queries)]
+
+    def linear():
+        for task_id in ids:
+            next(task for task in tasks if task.task_id == task_id)
+
+    indexed = min(timeit.repeat(lambda: [task_manager.get_task_by_id(i) for i in ids], number=1, repeat=repeat))
+    scan = min(timeit.repeat(linear, number=1, repeat=repeat))
+    return indexed / queries, scan / queries
+
+
+def bench_remove(task_count, queries):
+    """Удаление задач по id"""
+    task_manager = make_manager(task_count)
+    ids = random.Random(0).sample(range(1, task_count + 1), queries)
+    elapsed = timeit.timeit(lambda: [task_manager.remove_task(i) for i in ids], number=1)
+    return elapsed / queries
+
+
+def bench_report(task_count, repeat):
+    """Отчет: индексы против трех полных проходов с разбором дат"""
+    task_manager = make_manager(task_count)
+    tasks = task_manager.logged_in_user.tasks
+
+    def scan():
+        completed = [task for task in tasks if task.status == 'completed']
+        overdue = [task for task in tasks if task.check_overdue()]
+        high = [task for task in tasks if task.priority == 'high']
+        return len(tasks), len(completed), len(overdue), len(high)
+
+    indexed = min(timeit.repeat(task_manager.generate_report, number=10, repeat=repeat)) / 10
+    full_scan = min(timeit.repeat(scan, number=1, repeat=repeat))
+    return indexed, full_scan
+
+
+def bench_persistence(task_count, updates, fsync_every):
+    """Сохранение после изменения статуса: полный снимок JSON против записи в журнал"""
+    task_manager = make_manager(task_count)
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot = os.path.join(directory, 'tasks.json')
+        with contextlib.redirect_stdout(io.StringIO()):
+            full = timeit.timeit(lambda: (task_manager.update_task_status(1, 'completed'),
+                                          task_manager.save_tasks_to_file(snapshot)), number=3) / 3
+        task_manager.enable_journal(os.path.join(directory, 'tasks.journal'), snapshot, fsync_every=fsync_every)
+        journal = timeit.timeit(lambda: [task_manager.update_task_status(i, 'completed')
+                                         for i in range(1, updates + 1)], number=1) / updates
+        task_manager.close_journal()
+    return full, journal
+
+
+def measure(function):
+    """Время и пиковый объем памяти (tracemalloc) вызова function"""
+    tracemalloc.start()
+    start = timeit.default_timer()
+    result = function()
+    elapsed = timeit.default_timer() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def bench_loading(user_count, tasks_per_user):
+    """Загрузка файла: json.load целиком, потоковый разбор JSON и ленивая загрузка JSONL"""
+    task_manager = TaskManager()
+    for i in range(user_count):
+        user = User(f'user{i}', 'password')
+        for task_id in range(1, tasks_per_user + 1):
+            user.add_task(Task(task_id, f'Task {task_id}', 'Description', 'in progress', '2030-01-01', 'low'))
+        task_manager._users[user.username] = user
+
+    def load_whole(file_name):
+        with open(file_name) as file:
+            data = json.load(file)
+        users = []
+        for user_data in data['users']:
+            user = User(user_data['username'], user_data['password'])
+            for task_data in user_data['tasks']:
+                user.add_task(Task.from_dict(task_data))
+            users.append(user)
+        return users
+
+    def login_one(load):
+        loaded = TaskManager()
+        load(loaded)
+        loaded.login_user('user0', 'password')
+        return loaded.generate_report()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()):
+        json_file = os.path.join(directory, 'tasks.json')
+        jsonl_file = os.path.join(directory, 'tasks.jsonl')
+        task_manager.save_tasks_to_file(json_file)
+        task_manager.save_tasks_to_jsonl(jsonl_file)
+        results['json.load'] = measure(lambda: load_whole(json_file))[:2]
+        results['streaming json'] = measure(lambda: login_one(lambda m: m.load_tasks_from_file(json_file)))[:2]
+        results['lazy jsonl'] = measure(lambda: login_one(lambda m: m.load_tasks_from_jsonl(jsonl_file)))[:2]
+        results['file size'] = os.path.getsize(json_file)
+    return results
+
+
+def bench_login(user_count, queries, repeat):
+    """Вход пользователя при user_count зарегистрированных пользователях (хэш в одну итерацию)"""
+    task_manager = make_manager(0, user_count)
+    rng = random.Random(0)
+    names = [f'user{rng.randrange(user_count)}' for _ in range(queries)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        elapsed = min(timeit.repeat(lambda: [task_manager.login_user(name, 'password') for name in names],
+                                    number=1, repeat=repeat))
+    return elapsed / queries
+
+
+class DictTask:
+    """Задача с __dict__ и без интернирования - как Task до перехода на __slots__"""
+
+    def __init__(self, task_id, title, description, status, deadline, priority):
+        self.task_id = task_id
+        self.title = title
+        self.description = description
+        self.status = status
+        self.deadline_date = date.fromisoformat(deadline)
+        self.priority = priority
+
+
+def bench_memory(task_count):
+    """Байт на задачу у пользователя (вместе с индексами): объекты с __dict__,
+    Task со __slots__ и столбцы ColumnarUser.
+
+    Задачи строятся из разобранного JSON, как при загрузке файла, поэтому у каждой
+    задачи свои строки статуса и приоритета.
+    """
+    text = json.dumps([[task_id, f'Task {task_id}', 'Description', 'in progress', '2030-01-01',
+                        'high' if task_id % 10 == 0 else 'low'] for task_id in range(task_count)])
+
+    def build(user_class, task_class):
+        user = user_class('user', 'password')
+        for row in json.loads(text):
+            user.add_task(task_class(*row))
+        return user
+
+    results = {}
+    for name, user_class, task_class in (('dict', User, DictTask), ('slots', User, Task),
+                                         ('columnar', ColumnarUser, Task)):
+        tracemalloc.start()
+        user = build(user_class, task_class)
+        # Разобранный JSON к этому моменту освобожден, учитывается только то, что удерживает пользователь
+        results[name] = tracemalloc.get_traced_memory()[0] / task_count
+        tracemalloc.stop()
+        del user
+    return results
+
+
+def bench_columnar_scan(task_count, repeat):
+    """Подсчет просроченных задач: проход по объектам Task против прохода по столбцу сроков"""
+    tasks = make_manager(task_count).logged_in_user.tasks
+    user = ColumnarUser('user', 'password')
+    user.tasks = tasks
+    today = date.today()
+    objects = min(timeit.repeat(lambda: sum(task.check_overdue(today) for task in tasks), number=1, repeat=repeat))
+    columnar = min(timeit.repeat(lambda: user.count_overdue(today), number=1, repeat=repeat))
+    return objects, columnar
+
+
+def bench_tree(task_count, subtree_size, repeat):
+    """Все подзадачи задачи: индекс родитель -> дети против прохода по списку задач на каждом уровне"""
+    task_manager = make_manager(task_count)
+    # Двоичное дерево подзадач под задачей 1
+    for i in range(1, subtree_size + 1):
+        task_manager.add_task(Subtask(task_count + i, 'Subtask', 'Description', 'pending', '', 'low',
+                                      1 if i <= 2 else task_count + i // 2))
+    tasks = task_manager.logged_in_user.tasks
+
+    def scan():
+        result, level = [], [1]
+        while level:
+            parents = set(level)
+            level = [task.task_id for task in tasks if getattr(task, 'parent_task_id', None) in parents]
+            result.extend(level)
+        return result
+
+    indexed = min(timeit.repeat(lambda: task_manager.get_subtasks(1, recursive=True), number=10, repeat=repeat)) / 10
+    full_scan = min(timeit.repeat(scan, number=1, repeat=repeat))
+    return indexed, full_scan
+
+
+def bench_concurrency(thread_count, operations, journal=False):
+    """Операций в секунду у ConcurrentTaskManager: thread_count потоков, у каждого свой пользователь.
+
+    Операция - добавление задачи, смена статуса и отчет; journal=True - с журналом без fsync.
+    """
+    manager = ConcurrentTaskManager()
+    with tempfile.TemporaryDirectory() as directory:
+        if journal:
+            manager.manager.enable_journal(os.path.join(directory, 'tasks.journal'), fsync_every=0)
+        sessions = []
+        for i in range(thread_count):
+            manager.register_user(f'user{i}', 'password')
+            sessions.append(manager.login(f'user{i}', 'password'))
+        start = threading.Barrier(thread_count + 1)
+
+        def work(session):
+            start.wait()
+            for task_id in range(operations):
+                manager.add_task(session, Task(task_id, 'Task', 'Description', 'pending', '2030-01-01', 'low'))
+                manager.update_task_status(session, task_id, 'completed')
+                manager.generate_report(session)
+
+        threads = [threading.Thread(target=work, args=(session,)) for session in sessions]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        began = timeit.default_timer()
+        for thread in threads:
+            thread.join()
+        elapsed = timeit.default_timer() - began
+        manager.manager.close_journal()
+    return thread_count * operations * 3 / elapsed
+
+
+def bench_auth(user_count, queries, processes):
+    """Вход с PBKDF2 (PASSWORD_ITERATIONS итераций) против проверки токена сессии
+    и проверка пачек паролей последовательно против пула процессов - для выбора POOL_MIN_BATCH"""
+    manager = ConcurrentTaskManager(TaskManager())
+    manager.register_user('user0', 'password')
+    login = timeit.timeit(lambda: manager.login('user0', 'password'), number=3) / 3
+    session = manager.login('user0', 'password')
+    token = timeit.timeit(lambda: manager._sessions.get(session), number=queries) / queries
+    password_hash = manager.manager.get_user_by_username('user0').password
+    batches = {}
+    for size in sorted({8, POOL_MIN_BATCH, user_count}):
+        pairs = [('password', password_hash)] * size
+        batches[size] = (timeit.timeit(lambda: verify_many(pairs, processes=1), number=1),
+                         timeit.timeit(lambda: verify_many(pairs, processes, min_batch=0), number=1))
+    return login, token, batches
+
+
+def bench_bulk(task_count, batch_size):
+    """Перенос task_count задач: add_task по одной против add_tasks, экспорт и импорт CSV и JSONL"""
+    def make_tasks():
+        return (Task(None, f'Task {i}', 'Description', 'pending', f'2030-01-{i % 28 + 1:02d}', 'low')
+                for i in range(task_count))
+
+    def one_by_one():
+        task_manager = make_manager(0)
+        for task_id, task in enumerate(make_tasks(), 1):
+            task.task_id = task_id
+            task_manager.add_task(task)
+
+    results = {'add_task': timeit.timeit(one_by_one, number=1)}
+    source = make_manager(0)
+    results['add_tasks'] = timeit.timeit(lambda: source.add_tasks(make_tasks(), batch_size), number=1)
+    with tempfile.TemporaryDirectory() as directory:
+        for extension in ('csv', 'jsonl'):
+            file_name = os.path.join(directory, f'tasks.{extension}')
+            results[f'export {extension}'] = timeit.timeit(
+                lambda: source.export_tasks(file_name, batch_size=batch_size), number=1)
+            target = make_manager(0)
+            results[f'import {extension}'] = timeit.timeit(
+                lambda: target.import_tasks(file_name, batch_size), number=1)
+    return results
+
+
+def bench_global_report(user_count, tasks_per_user, processes, repeat):
+    """Сводный отчет по пользователям из JSONL, задачи которых не загружены: один процесс против пула
+    для числа пользователей от user_count / 100 до user_count - точка безубыточности пула для
+    GLOBAL_REPORT_POOL_MIN_TASKS. Возвращает отчет по загруженным пользователям и {задач: (1 процесс, пул)}"""
+    task_manager = TaskManager()
+    for i in range(user_count):
+        user = User(f'user{i}', 'password')
+        user.add_tasks(Task(task_id, f'Task {task_id}', 'Description', 'pending', '2000-01-01', 'low')
+                       for task_id in range(1, tasks_per_user + 1))
+        task_manager._users[user.username] = user
+    loaded_users = timeit.timeit(task_manager.generate_global_report, number=1)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()):
+        for count in sorted({max(2, user_count // 100), max(2, user_count // 10), user_count}):
+            file_name = os.path.join(directory, f'tasks{count}.jsonl')
+            write_jsonl(file_name, ((user.username, user.password, [task.to_dict() for task in user.tasks])
+                                    for user in task_manager.users[:count]))
+            loaded = TaskManager()
+            loaded.load_tasks_from_jsonl(file_name)
+
+            def measure(process_count):
+                return min(timeit.repeat(lambda: loaded.generate_global_report(process_count, pool_min_tasks=0),
+                                         number=1, repeat=repeat))
+
+            results[count * tasks_per_user] = (measure(1), measure(processes))
+    return loaded_users, results
+
+
+def bench_sqlite(task_count, queries, repeat):
+    """Запросы к SQLiteStorage (задачи не загружены в память) против загрузки задач и индексов User"""
+    source = make_manager(task_count)
+    rng = random.Random(0)
+    ids = [rng.randint(1, task_count) for _ in range(queries)]
+    results = {}
+    with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()):
+        db_file = os.path.join(directory, 'tasks.db')
+        storage = SQLiteStorage(db_file)
+        storage.import_users(source.users)
+        storage.close()
+        task_manager = TaskManager(SQLiteStorage(db_file))
+        task_manager.login_user('user0', 'password')
+        results['get_task_by_id'] = min(timeit.repeat(lambda: [task_manager.get_task_by_id(i) for i in ids],
+                                                      number=1, repeat=repeat)) / queries
+        results['generate_report'] = min(timeit.repeat(task_manager.generate_report, number=10, repeat=repeat)) / 10
+        results['update_task_status'] = timeit.timeit(lambda: [task_manager.update_task_status(i, 'completed')
+                                                               for i in ids], number=1) / queries
+        results['load into memory'] = timeit.timeit(task_manager.logged_in_user.load_tasks, number=1)
+        task_manager.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки TaskManager")
+    parser.add_argument('-n', '--tasks', type=int, default=100_000)
+    parser.add_argument('-u', '--users', type=int, default=10_000)
+    parser.add_argument('-q', '--queries', type=int, default=1000)
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    parser.add_argument('--fsync-every', type=int, default=100)
+    parser.add_argument('--load-users', type=int, default=1000)
+    parser.add_argument('--load-tasks', type=int, default=50, help="задач на пользователя при загрузке")
+    parser.add_argument('--auth-users', type=int, default=32)
+    parser.add_argument('--bulk-tasks', type=int, default=200_000)
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    parser.add_argument('--processes', type=int, help="процессов для login_many (по умолчанию - число ядер)")
+    args = parser.parse_args()
+
+    indexed, scan = bench_lookup(args.tasks, args.queries, args.repeat)
+    print(f"get_task_by_id ({args.tasks} tasks): index {indexed * 1e9:.0f} ns, "
+          f"linear scan {scan * 1e9:.0f} ns")
+    print(f"remove_task ({args.tasks} tasks): {bench_remove(args.tasks, args.queries) * 1e9:.0f} ns")
+    indexed, scan = bench_report(args.tasks, args.repeat)
+    print(f"generate_report ({args.tasks} tasks): indexes {indexed * 1e6:.1f} us, "
+          f"full scan {scan * 1e6:.1f} us")
+    full, journal = bench_persistence(args.tasks, args.queries, args.fsync_every)
+    print(f"update + persist ({args.tasks} tasks): full snapshot {full * 1e3:.1f} ms, "
+          f"journal {journal * 1e6:.1f} us (fsync every {args.fsync_every})")
+    loading = bench_loading(args.load_users, args.load_tasks)
+    print(f"loading ({args.load_users} users x {args.load_tasks} tasks, {loading.pop('file size') / 1e6:.1f} MB):")
+    for name, (elapsed, peak) in loading.items():
+        print(f"  {name}: {elapsed * 1e3:.0f} ms, peak {peak / 1e6:.1f} MB")
+    memory = bench_memory(args.tasks)
+    print(f"memory per task ({args.tasks} tasks): " + ", ".join(f"{name} {size:.0f} B" for name, size in memory.items()))
+    objects, columnar = bench_columnar_scan(args.tasks, args.repeat)
+    print(f"overdue scan ({args.tasks} tasks): objects {objects * 1e3:.1f} ms, columnar {columnar * 1e3:.1f} ms")
+    indexed, scan = bench_tree(args.tasks, 100, args.repeat)
+    print(f"subtree of 100 tasks ({args.tasks} tasks): index {indexed * 1e6:.1f} us, "
+          f"scan per level {scan * 1e3:.1f} ms")
+    for threads in (1, 4, 16):
+        for journal in (False, True):
+            rate = bench_concurrency(threads, args.queries * 10 // threads, journal)
+            print(f"ConcurrentTaskManager, {threads} threads{' + journal' if journal else ''}: {rate:,.0f} ops/s")
+    login, token, batches = bench_auth(args.auth_users, args.queries, args.processes)
+    print(f"login with PBKDF2: {login * 1e3:.1f} ms, session token check: {token * 1e9:.0f} ns")
+    print(f"verify_many (pool from {POOL_MIN_BATCH} passwords):")
+    for size, (sequential, parallel) in batches.items():
+        print(f"  {size} passwords: sequential {sequential:.2f} s, "
+              f"{args.processes or os.cpu_count()} processes {parallel:.2f} s")
+    print(f"bulk ({args.bulk_tasks} tasks, batches of {args.batch_size}):")
+    for name, elapsed in bench_bulk(args.bulk_tasks, args.batch_size).items():
+        print(f"  {name}: {elapsed:.2f} s")
+    loaded_users, results = bench_global_report(args.load_users, args.load_tasks * 10, args.processes, args.repeat)
+    print(f"global report ({args.load_users} users x {args.load_tasks * 10} tasks): loaded users "
+          f"{loaded_users * 1e3:.1f} ms; users from JSONL (pool from {GLOBAL_REPORT_POOL_MIN_TASKS} tasks):")
+    for task_count, (serial, pool) in results.items():
+        print(f"  {task_count} tasks: 1 process {serial * 1e3:.1f} ms, "
+              f"{args.processes or os.cpu_count()} processes {pool * 1e3:.1f} ms")
+    print(f"SQLite storage ({args.tasks} tasks):")
+    for name, elapsed in bench_sqlite(args.tasks, args.queries, args.repeat).items():
+        print(f"  {name}: {elapsed * 1e6:.1f} us")
+    print(f"login_user ({args.users} users): {bench_login(args.users, args.queries, args.repeat) * 1e9:.0f} ns")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""Клиент и генератор нагрузки для Task2_server.
+
+    python -m Task2_client --port 8765 --clients 100 --requests 1000 --depth 8
+    python -m Task2_client --local --clients 1000
+
+--local запускает сервер в том же процессе на свободном порту.
+Печатает пропускную способность и перцентили задержки запросов.
+"""
+import asyncio
+import itertools
+import json
+import statistics
+import time
+
+
+class RequestError(Exception):
+    """Сервер ответил ошибкой"""
+
+
+class TaskClient:
+    """Соединение с Task2_server. request() можно вызывать из нескольких задач сразу:
+    запросы отправляются конвейером, ответы сопоставляются с запросами по id.
+    """
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._receiver = asyncio.create_task(self._receive())
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=8765, path=None):
+        if path:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def request(self, op, **fields):
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self._writer.write(json.dumps({'id': request_id, 'op': op, **fields}).encode() + b'\n')
+        await self._writer.drain()
+        response = await future
+        if not response['ok']:
+            raise RequestError(response['error'])
+        return response['result']
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+        self._receiver.cancel()
+
+    async def _receive(self):
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                future = self._pending.pop(response['id'], None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Connection closed"))
+            self._pending.clear()
+
+
+async def run_client(client_id, requests, depth, latencies, host, port, path):
+    """Один клиент: регистрация, вход и requests запросов, не более depth одновременно"""
+    client = await TaskClient.connect(host, port, path)
+    username = f'load{client_id}'
+    await client.request('register', username=username, password='password')
+    session = await client.request('login', username=username, password='password')
+    semaphore = asyncio.Semaphore(depth)
+
+    async def timed(op, **fields):
+        async with semaphore:
+            start = time.perf_counter()
+            await client.request(op, session=session, **fields)
+            latencies.append(time.perf_counter() - start)
+
+    # Смесь операций: добавление, изменение статуса, чтение задачи и отчет
+    operations = []
+    for i in range(requests):
+        task_id = client_id * requests + i // 4
+        kind = i % 4
+        if kind == 0:
+            operations.append(timed('add_task', task={'task_id': task_id, 'title': 'Task', 'description': '',
+                                                      'status': 'pending', 'deadline': '2030-01-01',
+                                                      'priority': 'low'}))
+        elif kind == 1:
+            operations.append(timed('update_task', task_id=task_id, field='status', value='completed'))
+        elif kind == 2:
+            operations.append(timed('get_task', task_id=task_id))
+        else:
+            operations.append(timed('report'))
+    # Запросы уходят в порядке создания (семафор пропускает ожидающих по очереди), а сервер выполняет
+    # запросы соединения по порядку, поэтому изменение задачи приходит после ее добавления
+    await asyncio.gather(*operations)
+    await client.close()
+
+
+async def run_load(clients, requests, depth, host='127.0.0.1', port=8765, path=None, local=False):
+    """Нагрузка от clients соединений; возвращает (время, список задержек)"""
+    server = None
+    if local:
+        from Task2_server import TaskServer
+        server = await TaskServer().start(host, 0, path)
+        if not path:
+            port = server.sockets[0].getsockname()[1]
+    latencies = []
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(run_client(i, requests, depth, latencies, host, port, path) for i in range(clients)))
+    finally:
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+    return time.perf_counter() - start, latencies
+
+
+def report(elapsed, latencies):
+    print(f"{len(latencies)} requests in {elapsed:.2f} s: {len(latencies) / elapsed:,.0f} req/s")
+    if len(latencies) < 2:
+        # Перцентили считаются минимум по двум задержкам
+        if latencies:
+            print(f"latency {latencies[0] * 1e3:.2f} ms")
+        return
+    cuts = statistics.quantiles(latencies, n=100)
+    print(f"latency p50 {cuts[49] * 1e3:.2f} ms, p90 {cuts[89] * 1e3:.2f} ms, "
+          f"p99 {cuts[98] * 1e3:.2f} ms, max {max(latencies) * 1e3:.2f} ms")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Генератор нагрузки для Task2_server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help="путь к unix-сокету сервера")
+    parser.add_argument('--local', action='store_true', help="запустить сервер в этом же процессе")
+    parser.add_argument('-c', '--clients', type=int, default=100)
+    parser.add_argument('-n', '--requests', type=int, default=1000, help="запросов на клиента")
+    parser.add_argument('-d', '--depth', type=int, default=8, help="запросов в конвейере одного клиента")
+    args = parser.parse_args(argv)
+    elapsed, latencies = asyncio.run(run_load(args.clients, args.requests, args.depth,
+                                              args.host, args.port, args.unix, args.local))
+    report(elapsed, latencies)
+
+
+if __name__ == '__main__':
+    main()
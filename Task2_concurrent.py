@@ -0,0 +1,192 @@
+import contextlib
+import threading
+
+from Task2_Task_Manager import TaskManager
+from Task2_auth import SessionCache, hash_password, needs_rehash, verify_many, verify_password
+
+
+class ConcurrentTaskManager:
+    """Потокобезопасный доступ к TaskManager для многих пользователей одновременно.
+
+    Вместо logged_in_user операции получают явный токен сессии из login(); токен живет
+    session_ttl секунд с последнего обращения и проверяется без пересчета хэша пароля.
+    У каждого пользователя своя блокировка, поэтому изменения задач разных
+    пользователей не ждут друг друга; общие журнал и хранилище защищены отдельной
+    блокировкой. Задачи пользователя загружаются в память при первом обращении.
+    Сжатие журнала (compact_every) выполняется после освобождения блокировки
+    пользователя, когда захвачены блокировки всех пользователей.
+    """
+
+    def __init__(self, task_manager=None, session_ttl=3600):
+        self.manager = task_manager or TaskManager()
+        # Регистрация и создание блокировок пользователей
+        self._users_lock = threading.Lock()
+        self._user_locks = {}
+        # Журнал и хранилище общие для всех пользователей
+        self._storage_lock = threading.Lock()
+        self._sessions = SessionCache(session_ttl)
+
+    def register_user(self, username, password):
+        if self.manager.get_user_by_username(username):
+            return False
+        # Хэш считается до захвата блокировки, чтобы не задерживать другие регистрации
+        password_hash = hash_password(password, self.manager.password_iterations)
+        with self._users_lock:
+            if not self.manager.add_user(username, password_hash, self._storage_lock):
+                return False
+        self._maybe_compact()
+        return True
+
+    def login(self, username, password):
+        """Токен новой сессии или None при неверном имени или пароле"""
+        user = self.manager.get_user_by_username(username)
+        if user is None or not verify_password(password, user.password):
+            return None
+        self._upgrade_password(user, password)
+        return self._sessions.create(username)
+
+    def login_many(self, credentials, processes=None):
+        """Вход многих пользователей сразу: пароли проверяются verify_many (в пуле процессов от POOL_MIN_BATCH).
+        credentials - пары (имя, пароль); возвращает токены или None в том же порядке.
+        """
+        credentials = list(credentials)
+        users = [self.manager.get_user_by_username(username) for username, _ in credentials]
+        pairs = [(password, user.password if user else None) for user, (_, password) in zip(users, credentials)]
+        sessions = []
+        for user, (_, password), valid in zip(users, credentials, verify_many(pairs, processes)):
+            if valid:
+                self._upgrade_password(user, password)
+                sessions.append(self._sessions.create(user.username))
+            else:
+                sessions.append(None)
+        return sessions
+
+    def logout(self, session):
+        return self._sessions.remove(session)
+
+    def add_task(self, session, task):
+        user = self._user(session)
+        with self._lock(user):
+            self._load(user)
+            if not user.add_task(task):
+                return False
+            self._log('add_task', username=user.username, task=task.to_dict())
+        self._maybe_compact()
+        return True
+
+    def remove_task(self, session, task_id):
+        user = self._user(session)
+        with self._lock(user):
+            self._load(user)
+            if user.remove_task(task_id) is None:
+                return False
+            self._log('remove_task', username=user.username, task_id=task_id)
+        self._maybe_compact()
+        return True
+
+    def get_task(self, session, task_id):
+        user = self._user(session)
+        with self._lock(user):
+            self._load(user)
+            return user.get_task(task_id)
+
+    def get_tasks(self, session):
+        user = self._user(session)
+        with self._lock(user):
+            self._load(user)
+            return user.tasks
+
+    def update_task_status(self, session, task_id, new_status):
+        return self._update_task(session, 'status', task_id, new_status)
+
+    def update_task_priority(self, session, task_id, new_priority):
+        return self._update_task(session, 'priority', task_id, new_priority)
+
+    def update_task_title(self, session, task_id, new_title):
+        return self._update_task(session, 'title', task_id, new_title)
+
+    def update_task_description(self, session, task_id, new_description):
+        return self._update_task(session, 'description', task_id, new_description)
+
+    def update_task_deadline(self, session, task_id, new_deadline):
+        return self._update_task(session, 'deadline', task_id, new_deadline)
+
+    def check_overdue_tasks(self, session):
+        user = self._user(session)
+        with self._lock(user):
+            self._load(user)
+            return user.overdue_tasks()
+
+    def generate_report(self, session):
+        user = self._user(session)
+        with self._lock(user):
+            self._load(user)
+            return user.report()
+
+    def compact(self, file_name=None):
+        """Снимок всех пользователей и очистка журнала"""
+        with self._all_locks():
+            self.manager.compact(file_name)
+
+    def _update_task(self, session, field, task_id, value):
+        user = self._user(session)
+        with self._lock(user):
+            self._load(user)
+            if not getattr(user, 'update_task_' + field)(task_id, value):
+                return False
+            self._log('update_task', username=user.username, task_id=task_id, field=field,
+                      value=getattr(user.get_task(task_id), field))
+        self._maybe_compact()
+        return True
+
+    def _upgrade_password(self, user, password):
+        iterations = self.manager.password_iterations
+        if needs_rehash(user.password, iterations):
+            password_hash = hash_password(password, iterations)
+            with self._lock(user):
+                user.password = password_hash
+                self._log('set_password', username=user.username, password=password_hash)
+
+    def _user(self, session):
+        username = self._sessions.get(session)
+        if username is None:
+            raise PermissionError("Invalid session")
+        return self.manager.get_user_by_username(username)
+
+    def _lock(self, user):
+        lock = self._user_locks.get(user.username)
+        if lock is None:
+            # setdefault выполняется атомарно: два потока получат одну и ту же блокировку
+            lock = self._user_locks.setdefault(user.username, threading.Lock())
+        return lock
+
+    def _load(self, user):
+        # Загрузка читает хранилище, поэтому выполняется под его блокировкой
+        if not user.tasks_loaded:
+            with self._storage_lock:
+                user.load_tasks()
+
+    def _log(self, op, **fields):
+        # Сжатие - не здесь, а в _maybe_compact после освобождения блокировки пользователя
+        self.manager.record_change(op, self._storage_lock, **fields)
+
+    def _maybe_compact(self):
+        if self.manager.compaction_due():
+            with self._all_locks():
+                # Пока ждали блокировок, журнал мог сжать другой поток
+                if self.manager.compaction_due():
+                    self.manager.compact()
+
+    @contextlib.contextmanager
+    def _all_locks(self):
+        # Порядок захвата: регистрация, пользователи по имени, хранилище - как и в остальных операциях
+        with self._users_lock:
+            locks = [self._lock(user) for user in sorted(self.manager.users, key=lambda user: user.username)]
+            for lock in locks:
+                lock.acquire()
+            try:
+                with self._storage_lock:
+                    yield
+            finally:
+                for lock in reversed(locks):
+                    lock.release()
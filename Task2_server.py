@@ -0,0 +1,209 @@
+"""Сервер TaskManager на asyncio.
+
+Протокол: по одному JSON-объекту на строку в обе стороны. Запрос содержит id, op и
+параметры операции, ответ - тот же id и ok с result или error:
+
+    {"id": 1, "op": "login", "username": "alice", "password": "secret"}
+    {"id": 1, "ok": true, "result": "<токен сессии>"}
+
+Клиент может отправлять запросы, не дожидаясь ответов (конвейер); ответы
+приходят в порядке запросов. Операции: register, login, logout, add_task,
+update_task, remove_task, get_task, report, overdue.
+
+    python -m Task2_server --port 8765 --snapshot tasks.json --journal tasks.journal
+
+Нагрузочный клиент - Task2_client.py.
+"""
+import asyncio
+import contextlib
+import functools
+import json
+import os
+
+from Task2_Task_Manager import Task, TaskManager
+from Task2_concurrent import ConcurrentTaskManager
+
+# Сколько байт ответов можно накопить в буфере соединения, прежде чем ждать отправки
+WRITE_BUFFER_LIMIT = 1 << 16
+
+
+def _string(request, field):
+    value = request[field]
+    if not isinstance(value, str):
+        raise TypeError(f"{field} must be a string")
+    return value
+
+
+def _register(manager, request):
+    return manager.register_user(_string(request, 'username'), _string(request, 'password'))
+
+
+def _login(manager, request):
+    session = manager.login(_string(request, 'username'), _string(request, 'password'))
+    if session is None:
+        raise PermissionError("Invalid username or password")
+    return session
+
+
+def _logout(manager, request):
+    return manager.logout(request['session'])
+
+
+def _add_task(manager, request):
+    if not isinstance(request['task'], dict):
+        raise TypeError("task must be an object")
+    task_data = dict(request['task'])
+    task_data.setdefault('type', 'Task')
+    task_data.setdefault('parent_task_id', None)
+    return manager.add_task(request['session'], Task.from_dict(task_data))
+
+
+def _update_task(manager, request):
+    field = request['field']
+    if field not in ('status', 'priority', 'title', 'description', 'deadline'):
+        raise ValueError(f"Unknown field: {field}")
+    return getattr(manager, 'update_task_' + field)(request['session'], request['task_id'], request['value'])
+
+
+def _remove_task(manager, request):
+    return manager.remove_task(request['session'], request['task_id'])
+
+
+def _get_task(manager, request):
+    task = manager.get_task(request['session'], request['task_id'])
+    return task.to_dict() if task else None
+
+
+def _report(manager, request):
+    return manager.generate_report(request['session'])
+
+
+def _overdue(manager, request):
+    return [task.to_dict() for task in manager.check_overdue_tasks(request['session'])]
+
+
+# Операции, которые не ждут блокировок пользователей, диска и хэширования пароля, - выполняются
+# в цикле событий; остальные (блокировка пользователя, загрузка задач, журнал, хранилище, PBKDF2) - в пуле потоков
+_INLINE_OPERATIONS = {'logout'}
+
+OPERATIONS = {
+    'register': _register,
+    'login': _login,
+    'logout': _logout,
+    'add_task': _add_task,
+    'update_task': _update_task,
+    'remove_task': _remove_task,
+    'get_task': _get_task,
+    'report': _report,
+    'overdue': _overdue,
+}
+
+
+class TaskServer:
+    """Обработка соединений: запросы соединения выполняются по порядку, ответы отправляются без ожидания.
+
+    Операции, которые могут ждать (блокировку пользователя в ConcurrentTaskManager, запись на диск,
+    хэширование пароля), выполняются в пуле потоков независимо от того, есть ли журнал или хранилище:
+    занятая блокировка одного пользователя не останавливает цикл событий и другие соединения.
+    """
+
+    def __init__(self, manager=None):
+        self.manager = manager or ConcurrentTaskManager()
+
+    async def handle(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = await self.execute(loop, line)
+                try:
+                    data = json.dumps(response).encode()
+                except (TypeError, ValueError) as error:
+                    # Результат операции не сериализуется в JSON - клиент получает ошибку, а не обрыв соединения
+                    data = json.dumps({'id': response['id'], 'ok': False,
+                                       'error': f'{type(error).__name__}: {error}'}).encode()
+                writer.write(data + b'\n')
+                # Ожидание отправки только при переполнении буфера: конвейер запросов не ждет клиента
+                if writer.transport.get_write_buffer_size() > WRITE_BUFFER_LIMIT:
+                    await writer.drain()
+        except (ConnectionError, ValueError):
+            # ValueError - строка запроса длиннее лимита StreamReader
+            pass
+        finally:
+            writer.close()
+            # Без ожидания закрытия транспорт остается открытым ("unclosed transport")
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def execute(self, loop, line):
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+            request_id = request.get('id')
+            op = request.get('op')
+            operation = OPERATIONS.get(op)
+            if operation is None:
+                raise ValueError(f"Unknown operation: {op}")
+            if op in _INLINE_OPERATIONS:
+                result = operation(self.manager, request)
+            else:
+                result = await loop.run_in_executor(None, functools.partial(operation, self.manager, request))
+        except Exception as error:
+            # Ошибка запроса (KeyError, TypeError, ValueError, PermissionError) или самой операции -
+            # ответ с ошибкой, соединение остается открытым
+            return {'id': request_id, 'ok': False, 'error': f'{type(error).__name__}: {error}'}
+        return {'id': request_id, 'ok': True, 'result': result}
+
+    async def start(self, host='127.0.0.1', port=8765, path=None):
+        """Запуск сервера на TCP-порту или (path) на unix-сокете"""
+        if path:
+            return await asyncio.start_unix_server(self.handle, path)
+        return await asyncio.start_server(self.handle, host, port)
+
+
+async def serve(manager, host='127.0.0.1', port=8765, path=None):
+    server = await TaskServer(manager).start(host, port, path)
+    async with server:
+        print(f"Serving on {path or f'{host}:{port}'}")
+        await server.serve_forever()
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Сервер TaskManager (JSON по строкам)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help="путь к unix-сокету вместо TCP")
+    parser.add_argument('--snapshot', default='tasks.json',
+                        help="снимок (JSON или .jsonl): загружается при старте и сохраняется при остановке")
+    parser.add_argument('--journal', help="журнал изменений, в который каждое изменение пишется сразу")
+    parser.add_argument('--fsync-every', type=int, default=1)
+    parser.add_argument('--compact-every', type=int)
+    args = parser.parse_args(argv)
+
+    task_manager = TaskManager()
+    if args.snapshot.endswith('.jsonl'):
+        task_manager.load_tasks_from_jsonl(args.snapshot, args.journal)
+    else:
+        task_manager.load_tasks_from_file(args.snapshot, args.journal)
+    if args.journal:
+        task_manager.enable_journal(args.journal, args.snapshot, args.fsync_every, args.compact_every)
+    manager = ConcurrentTaskManager(task_manager)
+    try:
+        asyncio.run(serve(manager, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        manager.compact(args.snapshot)
+        task_manager.close_journal()
+        if args.unix and os.path.exists(args.unix):
+            os.remove(args.unix)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,576 @@
+import csv
+import itertools
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+
+
+class TaskJournal:
+    """Журнал изменений TaskManager: одна JSON-запись на строку, запись только в конец файла.
+
+    Первая строка - заголовок с номером поколения. Снимок (tasks.json) хранит номер
+    поколения журнала, изменения из которого в него уже вошли, поэтому после сбоя
+    во время сжатия устаревший журнал не применяется повторно.
+    fsync_every - через сколько записей сбрасывать данные на диск (0 - только при flush/close).
+    """
+
+    def __init__(self, file_name, fsync_every=1):
+        self.file_name = file_name
+        self.fsync_every = fsync_every
+        self.generation = 0
+        self.records = 0
+        self._pending = 0
+        if os.path.exists(file_name):
+            _truncate_torn_tail(file_name)
+        if os.path.exists(file_name) and os.path.getsize(file_name) > 0:
+            for record in self.read(file_name):
+                if record['op'] == 'header':
+                    self.generation = record['generation']
+                else:
+                    self.records += 1
+            self._file = open(file_name, 'a', encoding='utf-8')
+        else:
+            self._file = None
+            self.reset(0)
+
+    def append(self, op, **fields):
+        fields['op'] = op
+        self._file.write(json.dumps(fields) + '\n')
+        self.records += 1
+        self._pending += 1
+        if self.fsync_every and self._pending >= self.fsync_every:
+            self.flush()
+
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+    def reset(self, generation):
+        """Начать пустой журнал нового поколения (после сохранения снимка)"""
+        if self._file is not None:
+            self._file.close()
+        temp_name = self.file_name + '.tmp'
+        with open(temp_name, 'w', encoding='utf-8') as file:
+            file.write(json.dumps({'op': 'header', 'generation': generation}) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_name, self.file_name)
+        self._file = open(self.file_name, 'a', encoding='utf-8')
+        self.generation = generation
+        self.records = 0
+        self._pending = 0
+
+    @staticmethod
+    def read(file_name):
+        """Записи журнала по порядку; недописанная последняя строка (сбой во время записи) пропускается"""
+        with open(file_name, 'r', encoding='utf-8') as file:
+            for line in file:
+                if not line.endswith('\n'):
+                    break
+                yield json.loads(line)
+
+
+def _truncate_torn_tail(file_name, block_size=4096):
+    """Отрезает недописанную последнюю строку, чтобы новые записи начинались с новой строки"""
+    with open(file_name, 'rb+') as file:
+        end = file.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - block_size)
+            file.seek(start)
+            block = file.read(position - start)
+            newline = block.rfind(b'\n')
+            if newline != -1:
+                position = start + newline + 1
+                break
+            position = start
+        if position != end:
+            file.truncate(position)
+
+
+def iter_json_users(file_name, metadata=None, chunk_size=1 << 16):
+    """Потоковое чтение tasks.json: пользователи массива users по одному.
+
+    Файл читается блоками, поэтому в памяти одновременно находится только
+    текущий пользователь с его задачами, а не весь документ.
+    Остальные ключи верхнего уровня (например, journal_generation) попадают в metadata.
+    """
+    with open(file_name, 'r', encoding='utf-8') as file:
+        stream = _JsonStream(file, chunk_size)
+        stream.expect('{')
+        if stream.skip_if('}'):
+            return
+        while True:
+            key = stream.decode()
+            stream.expect(':')
+            if key == 'users':
+                stream.expect('[')
+                if not stream.skip_if(']'):
+                    while True:
+                        yield stream.decode()
+                        if stream.skip_if(']'):
+                            break
+                        stream.expect(',')
+            else:
+                value = stream.decode()
+                if metadata is not None:
+                    metadata[key] = value
+            if stream.skip_if('}'):
+                return
+            stream.expect(',')
+
+
+class _JsonStream:
+    """Буфер для разбора JSON по частям с помощью JSONDecoder.raw_decode"""
+
+    def __init__(self, file, chunk_size):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+
+    def _read_more(self):
+        # Размер блока растет вместе с буфером, чтобы большой объект не разбирался заново слишком часто
+        chunk = self.file.read(max(self.chunk_size, len(self.buffer) - self.pos))
+        if not chunk:
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _skip_whitespace(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._read_more():
+                return
+
+    def skip_if(self, char):
+        self._skip_whitespace()
+        if self.buffer.startswith(char, self.pos):
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, char):
+        if not self.skip_if(char):
+            raise ValueError(f"Invalid tasks file: expected {char!r}")
+
+    def decode(self):
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._read_more():
+                    raise
+                continue
+            # Число в конце буфера могло быть прочитано не полностью
+            if end == len(self.buffer) and self._read_more():
+                continue
+            self.pos = end
+            return value
+
+
+def write_json(file_name, users, metadata=None):
+    """Запись в формате tasks.json ({"users": [...]}) по одному пользователю.
+
+    users - последовательность (username, password, список словарей задач).
+    Файл записывается во временный и затем атомарно подменяется.
+    """
+    temp_name = file_name + '.tmp'
+    with open(temp_name, 'w', encoding='utf-8') as file:
+        file.write('{"users": [')
+        for i, (username, password, tasks) in enumerate(users):
+            if i:
+                file.write(', ')
+            file.write(json.dumps({'username': username, 'password': password, 'tasks': tasks}))
+        file.write(']')
+        for key, value in (metadata or {}).items():
+            file.write(f', {json.dumps(key)}: {json.dumps(value)}')
+        file.write('}')
+    os.replace(temp_name, file_name)
+
+
+def write_jsonl(file_name, users, metadata=None):
+    """Запись в формате JSONL: строка метаданных, затем для каждого пользователя
+    строка-заголовок с числом задач и по одной строке на задачу.
+
+    users - последовательность (username, password, список словарей задач).
+    Файл записывается во временный и затем атомарно подменяется.
+    """
+    temp_name = file_name + '.tmp'
+    with open(temp_name, 'w', encoding='utf-8') as file:
+        file.write(json.dumps(dict(metadata or {}, format='tasks-jsonl')) + '\n')
+        for username, password, tasks in users:
+            file.write(json.dumps({'username': username, 'password': password, 'task_count': len(tasks)}) + '\n')
+            for task_data in tasks:
+                file.write(json.dumps(task_data) + '\n')
+    os.replace(temp_name, file_name)
+
+
+def scan_jsonl(file_name):
+    """Метаданные и индекс пользователей файла JSONL без разбора их задач.
+
+    Возвращает metadata и список (username, password, смещение первой задачи, число задач).
+    """
+    users = []
+    with open(file_name, 'rb') as file:
+        metadata = json.loads(file.readline())
+        while True:
+            line = file.readline()
+            if not line:
+                break
+            header = json.loads(line)
+            offset = file.tell()
+            for _ in range(header['task_count']):
+                file.readline()
+            users.append((header['username'], header['password'], offset, header['task_count']))
+    return metadata, users
+
+
+def read_jsonl_tasks(file_name, offset, count):
+    """Словари задач одного пользователя по смещению из scan_jsonl"""
+    with open(file_name, 'rb') as file:
+        file.seek(offset)
+        return [json.loads(file.readline()) for _ in range(count)]
+
+
+def read_task_rows(file_name):
+    """Словари задач из файла CSV (заголовок - поля Task.to_dict()) или JSONL (задача на строку).
+
+    Файл читается построчно. Пустой или отсутствующий task_id означает "выдать id при добавлении" (None),
+    тип без значения определяется по parent_task_id - одинаково для обоих форматов.
+    """
+    with open(file_name, newline='', encoding='utf-8') as file:
+        if file_name.endswith('.csv'):
+            rows = csv.DictReader(file)
+        else:
+            rows = (json.loads(line) for line in file if line.strip())
+        for row in rows:
+            yield _with_defaults(row)
+
+
+def _with_defaults(row):
+    for field in ('task_id', 'parent_task_id'):
+        value = row.get(field)
+        row[field] = None if value is None or value == '' else int(value)
+    if not row.get('type'):
+        row['type'] = 'Subtask' if row['parent_task_id'] is not None else 'Task'
+    return row
+
+
+def write_task_rows(file_name, rows, batch_size=10_000):
+    """Запись словарей задач в CSV или JSONL пачками по batch_size строк; возвращает число задач.
+    Файл записывается во временный и затем атомарно подменяется.
+    """
+    rows = iter(rows)
+    count = 0
+    temp_name = file_name + '.tmp'
+    with open(temp_name, 'w', newline='', encoding='utf-8') as file:
+        if file_name.endswith('.csv'):
+            writer = csv.DictWriter(file, _TASK_COLUMNS)
+            writer.writeheader()
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                break
+            if file_name.endswith('.csv'):
+                writer.writerows(batch)
+            else:
+                file.write(''.join(json.dumps(row) + '\n' for row in batch))
+            count += len(batch)
+    os.replace(temp_name, file_name)
+    return count
+
+
+class TaskStorage(ABC):
+    """Интерфейс хранилища TaskManager.
+
+    Задачи передаются словарями в формате Task.to_dict(), поэтому хранилище
+    не зависит от классов задач. Изменения приходят через record() в том же виде,
+    что и записи журнала (register_user, set_password, add_task, add_tasks, remove_task, update_task).
+    Хранилище без всех абстрактных методов не создается (TypeError при создании объекта).
+    """
+
+    # Хранилища, которые сами выполняют запросы TaskManager, наследуют QueryStorage
+    supports_queries = False
+
+    @abstractmethod
+    def load_users(self):
+        """Пары (username, password, список словарей задач или None, если задачи читаются через load_tasks)"""
+
+    @abstractmethod
+    def load_tasks(self, username):
+        """Словари задач пользователя (любая последовательность, можно генератор)"""
+
+    @abstractmethod
+    def record(self, op, **fields):
+        """Одно изменение в формате записи журнала"""
+
+    def save(self, users):
+        """Сохранение изменений; users - текущие пользователи TaskManager"""
+
+    def close(self):
+        pass
+
+
+class QueryStorage(TaskStorage):
+    """Хранилище, которое само выполняет get_task, overdue_tasks и report:
+    TaskManager не загружает задачи пользователя в память ради этих запросов.
+    """
+
+    supports_queries = True
+
+    @abstractmethod
+    def get_task(self, username, task_id):
+        """Словарь задачи или None"""
+
+    @abstractmethod
+    def existing_task_ids(self, username, task_ids):
+        """Какие из task_ids уже есть у пользователя"""
+
+    @abstractmethod
+    def max_task_id(self, username):
+        """Наибольший task_id пользователя или None"""
+
+    @abstractmethod
+    def overdue_tasks(self, username, today):
+        """Словари задач со сроком не позже today, по возрастанию срока"""
+
+    @abstractmethod
+    def report(self, username, today):
+        """Отчет в формате TaskManager.generate_report"""
+
+
+class JsonStorage(TaskStorage):
+    """Прежний формат: один файл tasks.json (или .jsonl), который целиком пересохраняется в save().
+
+    Для записи изменений за O(1) используйте журнал TaskManager.enable_journal.
+    """
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.dirty = False
+        self._offsets = {}
+
+    def load_users(self):
+        if not os.path.exists(self.file_name):
+            return
+        if self.file_name.endswith('.jsonl'):
+            _, users = scan_jsonl(self.file_name)
+            for username, password, offset, count in users:
+                self._offsets[username] = (offset, count)
+                yield username, password, None
+        else:
+            for user_data in iter_json_users(self.file_name):
+                yield user_data['username'], user_data['password'], user_data['tasks']
+
+    def load_tasks(self, username):
+        return read_jsonl_tasks(self.file_name, *self._offsets[username])
+
+    def record(self, op, **fields):
+        self.dirty = True
+
+    def save(self, users):
+        if self.dirty:
+            write = write_jsonl if self.file_name.endswith('.jsonl') else write_json
+            write(self.file_name, ((user.username, user.password, [task.to_dict() for task in user.tasks])
+                                   for user in users))
+            self._offsets.clear()
+            self.dirty = False
+
+
+_TASK_COLUMNS = ('task_id', 'title', 'description', 'status', 'deadline', 'priority', 'type', 'parent_task_id')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    username TEXT NOT NULL REFERENCES users (username),
+    task_id INTEGER NOT NULL,
+    title TEXT,
+    description TEXT,
+    status TEXT,
+    deadline TEXT,
+    priority TEXT,
+    type TEXT NOT NULL,
+    parent_task_id INTEGER
+);
+CREATE UNIQUE INDEX IF NOT EXISTS tasks_by_id ON tasks (username, task_id);
+CREATE INDEX IF NOT EXISTS tasks_by_status ON tasks (username, status);
+CREATE INDEX IF NOT EXISTS tasks_by_priority ON tasks (username, priority);
+CREATE INDEX IF NOT EXISTS tasks_by_deadline ON tasks (username, deadline);
+"""
+
+_SELECT_TASKS = f"SELECT {', '.join(_TASK_COLUMNS)} FROM tasks"
+_INSERT_TASK = (f"INSERT INTO tasks (username, {', '.join(_TASK_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * (len(_TASK_COLUMNS) + 1))})")
+_UPDATE_TASK = {field: f"UPDATE tasks SET {field} = ? WHERE username = ? AND task_id = ?"
+                for field in ('title', 'description', 'status', 'deadline', 'priority')}
+_REPORT = """
+SELECT
+    (SELECT COUNT(*) FROM tasks WHERE username = :username),
+    (SELECT COUNT(*) FROM tasks WHERE username = :username AND status = 'completed'),
+    (SELECT COUNT(*) FROM tasks WHERE username = :username AND deadline <= :today),
+    (SELECT COUNT(*) FROM tasks WHERE username = :username AND priority = 'high')
+"""
+
+
+class SQLiteStorage(QueryStorage):
+    """Хранилище SQLite с индексами по (username, task_id), статусу, приоритету и сроку.
+
+    Соединение открывается один раз; SQL-запросы - константы модуля, поэтому
+    sqlite3 берет уже скомпилированные выражения из своего кэша.
+    Соединение общее для всех потоков, поэтому каждое обращение к нему выполняется
+    под блокировкой хранилища, в том числе чтения без блокировок вызывающего кода.
+    Сроки хранятся строками YYYY-MM-DD (NULL - без срока) и сравниваются как строки.
+    commit_every - через сколько изменений фиксировать транзакцию (0 - только в save/close).
+    """
+
+    def __init__(self, file_name, commit_every=1):
+        # sqlite3 нужен только этому хранилищу и импортируется при его создании
+        import sqlite3
+
+        self.connection = sqlite3.connect(file_name, check_same_thread=False)
+        self.connection.executescript(_SCHEMA)
+        self.commit_every = commit_every
+        self._pending = 0
+        # Повторно входимая: record вызывает commit под той же блокировкой
+        self._lock = threading.RLock()
+
+    def load_users(self):
+        with self._lock:
+            rows = self.connection.execute("SELECT username, password FROM users ORDER BY rowid").fetchall()
+        for username, password in rows:
+            yield username, password, None
+
+    def load_tasks(self, username, batch_size=1000):
+        # Строки читаются пачками по мере обхода, не загружая все задачи сразу;
+        # блокировка захватывается на чтение каждой пачки, а не на весь обход
+        with self._lock:
+            rows = self.connection.cursor().execute(_SELECT_TASKS + " WHERE username = ? ORDER BY rowid",
+                                                    (username,))
+        while True:
+            with self._lock:
+                batch = rows.fetchmany(batch_size)
+            if not batch:
+                return
+            yield from map(_task_data, batch)
+
+    def record(self, op, **fields):
+        username = fields['username']
+        with self._lock:
+            if op == 'register_user':
+                self.connection.execute("INSERT INTO users (username, password) VALUES (?, ?)",
+                                        (username, fields['password']))
+            elif op == 'set_password':
+                self.connection.execute("UPDATE users SET password = ? WHERE username = ?",
+                                        (fields['password'], username))
+            elif op == 'add_task':
+                task_data = fields['task']
+                self.connection.execute(_INSERT_TASK, (username, *_task_row(task_data)))
+            elif op == 'add_tasks':
+                self.connection.executemany(_INSERT_TASK, ((username, *_task_row(task_data))
+                                                           for task_data in fields['tasks']))
+            elif op == 'remove_task':
+                self.connection.execute("DELETE FROM tasks WHERE username = ? AND task_id = ?",
+                                        (username, fields['task_id']))
+            elif op == 'update_task':
+                value = fields['value']
+                if fields['field'] == 'deadline':
+                    value = value or None
+                self.connection.execute(_UPDATE_TASK[fields['field']], (value, username, fields['task_id']))
+            else:
+                raise ValueError(f"Unknown operation: {op}")
+            self._pending += 1
+            if self.commit_every and self._pending >= self.commit_every:
+                self.commit()
+
+    def import_users(self, users):
+        """Перенос пользователей и задач (например, загруженных из tasks.json) одной транзакцией"""
+        users = list(users)
+        with self._lock:
+            self.connection.executemany("INSERT INTO users (username, password) VALUES (?, ?)",
+                                        ((user.username, user.password) for user in users))
+            self.connection.executemany(_INSERT_TASK, ((user.username, *_task_row(task.to_dict()))
+                                                       for user in users for task in user.tasks))
+            self.commit()
+
+    def get_task(self, username, task_id):
+        with self._lock:
+            row = self.connection.execute(_SELECT_TASKS + " WHERE username = ? AND task_id = ?",
+                                          (username, task_id)).fetchone()
+        return _task_data(row) if row else None
+
+    def existing_task_ids(self, username, task_ids):
+        task_ids = list(task_ids)
+        existing = set()
+        # Не больше 500 параметров в запросе: у старых версий SQLite ограничение 999
+        for start in range(0, len(task_ids), 500):
+            chunk = task_ids[start:start + 500]
+            with self._lock:
+                rows = self.connection.execute(
+                    f"SELECT task_id FROM tasks WHERE username = ? AND task_id IN ({', '.join('?' * len(chunk))})",
+                    (username, *chunk)).fetchall()
+            existing.update(task_id for task_id, in rows)
+        return existing
+
+    def max_task_id(self, username):
+        with self._lock:
+            return self.connection.execute("SELECT MAX(task_id) FROM tasks WHERE username = ?",
+                                           (username,)).fetchone()[0]
+
+    def overdue_tasks(self, username, today):
+        with self._lock:
+            rows = self.connection.execute(_SELECT_TASKS + " WHERE username = ? AND deadline <= ? "
+                                                           "ORDER BY deadline, task_id",
+                                           (username, today.isoformat())).fetchall()
+        return [_task_data(row) for row in rows]
+
+    def report(self, username, today):
+        with self._lock:
+            total, completed, overdue, high = self.connection.execute(
+                _REPORT, {'username': username, 'today': today.isoformat()}).fetchone()
+        return {
+            'total_tasks': total,
+            'completed_tasks': completed,
+            'overdue_tasks': overdue,
+            'high_priority_tasks': high,
+        }
+
+    def commit(self):
+        with self._lock:
+            self.connection.commit()
+            self._pending = 0
+
+    def save(self, users):
+        self.commit()
+
+    def close(self):
+        with self._lock:
+            self.commit()
+            self.connection.close()
+
+
+def _task_row(task_data):
+    row = [task_data[column] for column in _TASK_COLUMNS]
+    row[_TASK_COLUMNS.index('deadline')] = task_data['deadline'] or None
+    return row
+
+
+def _task_data(row):
+    task_data = dict(zip(_TASK_COLUMNS, row))
+    task_data['deadline'] = task_data['deadline'] or ''
+    return task_data
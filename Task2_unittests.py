@@ -1,6 +1,19 @@
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+import threading
 import unittest
-from datetime import datetime, timedelta
-from Task2_Task_Manager import User, Task, Subtask, TaskManager
+from datetime import date, datetime, timedelta
+from unittest.mock import patch
+from Task2_Task_Manager import ColumnarUser, User, Task, Subtask, TaskManager
+from Task2_auth import SessionCache, hash_password, is_hashed, needs_rehash, verify_many, verify_password
+from Task2_client import RequestError, TaskClient, report
+from Task2_concurrent import ConcurrentTaskManager
+from Task2_server import TaskServer
+from Task2_storage import JsonStorage, QueryStorage, SQLiteStorage, TaskJournal, TaskStorage, iter_json_users
 
 
 class TestTaskManager(unittest.TestCase):
@@ -74,15 +87,16 @@ class TestTaskManager(unittest.TestCase):
 
     def test_generate_report(self):
         self.task_manager.logged_in_user.tasks = []
+        future_date = (datetime.today() + timedelta(days=30)).strftime('%Y-%m-%d')
         task_id1 = len(self.task_manager.logged_in_user.tasks) + 1
-        task1 = Task(task_id1, 'Completed Task', 'Description', 'completed', '2024-12-31', 'high')
+        task1 = Task(task_id1, 'Completed Task', 'Description', 'completed', future_date, 'high')
         self.task_manager.add_task(task1)
         task_id2 = len(self.task_manager.logged_in_user.tasks) + 1
         overdue_date = (datetime.today() - timedelta(days=1)).strftime('%Y-%m-%d')
         task2 = Task(task_id2, 'Overdue Task', 'Description', 'in progress', overdue_date, 'high')
         self.task_manager.add_task(task2)
         task_id3 = len(self.task_manager.logged_in_user.tasks) + 1
-        task3 = Task(task_id3, 'High Priority Task', 'Description', 'in progress', '2024-12-31', 'high')
+        task3 = Task(task_id3, 'High Priority Task', 'Description', 'in progress', future_date, 'high')
         self.task_manager.add_task(task3)
         self.assertEqual(len(self.task_manager.logged_in_user.tasks), 3)
         report = self.task_manager.generate_report()
@@ -91,6 +105,943 @@ class TestTaskManager(unittest.TestCase):
         self.assertEqual(report['overdue_tasks'], 1)
         self.assertEqual(report['high_priority_tasks'], 3)
 
+    def test_duplicate_task_id(self):
+        self.assertTrue(self.task_manager.add_task(Task(1, 'First', 'Description', 'in progress', '2030-01-01', 'low')))
+        self.assertFalse(self.task_manager.add_task(Task(1, 'Second', 'Description', 'in progress', '2030-01-01', 'low')))
+        self.assertEqual(self.task_manager.get_task_by_id(1).title, 'First')
+        self.assertFalse(self.task_manager.remove_task(2))
+
+    def test_add_user_with_lock(self):
+        lock = threading.Lock()
+        with tempfile.TemporaryDirectory() as directory:
+            self.task_manager.enable_journal(os.path.join(directory, 'tasks.journal'), fsync_every=0)
+            # Запись о регистрации делается под переданной блокировкой
+            with patch.object(self.task_manager.journal, 'append',
+                              side_effect=lambda op, **fields: self.assertTrue(lock.locked())) as append:
+                self.assertTrue(self.task_manager.add_user('bob', hash_password('password', 1000), lock))
+                self.assertFalse(self.task_manager.add_user('bob', 'other', lock))
+            append.assert_called_once()
+            self.task_manager.close_journal()
+        self.assertTrue(self.task_manager.login_user('bob', 'password'))
+
+    def test_tasks_are_read_only(self):
+        task = Task(1, 'Task', 'Description', 'in progress', '2030-01-01', 'high')
+        for user in (self.task_manager.logged_in_user, ColumnarUser('columnar', 'password')):
+            with self.subTest(type(user).__name__):
+                # Задачу нельзя добавить в обход add_task: изменение копии не попало бы в индексы
+                with self.assertRaises(AttributeError):
+                    user.tasks.append(task)
+                self.assertEqual(user.count_tasks(), 0)
+                self.assertTrue(user.add_task(task))
+                self.assertEqual([task.task_id for task in user.tasks], [1])
+                self.assertEqual(user.count_by_priority('high'), 1)
+
+    def test_indexes_after_load(self):
+        self.task_manager.add_task(Task(1, 'Task', 'Description', 'in progress', '2030-01-01', 'low'))
+        self.task_manager.add_task(Subtask(2, 'Subtask', 'Description', 'in progress', '2030-01-01', 'low', 1))
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, 'tasks.json')
+            self.task_manager.save_tasks_to_file(file_name)
+            loaded = TaskManager()
+            loaded.load_tasks_from_file(file_name)
+        self.assertIsNotNone(loaded.get_user_by_username('testuser'))
+        self.assertTrue(loaded.login_user('testuser', 'testpassword'))
+        self.assertEqual(loaded.get_task_by_id(2).parent_task_id, 1)
+        self.assertTrue(loaded.remove_task(1))
+        self.assertEqual([task.task_id for task in loaded.logged_in_user.tasks], [2])
+
+    def test_report_indexes_follow_updates(self):
+        overdue_date = (datetime.today() - timedelta(days=3)).strftime('%Y-%m-%d')
+        future_date = (datetime.today() + timedelta(days=3)).strftime('%Y-%m-%d')
+        self.task_manager.add_task(Task(1, 'Task 1', 'Description', 'in progress', overdue_date, 'low'))
+        self.task_manager.add_task(Task(2, 'Task 2', 'Description', 'in progress', future_date, 'high'))
+        self.task_manager.add_task(Task(3, 'Task 3', 'Description', 'completed', '', 'high'))
+        self.task_manager.update_task_status(1, 'completed')
+        self.task_manager.update_task_priority(2, 'low')
+        self.task_manager.update_task_deadline(2, overdue_date)
+        self.task_manager.remove_task(3)
+        report = self.task_manager.generate_report()
+        self.assertEqual(report, {'total_tasks': 2, 'completed_tasks': 1, 'overdue_tasks': 2,
+                                  'high_priority_tasks': 0})
+        self.task_manager.update_task_deadline(1, future_date)
+        self.assertEqual([task.task_id for task in self.task_manager.check_overdue_tasks()], [2])
+        with self.assertRaises(ValueError):
+            self.task_manager.update_task_deadline(1, 'tomorrow')
+        self.assertEqual(self.task_manager.generate_report()['overdue_tasks'], 1)
+
+    def test_deadline_parsed_once(self):
+        task = Task(1, 'Task', 'Description', 'in progress', '2030-01-15', 'low')
+        self.assertEqual(task.deadline_date, date(2030, 1, 15))
+        self.assertEqual(task.deadline, '2030-01-15')
+        self.assertFalse(task.check_overdue(today=date(2030, 1, 14)))
+        self.assertTrue(task.check_overdue(today=date(2030, 1, 15)))
+        task.update_deadline('')
+        self.assertEqual(task.deadline, '')
+        self.assertFalse(task.check_overdue())
+        with self.assertRaises(ValueError):
+            Task(2, 'Task', 'Description', 'in progress', '15.01.2030', 'low')
+
+
+class TestTaskJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.snapshot = os.path.join(self.directory.name, 'tasks.json')
+        self.journal = os.path.join(self.directory.name, 'tasks.journal')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_manager(self, **options):
+        task_manager = TaskManager()
+        task_manager.load_tasks_from_file(self.snapshot, self.journal)
+        task_manager.enable_journal(self.journal, self.snapshot, **options)
+        return task_manager
+
+    def test_replay_journal(self):
+        task_manager = self.make_manager(fsync_every=0)
+        task_manager.register_user('user', 'password')
+        task_manager.login_user('user', 'password')
+        task_manager.add_task(Task(1, 'Task', 'Description', 'in progress', '2030-01-01', 'low'))
+        task_manager.add_task(Subtask(2, 'Subtask', 'Description', 'in progress', '2030-01-01', 'low', 1))
+        task_manager.update_task_status(1, 'completed')
+        task_manager.update_task_deadline(2, '2031-02-03')
+        task_manager.remove_task(1)
+        task_manager.close_journal()
+
+        loaded = self.make_manager()
+        self.assertTrue(loaded.login_user('user', 'password'))
+        self.assertIsNone(loaded.get_task_by_id(1))
+        self.assertEqual(loaded.get_task_by_id(2).deadline, '2031-02-03')
+        self.assertEqual(loaded.generate_report()['total_tasks'], 1)
+
+    def test_torn_record_is_dropped(self):
+        task_manager = self.make_manager()
+        task_manager.register_user('user', 'password')
+        task_manager.close_journal()
+        with open(self.journal, 'a') as file:
+            file.write('{"op": "register_user", "userna')
+        task_manager = self.make_manager()
+        task_manager.register_user('other', 'password')
+        task_manager.close_journal()
+
+        loaded = self.make_manager()
+        self.assertEqual([user.username for user in loaded.users], ['user', 'other'])
+
+    def test_compaction(self):
+        task_manager = self.make_manager(compact_every=3)
+        task_manager.register_user('user', 'password')
+        task_manager.login_user('user', 'password')
+        for task_id in range(1, 6):
+            task_manager.add_task(Task(task_id, 'Task', 'Description', 'in progress', '', 'low'))
+        self.assertTrue(os.path.exists(self.snapshot))
+        self.assertEqual(task_manager.journal.records, 0)
+        task_manager.add_task(Task(6, 'Task', 'Description', 'in progress', '', 'low'))
+        task_manager.close_journal()
+
+        loaded = self.make_manager()
+        loaded.login_user('user', 'password')
+        self.assertEqual(len(loaded.logged_in_user.tasks), 6)
+
+    def test_jsonl_snapshot_with_journal(self):
+        snapshot = os.path.join(self.directory.name, 'tasks.jsonl')
+        task_manager = TaskManager()
+        task_manager.enable_journal(self.journal, snapshot)
+        task_manager.register_user('user', 'password')
+        task_manager.login_user('user', 'password')
+        task_manager.add_task(Task(1, 'Task', 'Description', 'in progress', '', 'low'))
+        task_manager.compact()
+        task_manager.update_task_title(1, 'Renamed')
+        task_manager.close_journal()
+
+        loaded = TaskManager()
+        loaded.load_tasks_from_jsonl(snapshot, self.journal)
+        loaded.login_user('user', 'password')
+        self.assertEqual(loaded.get_task_by_id(1).title, 'Renamed')
+
+    def test_changes_after_save_are_replayed(self):
+        task_manager = self.make_manager()
+        task_manager.register_user('user', 'password')
+        task_manager.login_user('user', 'password')
+        task_manager.add_task(Task(1, 'Task', 'Description', 'in progress', '', 'low'))
+        task_manager.save_tasks_to_file(self.snapshot)
+        task_manager.add_task(Task(2, 'Task', 'Description', 'in progress', '', 'low'))
+        task_manager.close_journal()
+
+        loaded = self.make_manager()
+        loaded.login_user('user', 'password')
+        self.assertEqual([task.task_id for task in loaded.logged_in_user.tasks], [1, 2])
+
+    def test_compact_without_snapshot_file(self):
+        task_manager = TaskManager()
+        task_manager.enable_journal(self.journal)
+        with self.assertRaisesRegex(ValueError, "snapshot"):
+            task_manager.compact()
+        task_manager.close_journal()
+
+    def test_stale_journal_is_not_replayed(self):
+        task_manager = self.make_manager()
+        task_manager.register_user('user', 'password')
+        task_manager.login_user('user', 'password')
+        task_manager.add_task(Task(1, 'Task', 'Description', 'in progress', '', 'low'))
+        task_manager.remove_task(1)
+        task_manager.add_task(Task(1, 'New Task', 'Description', 'in progress', '', 'low'))
+        # Снимок сохранен, но журнал не успели очистить
+        with patch.object(task_manager.journal, 'reset'):
+            task_manager.compact()
+        task_manager.close_journal()
+        with open(self.journal, 'a') as file:
+            file.write('{"op": "remove_task", "username": "us')  # недописанная запись
+
+        loaded = self.make_manager()
+        loaded.login_user('user', 'password')
+        self.assertEqual([task.title for task in loaded.logged_in_user.tasks], ['New Task'])
+        self.assertEqual(loaded.journal.records, 0)
+        self.assertEqual(len(list(TaskJournal.read(self.journal))), 1)
+
+
+class TestStreamingLoad(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.task_manager = TaskManager()
+        for name in ('alice', 'bob'):
+            self.task_manager.register_user(name, 'password')
+            self.task_manager.login_user(name, 'password')
+            for task_id in range(1, 51):
+                self.task_manager.add_task(Task(task_id, f'{name} task {task_id}', 'Description "quoted"',
+                                                'in progress', '2030-01-01', 'low'))
+            self.task_manager.add_task(Subtask(51, 'Subtask', 'Description', 'in progress', '', 'high', 1))
+        self.task_manager.logout_user()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_iter_json_users_small_chunks(self):
+        file_name = os.path.join(self.directory.name, 'tasks.json')
+        self.task_manager.save_tasks_to_file(file_name)
+        with open(file_name) as file:
+            expected = json.load(file)
+        metadata = {}
+        users = list(iter_json_users(file_name, metadata, chunk_size=7))
+        self.assertEqual(users, expected['users'])
+        self.assertEqual(metadata, {})
+
+    def test_jsonl_lazy_load(self):
+        file_name = os.path.join(self.directory.name, 'tasks.jsonl')
+        self.task_manager.save_tasks_to_jsonl(file_name)
+        loaded = TaskManager()
+        loaded.load_tasks_from_jsonl(file_name)
+        alice = loaded.get_user_by_username('alice')
+        bob = loaded.get_user_by_username('bob')
+        self.assertFalse(alice.tasks_loaded)
+        self.assertTrue(loaded.login_user('alice', 'password'))
+        self.assertFalse(alice.tasks_loaded)
+        self.assertEqual(loaded.get_task_by_id(51).parent_task_id, 1)
+        self.assertTrue(alice.tasks_loaded)
+        self.assertFalse(bob.tasks_loaded)
+        self.assertEqual(loaded.generate_report()['total_tasks'], 51)
+        self.assertEqual([task.title for task in bob.tasks][:2], ['bob task 1', 'bob task 2'])
+
+    def test_invalid_deadline_in_legacy_file(self):
+        # Старые файлы хранили срок строкой без проверки: один неверный срок не прерывает загрузку
+        tasks = [{'task_id': 1, 'title': 'Bad', 'description': '', 'status': 'pending', 'deadline': '31.12.2024',
+                  'priority': 'low', 'type': 'Task', 'parent_task_id': None},
+                 {'task_id': 2, 'title': 'Good', 'description': '', 'status': 'pending', 'deadline': '2000-01-01',
+                  'priority': 'low', 'type': 'Task', 'parent_task_id': None}]
+        json_file = os.path.join(self.directory.name, 'tasks.json')
+        with open(json_file, 'w') as file:
+            json.dump({'users': [{'username': 'alice', 'password': 'password', 'tasks': tasks}]}, file)
+        jsonl_file = os.path.join(self.directory.name, 'tasks.jsonl')
+        with open(jsonl_file, 'w') as file:
+            for line in ({'format': 'tasks-jsonl'}, {'username': 'alice', 'password': 'password', 'task_count': 2},
+                         *tasks):
+                file.write(json.dumps(line) + '\n')
+        for load in (lambda manager: manager.load_tasks_from_file(json_file),
+                     lambda manager: manager.load_tasks_from_jsonl(jsonl_file, lazy=False)):
+            loaded = TaskManager()
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                load(loaded)
+                loaded.login_user('alice', 'password')
+            self.assertIn("Invalid deadline '31.12.2024' in task 1", output.getvalue())
+            self.assertEqual(loaded.get_task_by_id(1).deadline, '')
+            self.assertEqual([task.task_id for task in loaded.check_overdue_tasks()], [2])
+
+
+class TestStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.directory.name, 'tasks.db')
+        self.today = date.today()
+        self.task_manager = TaskManager(SQLiteStorage(self.db_file))
+        self.task_manager.register_user('alice', 'password')
+        self.task_manager.login_user('alice', 'password')
+        self.task_manager.add_task(Task(1, 'Old', 'Desc', 'pending', str(self.today - timedelta(days=2)), 'high'))
+        self.task_manager.add_task(Task(2, 'Today', 'Desc', 'completed', str(self.today), 'low'))
+        self.task_manager.add_task(Subtask(3, 'Later', 'Desc', 'pending', str(self.today + timedelta(days=5)), 'high', 1))
+        self.task_manager.add_task(Task(4, 'No deadline', 'Desc', 'pending', '', 'medium'))
+
+    def tearDown(self):
+        self.task_manager.close()
+        self.directory.cleanup()
+
+    def reopen(self):
+        self.task_manager.close()
+        self.task_manager = TaskManager(SQLiteStorage(self.db_file))
+        self.task_manager.login_user('alice', 'password')
+
+    def test_queries_pushed_down(self):
+        user = self.task_manager.logged_in_user
+        self.assertFalse(self.task_manager.add_task(Task(1, 'Duplicate', 'Desc', 'pending', '', 'low')))
+        self.assertEqual(self.task_manager.get_task_by_id(3).parent_task_id, 1)
+        self.assertIsNone(self.task_manager.get_task_by_id(99))
+        self.assertEqual([task.task_id for task in self.task_manager.check_overdue_tasks()], [1, 2])
+        self.assertEqual(self.task_manager.generate_report(), {
+            'total_tasks': 4, 'completed_tasks': 1, 'overdue_tasks': 2, 'high_priority_tasks': 2})
+        self.assertFalse(user.tasks_loaded)
+
+    def test_changes_persisted(self):
+        self.assertTrue(self.task_manager.update_task_status(1, 'completed'))
+        self.assertTrue(self.task_manager.update_task_deadline(3, date(2000, 1, 1)))
+        self.assertTrue(self.task_manager.remove_task(2))
+        self.assertFalse(self.task_manager.remove_task(2))
+        self.assertFalse(self.task_manager.update_task_title(99, 'Missing'))
+        with self.assertRaises(ValueError):
+            self.task_manager.update_task_deadline(4, 'tomorrow')
+        self.reopen()
+        self.assertEqual(self.task_manager.get_task_by_id(3).deadline, '2000-01-01')
+        self.assertEqual(self.task_manager.get_task_by_id(4).deadline, '')
+        report = self.task_manager.generate_report()
+        self.assertEqual(report['completed_tasks'], 1)
+        self.assertEqual(report['overdue_tasks'], 2)
+        # После загрузки задач в память запросы выполняются по индексам User и совпадают с SQL
+        user = self.task_manager.logged_in_user
+        self.assertEqual([task.task_id for task in user.tasks], [1, 3, 4])
+        self.assertEqual(self.task_manager.generate_report(), report)
+        self.task_manager.update_task_priority(4, 'high')
+        self.reopen()
+        self.assertEqual(self.task_manager.get_task_by_id(4).priority, 'high')
+
+    def test_import_from_json(self):
+        file_name = os.path.join(self.directory.name, 'tasks.json')
+        self.task_manager.display_all_tasks()
+        self.task_manager.save_tasks_to_file(file_name)
+        json_manager = TaskManager(JsonStorage(file_name))
+        self.assertEqual(json_manager.get_user_by_username('alice').count_tasks(), 4)
+        storage = SQLiteStorage(os.path.join(self.directory.name, 'imported.db'))
+        storage.import_users(json_manager.users)
+        imported = TaskManager(storage)
+        imported.login_user('alice', 'password')
+        self.assertEqual(imported.generate_report(), self.task_manager.generate_report())
+        imported.close()
+
+    def test_json_storage_save(self):
+        file_name = os.path.join(self.directory.name, 'tasks.jsonl')
+        task_manager = TaskManager(JsonStorage(file_name))
+        task_manager.register_user('bob', 'password')
+        task_manager.login_user('bob', 'password')
+        task_manager.add_task(Task(1, 'Task', 'Desc', 'pending', '', 'low'))
+        task_manager.save()
+        loaded = TaskManager(JsonStorage(file_name))
+        loaded.login_user('bob', 'password')
+        self.assertEqual(loaded.get_task_by_id(1).title, 'Task')
+
+    def test_incomplete_storage_rejected(self):
+        class NoQueries(QueryStorage):
+            def load_users(self):
+                return []
+
+            def load_tasks(self, username):
+                return []
+
+            def record(self, op, **fields):
+                pass
+
+        with self.assertRaises(TypeError):
+            NoQueries()
+        with self.assertRaises(TypeError):
+            TaskStorage()
+
+    def test_shared_connection_across_threads(self):
+        # Чтения через TaskManager идут без блокировок ConcurrentTaskManager, параллельно с записями
+        storage = self.task_manager.storage
+        errors = []
+
+        def read():
+            try:
+                for _ in range(200):
+                    self.assertEqual(storage.get_task('alice', 3)['parent_task_id'], 1)
+                    self.assertEqual(len(storage.overdue_tasks('alice', self.today)), 2)
+                    self.assertIn(len(list(storage.load_tasks('alice'))), (4, 5))
+            except Exception as error:
+                errors.append(error)
+
+        def write():
+            try:
+                for i in range(200):
+                    storage.record('update_task', username='alice', task_id=4, field='title', value=f'Title {i}')
+                    storage.record('add_task', username='alice',
+                                   task=Task(5, 'New', 'Desc', 'pending', '', 'low').to_dict())
+                    storage.record('remove_task', username='alice', task_id=5)
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=read) for _ in range(3)] + [threading.Thread(target=write)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(storage.get_task('alice', 4)['title'], 'Title 199')
+
+
+class TestCompactTasks(unittest.TestCase):
+
+    def setUp(self):
+        self.today = date.today()
+        self.managers = [TaskManager(), TaskManager(columnar=True)]
+        for task_manager in self.managers:
+            task_manager.register_user('alice', 'password')
+            task_manager.login_user('alice', 'password')
+            for task_id in range(1, 21):
+                deadline = str(self.today + timedelta(days=task_id - 10)) if task_id % 4 else ''
+                status = 'completed' if task_id % 3 else 'pending'
+                priority = 'high' if task_id % 5 == 0 else 'low'
+                task_manager.add_task(Task(task_id, f'Task {task_id}', 'Desc', status, deadline, priority))
+            task_manager.add_task(Subtask(21, 'Subtask', 'Desc', 'pending', str(self.today), 'high', 1))
+
+    def test_slots_and_interning(self):
+        task = Task(1, 'Title', 'Desc', ''.join(['pend', 'ing']), '', ''.join(['hi', 'gh']))
+        self.assertFalse(hasattr(task, '__dict__'))
+        self.assertFalse(hasattr(Subtask(2, 'Title', 'Desc', 'pending', '', 'low', 1), '__dict__'))
+        self.assertIs(task.status, 'pending')
+        self.assertIs(task.priority, 'high')
+        task.update_status(''.join(['comp', 'leted']))
+        self.assertIs(task.status, 'completed')
+
+    def test_rejected_columnar_append(self):
+        user = self.managers[1].logged_in_user
+        with self.assertRaises(TypeError):
+            user.add_task(Subtask(22, 'Subtask', 'Desc', 'pending', '', 'low', 'not an id'))
+        # Столбцы остались согласованными
+        self.assertIsNone(user.get_task(22))
+        self.assertEqual(len(user.tasks), 21)
+        self.assertTrue(user.add_task(Task(22, 'Task', 'Desc', 'pending', '', 'low')))
+        self.assertEqual(user.get_task(22).title, 'Task')
+
+    def test_columnar_matches_objects(self):
+        for task_manager in self.managers:
+            task_manager.remove_task(2)
+            task_manager.update_task_status(5, 'pending')
+            task_manager.update_task_priority(6, 'high')
+            task_manager.update_task_deadline(8, str(self.today - timedelta(days=30)))
+        regular, columnar = self.managers
+        self.assertEqual(columnar.generate_report(), regular.generate_report())
+        self.assertEqual([task.to_dict() for task in columnar.check_overdue_tasks()],
+                         [task.to_dict() for task in regular.check_overdue_tasks()])
+        self.assertEqual(sorted(task.task_id for task in columnar.logged_in_user.tasks),
+                         sorted(task.task_id for task in regular.logged_in_user.tasks))
+        self.assertEqual(columnar.get_task_by_id(21).to_dict(), regular.get_task_by_id(21).to_dict())
+        self.assertEqual(columnar.get_task_by_id(4).deadline, '')
+        self.assertIsNone(columnar.get_task_by_id(2))
+        self.assertFalse(columnar.add_task(Task(1, 'Duplicate', 'Desc', 'pending', '', 'low')))
+
+    def test_columnar_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, 'tasks.json')
+            self.managers[1].save_tasks_to_file(file_name)
+            loaded = TaskManager(columnar=True)
+            loaded.load_tasks_from_file(file_name)
+            loaded.login_user('alice', 'password')
+            self.assertEqual(loaded.generate_report(), self.managers[0].generate_report())
+
+
+class TestSubtaskTree(unittest.TestCase):
+    # 1 -> (2 -> (4, 5), 3 -> 6), 7 без подзадач
+
+    def build(self, task_manager):
+        task_manager.register_user('alice', 'password')
+        task_manager.login_user('alice', 'password')
+        task_manager.add_task(Task(1, 'Root', 'Desc', 'pending', '', 'high'))
+        for task_id, parent_task_id, status in ((2, 1, 'pending'), (3, 1, 'completed'), (4, 2, 'completed'),
+                                                (5, 2, 'pending'), (6, 3, 'completed')):
+            task_manager.add_task(Subtask(task_id, f'Subtask {task_id}', 'Desc', status, '', 'low', parent_task_id))
+        task_manager.add_task(Task(7, 'Other', 'Desc', 'pending', '', 'low'))
+        return task_manager
+
+    def ids(self, tasks):
+        return [task.task_id for task in tasks]
+
+    def test_tree_queries(self):
+        for task_manager in (self.build(TaskManager()), self.build(TaskManager(columnar=True))):
+            self.assertEqual(self.ids(task_manager.get_subtasks(1)), [2, 3])
+            self.assertEqual(self.ids(task_manager.get_subtasks(1, recursive=True)), [2, 4, 5, 3, 6])
+            self.assertEqual(self.ids(task_manager.get_subtasks(7, recursive=True)), [])
+            self.assertEqual(self.ids(task_manager.get_parent_tasks(5)), [2, 1])
+            self.assertEqual(task_manager.get_task_completion(2), 100 / 3)
+            self.assertEqual(task_manager.get_task_completion(3), 100)
+            self.assertIsNone(task_manager.get_task_completion(99))
+
+    def test_cascade_delete(self):
+        for task_manager in (self.build(TaskManager()), self.build(TaskManager(columnar=True))):
+            self.assertTrue(task_manager.remove_task_tree(2))
+            self.assertFalse(task_manager.remove_task_tree(2))
+            self.assertEqual(sorted(self.ids(task_manager.logged_in_user.tasks)), [1, 3, 6, 7])
+            self.assertEqual(self.ids(task_manager.get_subtasks(1, recursive=True)), [3, 6])
+            self.assertEqual(task_manager.generate_report()['total_tasks'], 4)
+
+    def test_index_after_reload(self):
+        task_manager = self.build(TaskManager())
+        task_manager.remove_task(5)
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, 'tasks.jsonl')
+            journal_file = os.path.join(directory, 'tasks.journal')
+            task_manager.save_tasks_to_jsonl(file_name)
+            task_manager.enable_journal(journal_file)
+            task_manager.remove_task_tree(3)
+            task_manager.close_journal()
+            loaded = TaskManager()
+            loaded.load_tasks_from_jsonl(file_name, journal_file)
+            loaded.login_user('alice', 'password')
+            self.assertEqual(self.ids(loaded.get_subtasks(1, recursive=True)), [2, 4])
+
+
+class TestConcurrentTaskManager(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.snapshot = os.path.join(self.directory.name, 'tasks.json')
+        self.journal_file = os.path.join(self.directory.name, 'tasks.journal')
+        task_manager = TaskManager()
+        task_manager.enable_journal(self.journal_file, self.snapshot, fsync_every=0, compact_every=150)
+        self.manager = ConcurrentTaskManager(task_manager)
+
+    def tearDown(self):
+        self.manager.manager.close_journal()
+        self.directory.cleanup()
+
+    def test_sessions(self):
+        self.assertTrue(self.manager.register_user('alice', 'password'))
+        self.assertFalse(self.manager.register_user('alice', 'other'))
+        self.assertIsNone(self.manager.login('alice', 'wrong'))
+        session = self.manager.login('alice', 'password')
+        self.assertTrue(self.manager.add_task(session, Task(1, 'Task', 'Desc', 'pending', '', 'low')))
+        self.assertEqual(self.manager.get_task(session, 1).title, 'Task')
+        self.assertTrue(self.manager.logout(session))
+        with self.assertRaises(PermissionError):
+            self.manager.get_task(session, 1)
+
+    def test_stress(self):
+        # По два потока на пользователя, у каждого потока свой диапазон id
+        users, threads_per_user, tasks_per_thread = 4, 2, 100
+        for i in range(users):
+            self.manager.register_user(f'user{i}', 'password')
+        errors = []
+
+        def work(username, first_id):
+            try:
+                session = self.manager.login(username, 'password')
+                for task_id in range(first_id, first_id + tasks_per_thread):
+                    self.manager.add_task(session, Task(task_id, 'Task', 'Desc', 'pending', '2000-01-01', 'low'))
+                    self.manager.update_task_status(session, task_id, 'completed')
+                    if task_id % 4 == 0:
+                        self.manager.remove_task(session, task_id)
+                    self.manager.generate_report(session)
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=work, args=(f'user{i}', j * tasks_per_thread))
+                   for i in range(users) for j in range(threads_per_user)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        expected = {'total_tasks': 150, 'completed_tasks': 150, 'overdue_tasks': 150, 'high_priority_tasks': 0}
+        for i in range(users):
+            session = self.manager.login(f'user{i}', 'password')
+            self.assertEqual(self.manager.generate_report(session), expected)
+        # Снимок и журнал после автоматических сжатий восстанавливают то же состояние
+        self.manager.manager.close_journal()
+        loaded = TaskManager()
+        loaded.load_tasks_from_file(self.snapshot, self.journal_file)
+        for i in range(users):
+            loaded.login_user(f'user{i}', 'password')
+            self.assertEqual(loaded.generate_report(), expected)
+
+
+class TestTaskServer(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.task_manager = TaskManager()
+        self.task_manager.enable_journal(os.path.join(self.directory.name, 'tasks.journal'), fsync_every=0)
+        self.server = await TaskServer(ConcurrentTaskManager(self.task_manager)).start('127.0.0.1', 0)
+        self.client = await TaskClient.connect('127.0.0.1', self.server.sockets[0].getsockname()[1])
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        self.server.close()
+        await self.server.wait_closed()
+        self.task_manager.close_journal()
+        self.directory.cleanup()
+
+    async def test_requests(self):
+        self.assertTrue(await self.client.request('register', username='alice', password='password'))
+        with self.assertRaises(RequestError):
+            await self.client.request('login', username='alice', password='wrong')
+        session = await self.client.request('login', username='alice', password='password')
+        task = {'task_id': 1, 'title': 'Task', 'description': 'Desc', 'status': 'pending',
+                'deadline': '2000-01-01', 'priority': 'high'}
+        self.assertTrue(await self.client.request('add_task', session=session, task=task))
+        self.assertTrue(await self.client.request('update_task', session=session, task_id=1,
+                                                  field='status', value='completed'))
+        self.assertEqual((await self.client.request('get_task', session=session, task_id=1))['status'], 'completed')
+        self.assertEqual([task['task_id'] for task in await self.client.request('overdue', session=session)], [1])
+        with self.assertRaises(RequestError):
+            await self.client.request('update_task', session=session, task_id=1, field='deadline', value='soon')
+        with self.assertRaises(RequestError):
+            await self.client.request('report', session='unknown')
+
+    async def test_pipelined_requests(self):
+        await self.client.request('register', username='alice', password='password')
+        session = await self.client.request('login', username='alice', password='password')
+        requests = [self.client.request('add_task', session=session,
+                                        task={'task_id': task_id, 'title': 'Task', 'description': '',
+                                              'status': 'pending', 'deadline': '', 'priority': 'low'})
+                    for task_id in range(100)]
+        requests.append(self.client.request('report', session=session))
+        results = await asyncio.gather(*requests)
+        self.assertEqual(results[-1]['total_tasks'], 100)
+
+    async def test_held_user_lock_does_not_stall_other_connections(self):
+        # Сервер без журнала и хранилища: операции с блокировкой пользователя все равно уходят в пул
+        manager = ConcurrentTaskManager()
+        server = await TaskServer(manager).start('127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        alice, bob = await TaskClient.connect('127.0.0.1', port), await TaskClient.connect('127.0.0.1', port)
+        try:
+            sessions = []
+            for client, username in ((alice, 'alice'), (bob, 'bob')):
+                await client.request('register', username=username, password='password')
+                sessions.append(await client.request('login', username=username, password='password'))
+            lock = manager._lock(manager.manager.get_user_by_username('alice'))
+            lock.acquire()
+            checked = threading.Event()
+
+            def release():
+                # Блокировка отпускается и тогда, когда цикл событий остановлен ожиданием (тест не зависает)
+                checked.wait(2)
+                lock.release()
+
+            releaser = threading.Thread(target=release)
+            releaser.start()
+            blocked = asyncio.ensure_future(alice.request('report', session=sessions[0]))
+            try:
+                report_result = await asyncio.wait_for(bob.request('report', session=sessions[1]), 5)
+                self.assertEqual(report_result['total_tasks'], 0)
+                self.assertFalse(blocked.done())
+            finally:
+                checked.set()
+            self.assertEqual((await blocked)['total_tasks'], 0)
+            releaser.join()
+        finally:
+            await alice.close()
+            await bob.close()
+            server.close()
+            await server.wait_closed()
+
+    async def test_malformed_requests_keep_connection(self):
+        with self.assertRaises(RequestError):
+            await self.client.request('register', username='alice', password=5)
+        with self.assertRaises(RequestError):
+            await self.client.request('add_task', session='unknown', task=[1, 2])
+        self.assertTrue(await self.client.request('register', username='alice', password='password'))
+
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.server.sockets[0].getsockname()[1])
+        writer.write(b'[1, 2]\n"text"\n{"id": 7, "op": "logout", "session": "unknown"}\n')
+        responses = [json.loads(await reader.readline()) for _ in range(3)]
+        writer.close()
+        await writer.wait_closed()
+        self.assertEqual([response['ok'] for response in responses], [False, False, True])
+        self.assertEqual(responses[2]['id'], 7)
+
+
+class TestClientReport(unittest.TestCase):
+
+    def test_report_with_few_samples(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            report(0.5, [])
+            report(0.5, [0.002])
+            report(0.5, [0.001, 0.003])
+        self.assertIn("latency 2.00 ms", output.getvalue())
+        self.assertIn("p50", output.getvalue())
+
+
+class TestPasswords(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_hash(self):
+        password_hash = hash_password('secret', iterations=1000)
+        self.assertTrue(password_hash.startswith('pbkdf2_sha256$1000$'))
+        self.assertNotEqual(password_hash, hash_password('secret', iterations=1000))
+        self.assertTrue(verify_password('secret', password_hash))
+        self.assertFalse(verify_password('Secret', password_hash))
+
+    def test_passwords_not_saved_in_plaintext(self):
+        file_name = os.path.join(self.directory.name, 'tasks.json')
+        task_manager = TaskManager(password_iterations=1000)
+        task_manager.register_user('alice', 'secret')
+        task_manager.save_tasks_to_file(file_name)
+        with open(file_name) as file:
+            self.assertNotIn('secret', file.read())
+        loaded = TaskManager(password_iterations=1000)
+        loaded.load_tasks_from_file(file_name)
+        self.assertFalse(loaded.login_user('alice', 'wrong'))
+        self.assertTrue(loaded.login_user('alice', 'secret'))
+
+    def test_plaintext_upgraded_on_login(self):
+        file_name = os.path.join(self.directory.name, 'tasks.json')
+        journal_file = os.path.join(self.directory.name, 'tasks.journal')
+        with open(file_name, 'w') as file:
+            json.dump({'users': [{'username': 'alice', 'password': 'secret', 'tasks': []}]}, file)
+        task_manager = TaskManager(password_iterations=1000)
+        task_manager.load_tasks_from_file(file_name)
+        task_manager.enable_journal(journal_file)
+        self.assertTrue(task_manager.login_user('alice', 'secret'))
+        self.assertTrue(task_manager.logged_in_user.password.startswith('pbkdf2_sha256$1000$'))
+        task_manager.close_journal()
+        # Новый хэш восстанавливается из журнала
+        loaded = TaskManager(password_iterations=1000)
+        loaded.load_tasks_from_file(file_name, journal_file)
+        self.assertEqual(loaded.get_user_by_username('alice').password, task_manager.logged_in_user.password)
+
+    def test_session_cache_ttl(self):
+        now = [0]
+        cache = SessionCache(ttl=10, clock=lambda: now[0])
+        first = cache.create('alice')
+        now[0] = 5
+        second = cache.create('bob')
+        now[0] = 12
+        self.assertIsNone(cache.get(first))
+        self.assertEqual(cache.get(second), 'bob')
+        now[0] = 21
+        self.assertEqual(cache.get(second), 'bob')
+        now[0] = 40
+        cache.create('carol')
+        self.assertEqual(len(cache), 1)
+        self.assertIsNone(cache.get(second))
+
+    def test_login_many(self):
+        manager = ConcurrentTaskManager(TaskManager(password_iterations=1000))
+        for i in range(4):
+            manager.register_user(f'user{i}', f'password{i}')
+        credentials = [(f'user{i}', f'password{i}') for i in range(4)] + [('user0', 'wrong'), ('nobody', 'x')]
+        sessions = manager.login_many(credentials, processes=2)
+        self.assertEqual([session is not None for session in sessions], [True] * 4 + [False, False])
+        self.assertEqual(manager.generate_report(sessions[3])['total_tasks'], 0)
+
+    def test_verify_many_pool(self):
+        password_hash = hash_password('secret', iterations=1000)
+        pairs = [('secret', password_hash), ('wrong', password_hash), ('secret', None)] * 2
+        expected = [True, False, False] * 2
+        # Пачка меньше POOL_MIN_BATCH проверяется без пула, с min_batch=0 - в пуле; результаты одинаковые
+        with patch('concurrent.futures.ProcessPoolExecutor') as executor:
+            self.assertEqual(verify_many(pairs, processes=2), expected)
+        executor.assert_not_called()
+        self.assertEqual(verify_many(pairs, processes=2, min_batch=0), expected)
+
+    def test_plaintext_shaped_like_hash(self):
+        # Открытые пароли из старых файлов, похожие на хэш, сравниваются как открытые, без ValueError
+        for password in ('pbkdf2_sha256$a$b$c', 'pbkdf2_sha256$1000$zz$00', 'pbkdf2_sha256$0$00$00',
+                         'pbkdf2_sha256$1000$abc$00', 'pbkdf2_sha256$1000$$'):
+            with self.subTest(password):
+                self.assertFalse(is_hashed(password))
+                self.assertTrue(needs_rehash(password, 1000))
+                self.assertTrue(verify_password(password, password))
+                self.assertFalse(verify_password('other', password))
+                task_manager = TaskManager(password_iterations=1000)
+                task_manager.add_user('alice', password)
+                self.assertTrue(task_manager.login_user('alice', password))
+                self.assertTrue(is_hashed(task_manager.get_user_by_username('alice').password))
+
+
+class TestBulkTasks(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.task_manager = TaskManager(password_iterations=1000)
+        self.task_manager.register_user('alice', 'password')
+        self.task_manager.login_user('alice', 'password')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_tasks(self, count, task_id=None):
+        return (Task(task_id, f'Task {i}', 'Desc', 'completed' if i % 2 else 'pending',
+                     str(date.today() - timedelta(days=i % 3 - 1)), 'high' if i % 5 == 0 else 'low')
+                for i in range(count))
+
+    def test_allocator(self):
+        self.assertEqual(self.task_manager.next_task_id(), 1)
+        self.task_manager.add_task(Task(10, 'Task', 'Desc', 'pending', '', 'low'))
+        self.assertEqual(self.task_manager.next_task_id(), 11)
+        self.task_manager.remove_task(10)
+        self.assertEqual(self.task_manager.next_task_id(), 12)
+
+    def test_add_tasks(self):
+        self.task_manager.add_task(Task(3, 'Existing', 'Desc', 'pending', '2000-01-01', 'low'))
+        tasks = [Task(3, 'Duplicate', 'Desc', 'pending', '', 'low'), Task(5, 'Explicit', 'Desc', 'pending', '', 'low')]
+        self.assertEqual(self.task_manager.add_tasks(tasks + list(self.make_tasks(10)), batch_size=4), 11)
+        user = self.task_manager.logged_in_user
+        self.assertEqual(self.task_manager.get_task_by_id(3).title, 'Existing')
+        self.assertEqual(sorted(task.task_id for task in user.tasks), [3, 5] + list(range(6, 16)))
+        # Индексы после пачки совпадают с подсчетом по задачам
+        tasks = user.tasks
+        self.assertEqual(self.task_manager.generate_report(), {
+            'total_tasks': len(tasks),
+            'completed_tasks': sum(task.status == 'completed' for task in tasks),
+            'overdue_tasks': sum(task.check_overdue() for task in tasks),
+            'high_priority_tasks': sum(task.priority == 'high' for task in tasks),
+        })
+        self.assertEqual([task.task_id for task in self.task_manager.check_overdue_tasks()],
+                         [task.task_id for task in sorted((task for task in tasks if task.check_overdue()),
+                                                          key=lambda task: (task.deadline_date, task.task_id))])
+
+    def test_import_export(self):
+        self.task_manager.add_tasks(self.make_tasks(25))
+        self.task_manager.add_task(Subtask(100, 'Subtask', 'Desc', 'pending', '', 'low', 1))
+        report = self.task_manager.generate_report()
+        for extension in ('csv', 'jsonl'):
+            file_name = os.path.join(self.directory.name, f'tasks.{extension}')
+            self.assertEqual(self.task_manager.export_tasks(file_name, batch_size=7), 26)
+            high_file = os.path.join(self.directory.name, f'high.{extension}')
+            self.assertEqual(self.task_manager.export_tasks(high_file, lambda task: task.priority == 'high'), 5)
+            imported = TaskManager(password_iterations=1000)
+            imported.register_user('bob', 'password')
+            imported.login_user('bob', 'password')
+            self.assertEqual(imported.import_tasks(file_name, batch_size=10), 26)
+            self.assertEqual(imported.generate_report(), report)
+            self.assertEqual(imported.get_task_by_id(100).to_dict(), self.task_manager.get_task_by_id(100).to_dict())
+
+    def test_csv_without_ids(self):
+        file_name = os.path.join(self.directory.name, 'new.csv')
+        with open(file_name, 'w', newline='') as file:
+            file.write('title,description,status,deadline,priority\nFirst,Desc,pending,,low\nSecond,Desc,pending,,high\n')
+        self.task_manager.add_task(Task(7, 'Existing', 'Desc', 'pending', '', 'low'))
+        self.assertEqual(self.task_manager.import_tasks(file_name), 2)
+        self.assertEqual(self.task_manager.get_task_by_id(9).title, 'Second')
+
+    def test_rows_without_ids_in_both_formats(self):
+        rows = {
+            'csv': 'task_id,type,title,description,status,deadline,priority,parent_task_id\n'
+                   ',,First,Desc,pending,,low,\n,,Child,Desc,pending,,high,7\n',
+            'jsonl': '{"title": "First", "description": "Desc", "status": "pending", "deadline": "", "priority": "low"}\n'
+                     '{"task_id": null, "title": "Child", "description": "Desc", "status": "pending", '
+                     '"deadline": "", "priority": "high", "parent_task_id": 7}\n',
+        }
+        for extension, text in rows.items():
+            with self.subTest(extension):
+                file_name = os.path.join(self.directory.name, f'new.{extension}')
+                with open(file_name, 'w', newline='') as file:
+                    file.write(text)
+                manager = TaskManager(password_iterations=1000)
+                manager.register_user('bob', 'password')
+                manager.login_user('bob', 'password')
+                manager.add_task(Task(7, 'Existing', 'Desc', 'pending', '', 'low'))
+                self.assertEqual(manager.import_tasks(file_name), 2)
+                self.assertEqual(type(manager.get_task_by_id(8)), Task)
+                child = manager.get_task_by_id(9)
+                self.assertIsInstance(child, Subtask)
+                self.assertEqual(child.parent_task_id, 7)
+
+    def test_bulk_journal_and_sqlite(self):
+        snapshot = os.path.join(self.directory.name, 'tasks.json')
+        journal_file = os.path.join(self.directory.name, 'tasks.journal')
+        self.task_manager.save_tasks_to_file(snapshot)
+        self.task_manager.enable_journal(journal_file)
+        self.task_manager.add_tasks(self.make_tasks(30), batch_size=8)
+        self.task_manager.close_journal()
+        replayed = TaskManager()
+        replayed.load_tasks_from_file(snapshot, journal_file)
+        replayed.login_user('alice', 'password')
+        self.assertEqual(replayed.generate_report(), self.task_manager.generate_report())
+
+        storage = SQLiteStorage(os.path.join(self.directory.name, 'tasks.db'))
+        stored = TaskManager(storage, password_iterations=1000)
+        stored.register_user('alice', 'password')
+        stored.login_user('alice', 'password')
+        self.assertEqual(stored.add_tasks(self.task_manager.logged_in_user.tasks, batch_size=8), 30)
+        self.assertEqual(stored.add_tasks(self.make_tasks(5)), 5)
+        self.assertEqual(stored.add_tasks([Task(1, 'Duplicate', 'Desc', 'pending', '', 'low')]), 0)
+        self.assertFalse(stored.logged_in_user.tasks_loaded)
+        self.assertEqual(stored.next_task_id(), 36)
+        self.assertEqual(stored.generate_report()['total_tasks'], 35)
+        file_name = os.path.join(self.directory.name, 'export.jsonl')
+        self.assertEqual(stored.export_tasks(file_name, lambda task: task.task_id > 30), 5)
+        stored.close()
+
+
+class TestReports(unittest.TestCase):
+
+    def setUp(self):
+        self.today = date.today()
+        self.task_manager = TaskManager(password_iterations=1000)
+        for username in ('alice', 'bob', 'carol'):
+            self.task_manager.register_user(username, 'password')
+            self.task_manager.login_user(username, 'password')
+            for task_id in range(1, 11):
+                deadline = str(self.today + timedelta(days=task_id - 5)) if task_id % 3 else ''
+                self.task_manager.add_task(Task(task_id, f'{username} {task_id}', 'Desc',
+                                                'completed' if task_id % 2 else 'pending', deadline,
+                                                'high' if task_id % 4 == 0 else 'low'))
+
+    def test_overdue_rolls_over(self):
+        user = self.task_manager.logged_in_user
+        counts = [user.count_overdue(self.today + timedelta(days=day)) for day in range(-6, 8)]
+        expected = [sum(task.check_overdue(self.today + timedelta(days=day)) for task in user.tasks)
+                    for day in range(-6, 8)]
+        self.assertEqual(counts, expected)
+        # Изменения после подсчета учитываются в сохраненном счетчике
+        self.assertEqual(user.count_overdue(self.today), 4)
+        self.task_manager.add_task(Task(11, 'Due', 'Desc', 'pending', str(self.today), 'low'))
+        self.task_manager.update_task_deadline(1, str(self.today + timedelta(days=1)))
+        self.task_manager.remove_task(2)
+        self.assertEqual(user.count_overdue(self.today), 3)
+        self.assertEqual(user.count_overdue(self.today + timedelta(days=1)), 4)
+        self.assertEqual(self.task_manager.generate_report()['overdue_tasks'],
+                         sum(task.check_overdue() for task in user.tasks))
+
+    def test_global_report(self):
+        expected = {'users': 3, 'total_tasks': 30, 'completed_tasks': 15, 'overdue_tasks': 12, 'high_priority_tasks': 6}
+        self.assertEqual(self.task_manager.generate_global_report(), expected)
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, 'tasks.jsonl')
+            self.task_manager.save_tasks_to_jsonl(file_name)
+            for processes in (1, 2):
+                loaded = TaskManager()
+                loaded.load_tasks_from_jsonl(file_name)
+                loaded.get_user_by_username('bob').load_tasks()
+                self.assertEqual(loaded.generate_global_report(processes, pool_min_tasks=0), expected)
+                self.assertFalse(loaded.get_user_by_username('alice').tasks_loaded)
+            # Меньше pool_min_tasks незагруженных задач - отчет считается без пула
+            loaded = TaskManager()
+            loaded.load_tasks_from_jsonl(file_name)
+            with patch('concurrent.futures.ProcessPoolExecutor') as executor:
+                self.assertEqual(loaded.generate_global_report(2, pool_min_tasks=31), expected)
+            executor.assert_not_called()
+            with patch('concurrent.futures.ProcessPoolExecutor', side_effect=RuntimeError('pool')):
+                with self.assertRaisesRegex(RuntimeError, 'pool'):
+                    loaded.generate_global_report(2, pool_min_tasks=30)
+
 
 if __name__ == '__main__':
     unittest.main()
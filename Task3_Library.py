@@ -1,19 +1,37 @@
 import csv
+import functools
+import itertools
+import operator
+import os
+import queue
+import sys
+import time
+import weakref
+from array import array
 from datetime import datetime, timedelta
 
+from Task3_index import Bitmap, TextIndex
+
 
 class LibraryItem:
+    # Без __dict__ у каждого предмета; жанр и тип интернируются - их значений немного
+    __slots__ = ('_title', '_author', '_genre', '_item_type', '_total_copies', '_available_copies', '_status',
+                 '_borrow_date', '_due_date', '_reserved_by', '_library', '_item_id', '__weakref__')
+
     def __init__(self, title, author, genre, item_type, copies=1):
         self._title = title
         self._author = author
-        self._genre = genre
-        self._item_type = item_type
+        self._genre = sys.intern(genre)
+        self._item_type = sys.intern(item_type)
         self._total_copies = copies
         self._available_copies = copies
         self._status = 'available'
         self._borrow_date = None
         self._due_date = None
         self._reserved_by = None
+        # Библиотека, в которую добавлен предмет, и номер в ней - для обновления ее индексов
+        self._library = None
+        self._item_id = None
 
     def __repr__(self):
         return (f"LibraryItem(title='{self._title}', author='{self._author}', genre='{self._genre}', "
@@ -23,19 +41,18 @@ class LibraryItem:
 
     @classmethod
     def from_csv(cls, file_path):
-        items = []
-        with open(file_path, newline='', encoding='utf-8') as csvfile:
-            reader = csv.reader(csvfile)
-            next(reader)  # Skip header row
-            for row in reader:
-                item_type = row[3]
-                if item_type == 'Book':
-                    items.append(Book(*row[:3], int(row[4])))
-                elif item_type == 'Magazine':
-                    items.append(Magazine(*row[:3], row[3], int(row[4])))
-                elif item_type == 'Textbook':
-                    items.append(Textbook(*row[:3], row[3], int(row[4])))
-        return items
+        return [item for batch in iter_item_batches(file_path) for item in batch]
+
+    def to_record(self):
+        """Строка каталога: столбцы CSV и состояние выдачи - число свободных экземпляров, UserID
+        забронировавшего, статус и даты выдачи и возврата в ISO 8601
+        """
+        return {'Title': self._title, 'Author': self._author, 'Genre': self._genre, 'ItemType': self._item_type,
+                'Copies': self._total_copies, 'Available': self._available_copies,
+                'ReservedBy': None if self._reserved_by is None else self._reserved_by.user_id,
+                'Status': self._status,
+                'BorrowDate': None if self._borrow_date is None else self._borrow_date.isoformat(),
+                'DueDate': None if self._due_date is None else self._due_date.isoformat()}
 
     @property
     def title(self):
@@ -65,6 +82,7 @@ class LibraryItem:
     def available_copies(self, value):
         if 0 <= value <= self._total_copies:
             self._available_copies = value
+            self._notify_library()
         else:
             raise ValueError("Available copies cannot exceed total copies or be negative.")
 
@@ -75,6 +93,7 @@ class LibraryItem:
     @status.setter
     def status(self, value):
         self._status = value
+        self._notify_library()
 
     @property
     def borrow_date(self):
@@ -91,10 +110,21 @@ class LibraryItem:
     @reserved_by.setter
     def reserved_by(self, user):
         self._reserved_by = user
+        self._notify_library()
+
+    def _notify_library(self):
+        if self._library is not None:
+            self._library._update_item_state(self)
 
     def set_due_date(self, days=14):
         self._borrow_date = datetime.now()
         self._due_date = self._borrow_date + timedelta(days=days)
+        self._notify_library()
+
+    def clear_due_date(self):
+        self._borrow_date = None
+        self._due_date = None
+        self._notify_library()
 
     def check_overdue(self):
         if self._due_date and datetime.now() > self._due_date:
@@ -108,16 +138,22 @@ class LibraryItem:
             self.reserved_by = user
 
     def cancel_reservation(self):
-        self._reserved_by = None
+        self.reserved_by = None
 
     def __str__(self):
         return f"{self._item_type}: {self._title} by {self._author} ({self._genre}) - {self._status}, Copies: {self._available_copies}/{self._total_copies}"
 
 
 class Book(LibraryItem):
+    __slots__ = ()
+
     def __init__(self, title, author, genre, copies=1):
         super().__init__(title, author, genre, "Book", copies)
 
+    @classmethod
+    def from_record(cls, record):
+        return cls(record['Title'], record['Author'], record['Genre'], int(record['Copies']))
+
     def __repr__(self):
         return (f"Book(title='{self._title}', author='{self._author}', genre='{self._genre}', "
                 f"total_copies={self._total_copies}, available_copies={self._available_copies}, "
@@ -126,10 +162,22 @@ class Book(LibraryItem):
 
 
 class Magazine(LibraryItem):
+    __slots__ = ('_issue_number',)
+
     def __init__(self, title, author, genre, issue_number, copies=1):
         super().__init__(title, author, genre, "Magazine", copies)
         self._issue_number = issue_number
 
+    @classmethod
+    def from_record(cls, record):
+        return cls(record['Title'], record['Author'], record['Genre'], record.get('IssueNumber') or None,
+                   int(record['Copies']))
+
+    def to_record(self):
+        record = super().to_record()
+        record['IssueNumber'] = self._issue_number
+        return record
+
     @property
     def issue_number(self):
         return self._issue_number
@@ -145,10 +193,22 @@ class Magazine(LibraryItem):
 
 
 class Textbook(LibraryItem):
+    __slots__ = ('_subject',)
+
     def __init__(self, title, author, genre, subject, copies=1):
         super().__init__(title, author, genre, "Textbook", copies)
         self._subject = subject
 
+    @classmethod
+    def from_record(cls, record):
+        return cls(record['Title'], record['Author'], record['Genre'], record.get('Subject') or None,
+                   int(record['Copies']))
+
+    def to_record(self):
+        record = super().to_record()
+        record['Subject'] = self._subject
+        return record
+
     @property
     def subject(self):
         return self._subject
@@ -164,13 +224,15 @@ class Textbook(LibraryItem):
 
 
 class User:
+    __slots__ = ('_user_id', '_name', '_borrowed_items', '_fines', '_reserved_items', '_transaction_history')
+
     def __init__(self, user_id, name):
         self._user_id = user_id
         self._name = name
         self._borrowed_items = []
         self._fines = 0
         self._reserved_items = []
-        self._transaction_history = []
+        self._transaction_history = TransactionHistory()
 
     def __repr__(self):
         return (f"User(user_id={self._user_id}, name='{self._name}', fines={self._fines}, "
@@ -179,14 +241,7 @@ class User:
 
     @classmethod
     def from_csv(cls, file_path):
-        users = []
-        with open(file_path, newline='', encoding='utf-8') as csvfile:
-            reader = csv.reader(csvfile)
-            next(reader)  # Skip header row
-            for row in reader:
-                user_id, name = row
-                users.append(cls(int(user_id), name))
-        return users
+        return [user for batch in iter_user_batches(file_path) for user in batch]
 
     @property
     def user_id(self):
@@ -243,8 +298,7 @@ class User:
                 print(f"Item '{library_item.title}' is overdue. Fine: {fine}")
             library_item.available_copies += 1
             library_item.status = 'available' if library_item.available_copies > 0 else 'unavailable'
-            library_item._borrow_date = None
-            library_item._due_date = None
+            library_item.clear_due_date()
             self._borrowed_items.remove(library_item)
             self._transaction_history.append(Transaction(self, library_item, 'returned'))
         else:
@@ -269,11 +323,48 @@ class User:
 
 
 class Transaction:
-    def __init__(self, user, item, action):
-        self.user = user
-        self.item = item
+    """Операция пользователя с предметом.
+
+    Предмет библиотеки хранится номером, ее пользователь - UserID, время - целыми секундами от эпохи;
+    объекты находятся в библиотеке только при обращении к item и user, поэтому запись не держит
+    в памяти вытесненные предметы хранилища. Если предмет не в библиотеке или пользователя в ней нет,
+    искать их негде - тогда хранятся сами объекты.
+    """
+    __slots__ = ('_library', '_user', '_item', 'action', '_timestamp')
+
+    def __init__(self, user, item, action, timestamp=None):
+        library = item._library
+        if library is not None and library._users_by_id.get(user.user_id) is user:
+            user, item = user.user_id, item._item_id
+        else:
+            library = None
+        self._library = library
+        self._user = user
+        self._item = item
         self.action = action
-        self.date = datetime.now()
+        self._timestamp = int(time.time()) if timestamp is None else timestamp
+
+    @classmethod
+    def _from_ids(cls, library, user_id, item_id, action, timestamp):
+        transaction = cls.__new__(cls)
+        transaction._library = library
+        transaction._user = user_id
+        transaction._item = item_id
+        transaction.action = action
+        transaction._timestamp = timestamp
+        return transaction
+
+    @property
+    def user(self):
+        return self._user if self._library is None else self._library._users_by_id[self._user]
+
+    @property
+    def item(self):
+        return self._item if self._library is None else self._library.get_item(self._item)
+
+    @property
+    def date(self):
+        return datetime.fromtimestamp(self._timestamp)
 
     def __str__(self):
         return f"{self.date}: {self.user.name} {self.action} '{self.item.title}'"
@@ -282,39 +373,407 @@ class Transaction:
         return (f"Transaction(user={self.user.name}, item={self.item.title}, action='{self.action}', date={self.date})")
 
 
+class TransactionHistory:
+    """Транзакции столбцами: UserID, номер предмета и время - по 8 байт в массивах, действие -
+    ссылка на интернированную строку. Объекты Transaction создаются при обращении к записи.
+
+    Номера относятся к библиотеке первой записи; записи с объектами вместо номеров и записи
+    другой библиотеки хранятся как есть.
+    """
+    __slots__ = ('_library', '_user_ids', '_item_ids', '_timestamps', '_actions', '_transactions')
+
+    def __init__(self, transactions=()):
+        self._library = None
+        self._user_ids = array('q')
+        self._item_ids = array('q')
+        self._timestamps = array('q')
+        self._actions = []
+        # Номер записи -> Transaction, хранимая как есть
+        self._transactions = {}
+        for transaction in transactions:
+            self.append(transaction)
+
+    def __len__(self):
+        return len(self._actions)
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self)))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        index = range(len(self))[index]
+        transaction = self._transactions.get(index)
+        if transaction is None:
+            transaction = Transaction._from_ids(self._library, self._user_ids[index], self._item_ids[index],
+                                                self._actions[index], self._timestamps[index])
+        return transaction
+
+    def __repr__(self):
+        return f"TransactionHistory({list(self)!r})"
+
+    def append(self, transaction):
+        library = transaction._library
+        if self._library is None:
+            self._library = library
+        if library is not None and library is self._library and isinstance(transaction._user, int):
+            user_id, item_id = transaction._user, transaction._item
+        else:
+            self._transactions[len(self)] = transaction
+            user_id = item_id = -1
+        self._user_ids.append(user_id)
+        self._item_ids.append(item_id)
+        self._timestamps.append(transaction._timestamp)
+        self._actions.append(sys.intern(transaction.action))
+
+
+# Класс предмета по значению столбца ItemType
+ITEM_TYPES = {'Book': Book, 'Magazine': Magazine, 'Textbook': Textbook}
+
+
+def item_from_record(record):
+    """Предмет из строки каталога; строки хранилища содержат еще и число свободных экземпляров"""
+    item_class = ITEM_TYPES.get(record['ItemType'])
+    if item_class is None:
+        raise ValueError(f"Unknown item type: {record['ItemType']!r}")
+    item = item_class.from_record(record)
+    if record.get('Available') not in (None, ''):
+        item.available_copies = int(record['Available'])
+        if item.available_copies == 0:
+            item.status = 'unavailable'
+    if record.get('Status'):
+        item.status = record['Status']
+    if record.get('BorrowDate'):
+        item._borrow_date = datetime.fromisoformat(record['BorrowDate'])
+    if record.get('DueDate'):
+        item._due_date = datetime.fromisoformat(record['DueDate'])
+    return item
+
+
+def _iter_csv_batches(file_path, parse, batch_size):
+    with open(file_path, newline='', encoding='utf-8') as csvfile:
+        reader = csv.DictReader(csvfile)
+        batch = []
+        for record in reader:
+            try:
+                batch.append(parse(record))
+            except (KeyError, TypeError, ValueError) as error:
+                raise ValueError(f"{file_path}, line {reader.line_num}: {error!r}") from error
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def iter_item_batches(file_path, batch_size=10_000):
+    """Предметы из CSV со столбцами Title,Author,Genre,ItemType,Copies (и IssueNumber, Subject
+    для журналов и учебников) списками по batch_size; в памяти - не больше одной пачки.
+    Неизвестный тип или испорченная строка - ValueError с номером строки.
+    """
+    return _iter_csv_batches(file_path, item_from_record, batch_size)
+
+
+def iter_user_batches(file_path, batch_size=10_000):
+    """Пользователи из CSV со столбцами UserID,Name списками по batch_size"""
+    return _iter_csv_batches(file_path, lambda record: User(int(record['UserID']), record['Name']), batch_size)
+
+
+# Пачек в очереди рабочего процесса iter_catalogue, пока их не забрали
+_QUEUED_BATCHES = 2
+
+
+def iter_catalogue(file_paths, batch_size=10_000, processes=1):
+    """Пачки предметов из одного или нескольких CSV в порядке файлов.
+
+    processes > 1 (None - по числу ядер) - до processes файлов разбираются одновременно в отдельных
+    процессах, и каждый передает пачки через очередь на _QUEUED_BATCHES пачек: процесс ждет,
+    пока пачки заберут, поэтому в памяти не больше (_QUEUED_BATCHES + 1) * processes пачек.
+    Иначе файлы читаются потоково в этом процессе.
+    """
+    if isinstance(file_paths, str):
+        file_paths = [file_paths]
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(file_paths) < 2:
+        for file_path in file_paths:
+            yield from iter_item_batches(file_path, batch_size)
+        return
+    # multiprocessing загружается долго, поэтому импортируется только здесь
+    import multiprocessing
+
+    paths = iter(file_paths)
+    workers = []
+
+    def start_next():
+        file_path = next(paths, None)
+        if file_path is not None:
+            batches = multiprocessing.Queue(_QUEUED_BATCHES)
+            process = multiprocessing.Process(target=_put_item_batches, args=(file_path, batch_size, batches),
+                                              daemon=True)
+            process.start()
+            workers.append((process, batches))
+
+    try:
+        for _ in range(processes):
+            start_next()
+        while workers:
+            process, batches = workers[0]
+            yield from _get_item_batches(process, batches)
+            process.join()
+            workers.pop(0)
+            start_next()
+    finally:
+        # Генератор закрыт раньше времени или в файле ошибка
+        for process, _ in workers:
+            process.terminate()
+            process.join()
+
+
+def _put_item_batches(file_path, batch_size, batches):
+    """Рабочий процесс iter_catalogue: пачки файла в очередь, затем ошибка разбора (если была) и None"""
+    try:
+        for batch in iter_item_batches(file_path, batch_size):
+            batches.put(batch)
+    except (OSError, ValueError) as error:
+        batches.put(error)
+    batches.put(None)
+
+
+def _get_item_batches(process, batches):
+    while True:
+        try:
+            batch = batches.get(timeout=1)
+        except queue.Empty:
+            if process.is_alive():
+                continue
+            # Все, что процесс успел положить, уже в очереди
+            try:
+                batch = batches.get_nowait()
+            except queue.Empty:
+                raise RuntimeError(f"Catalogue worker exited with code {process.exitcode}") from None
+        if batch is None:
+            return
+        if isinstance(batch, Exception):
+            raise batch
+        yield batch
+
+
 class Library:
-    def __init__(self):
+    # Поля с текстовым индексом: поиск подстроки по индексу триграмм, а не перебором всех предметов
+    _INDEXED_FIELDS = ('title', 'author', 'genre')
+
+    def __init__(self, store=None):
+        # store - хранилище на диске (Task3_storage.SQLiteCatalogue): предметы не держатся в памяти,
+        # поиск и счетчики выполняет хранилище
+        self._store = store
+        # Объекты предметов из хранилища, которые еще где-то используются (например, у пользователя):
+        # повторный поиск возвращает тот же объект, а не новый с тем же номером
+        self._live_items = weakref.WeakValueDictionary()
         self._items = []
         self._users = []
-        self._transactions = []
+        # UserID -> пользователь, для восстановления брони из хранилища
+        self._users_by_id = {}
+        self._transactions = TransactionHistory()
+        # Номер предмета - его позиция в _items
+        self._indexes = {field: TextIndex() for field in self._INDEXED_FIELDS}
+        # Битовые индексы: тип предмета в нижнем регистре -> предметы этого типа,
+        # предметы со свободными экземплярами и забронированные предметы
+        self._types = {}
+        self._available = Bitmap()
+        self._reserved = Bitmap()
+
+    def __len__(self):
+        return len(self._items) if self._store is None else len(self._store)
 
     def __repr__(self):
-        return (f"Library(items={len(self._items)}, users={len(self._users)}, transactions={len(self._transactions)})")
+        return (f"Library(items={len(self)}, users={len(self._users)}, transactions={len(self._transactions)})")
 
     def add_item(self, item):
+        if self._store is not None:
+            self.add_items([item])
+            return
+        item_id = len(self._items)
         self._items.append(item)
+        for field, index in self._indexes.items():
+            index.add(item_id, getattr(item, field))
+        item_type = item.item_type.lower()
+        bitmap = self._types.get(item_type)
+        if bitmap is None:
+            bitmap = self._types[item_type] = Bitmap()
+        bitmap.add(item_id)
+        item._library = self
+        item._item_id = item_id
+        self._update_item_state(item)
+
+    def _update_item_state(self, item):
+        """Вызывается предметом при изменении числа свободных экземпляров, брони, статуса или сроков"""
+        if self._store is not None:
+            self._store.update_item(item._item_id, item.to_record())
+            return
+        self._available.set(item._item_id, item.available_copies > 0)
+        self._reserved.set(item._item_id, item.reserved_by is not None)
+
+    def add_items(self, items):
+        if self._store is None:
+            for item in items:
+                self.add_item(item)
+            return
+        items = list(items)
+        for item_id, item in zip(self._store.add_items(item.to_record() for item in items), items):
+            self._link(item_id, item)
+
+    def get_item(self, item_id):
+        """Предмет по номеру в библиотеке"""
+        if self._store is None:
+            return self._items[item_id]
+        item = self._live_items.get(item_id)
+        if item is not None:
+            return item
+        record = self._store.get_item(item_id)
+        if record is None:
+            raise IndexError(f"No item with id {item_id}")
+        return self._from_store([(item_id, record)])[0]
+
+    def _link(self, item_id, item):
+        item._library = self
+        item._item_id = item_id
+        self._live_items[item_id] = item
+
+    def _from_store(self, rows):
+        """Объекты предметов из строк хранилища, связанные с библиотекой.
+        Для предметов, объекты которых еще живы, возвращаются эти объекты со всем их состоянием.
+        """
+        items = []
+        for item_id, record in rows:
+            item = self._live_items.get(item_id)
+            if item is None:
+                item = item_from_record(record)
+                if record['ReservedBy'] is not None:
+                    item._reserved_by = self._users_by_id.get(record['ReservedBy'])
+                self._link(item_id, item)
+            items.append(item)
+        return items
 
     def add_user(self, user):
         self._users.append(user)
+        self._users_by_id[user.user_id] = user
+
+    def add_users(self, users):
+        for user in users:
+            self.add_user(user)
 
     @classmethod
-    def from_csv(cls, item_file_path, user_file_path):
-        library = cls()
-        library._items.extend(LibraryItem.from_csv(item_file_path))
-        library._users.extend(User.from_csv(user_file_path))
+    def from_csv(cls, item_file_path, user_file_path, store=None, batch_size=10_000, processes=1):
+        """Библиотека из CSV предметов (путь или список путей) и CSV пользователей.
+
+        Файлы читаются пачками по batch_size. С store предметы пишутся в хранилище пачка за пачкой,
+        поэтому каталог может быть больше памяти.
+        """
+        library = cls(store)
+        for batch in iter_catalogue(item_file_path, batch_size, processes):
+            library.add_items(batch)
+        for batch in iter_user_batches(user_file_path, batch_size):
+            library.add_users(batch)
         return library
 
     def search_by_title(self, title):
-        return [item for item in self._items if title.lower() in item.title.lower()]
+        return self._search('title', title)
 
     def search_by_author(self, author):
-        return [item for item in self._items if author.lower() in item.author.lower()]
+        return self._search('author', author)
 
     def search_by_genre(self, genre):
-        return [item for item in self._items if genre.lower() in item.genre.lower()]
+        return self._search('genre', genre)
+
+    def search_prefix(self, field, text):
+        """Предметы, у которых каждое слово text - начало какого-нибудь слова поля field"""
+        if self._store is not None:
+            return self._from_store(self._store.query(prefix=(field, text)))
+        return [self._items[item_id] for item_id in self._indexes[field].search_prefix(text)]
+
+    def _search(self, field, text):
+        """Предметы, в поле field которых есть подстрока text без учета регистра, в порядке добавления"""
+        if self._store is not None:
+            return self._from_store(self._store.query(**{field: text}))
+        return [self._items[item_id] for item_id in self._indexes[field].search(text)]
 
     def search_by_type(self, item_type):
-        return [item for item in self._items if item_type.lower() == item.item_type.lower()]
+        if self._store is not None:
+            return self._from_store(self._store.query(item_type=item_type))
+        return [self._items[item_id] for item_id in self._types.get(item_type.lower(), ())]
+
+    def available_items(self):
+        if self._store is not None:
+            return self._from_store(self._store.query(available_only=True))
+        return [self._items[item_id] for item_id in self._available]
+
+    def count(self, item_type=None, available_only=False, reserved=None):
+        """Число предметов типа item_type (без учета регистра), со свободными экземплярами
+        и забронированных (reserved=True) или нет (False) - пересечение битовых индексов.
+        """
+        if self._store is not None:
+            return self._store.count(item_type, available_only, reserved)
+        bitmaps = self._bitmaps(item_type, available_only, reserved)
+        if bitmaps is None:
+            return 0
+        if not bitmaps:
+            return len(self._items)
+        if len(bitmaps) == 1:
+            return len(bitmaps[0])
+        return len(functools.reduce(operator.and_, bitmaps))
+
+    def _bitmaps(self, item_type, available_only, reserved):
+        """Битовые индексы условий; None, если тип неизвестен"""
+        bitmaps = []
+        if item_type is not None:
+            bitmap = self._types.get(item_type.lower())
+            if bitmap is None:
+                return None
+            bitmaps.append(bitmap)
+        if available_only:
+            bitmaps.append(self._available)
+        if reserved is not None:
+            bitmaps.append(self._reserved if reserved else self._reserved.complement(len(self._items)))
+        return bitmaps
+
+    def query(self, title=None, author=None, genre=None, item_type=None, available_only=False, reserved=None,
+              limit=None, offset=0):
+        """Предметы, подходящие под все заданные условия, в порядке добавления; limit предметов после offset.
+
+        title, author и genre - подстроки без учета регистра, item_type - тип без учета регистра,
+        reserved - True или False, чтобы выбрать только забронированные или только свободные от брони.
+        Перебираются id самого избирательного условия, остальные проверяются по id предмета;
+        перебор останавливается на конце страницы, и объекты выдаются только для нее.
+        """
+        if self._store is not None:
+            return self._from_store(self._store.query(title, author, genre, item_type, available_only, reserved,
+                                                      limit, offset))
+        # Условия в виде (число предметов, id по возрастанию, проверка id)
+        conditions = []
+        for field, text in (('title', title), ('author', author), ('genre', genre)):
+            if text is not None:
+                index = self._indexes[field]
+                value_ids = index.match(text)
+                matched = set(value_ids)
+                conditions.append((index.count(value_ids), index.iter_item_ids(value_ids),
+                                   lambda item_id, index=index, matched=matched: index.value_of(item_id) in matched))
+        bitmaps = self._bitmaps(item_type, available_only, reserved)
+        if bitmaps is None:
+            return []
+        if bitmaps:
+            # Битовые условия сначала пересекаются между собой
+            bitmap = functools.reduce(operator.and_, bitmaps) if len(bitmaps) > 1 else bitmaps[0]
+            conditions.append((len(bitmap), iter(bitmap), bitmap.__contains__))
+        if not conditions:
+            item_ids = range(len(self._items))
+        else:
+            conditions.sort(key=lambda condition: condition[0])
+            if conditions[0][0] == 0:
+                return []
+            checks = [check for _, _, check in conditions[1:]]
+            item_ids = (item_id for item_id in conditions[0][1] if all(check(item_id) for check in checks))
+        end = None if limit is None else offset + limit
+        return [self._items[item_id] for item_id in itertools.islice(item_ids, offset, end)]
 
     def record_transaction(self, transaction):
         self._transactions.append(transaction)
@@ -324,12 +783,12 @@ class Library:
             print(f"Item '{item.title}' is now available and reserved by {item.reserved_by.name}.")
 
     def __str__(self):
-        return f"Library: {len(self._items)} items, {len(self._users)} users"
+        return f"Library: {len(self)} items, {len(self._users)} users"
 
 
 # Примеры CSV файлов:
 
-# items.csv
+# items.csv (необязательные столбцы IssueNumber и Subject - номер выпуска журнала и предмет учебника)
 # Title,Author,Genre,ItemType,Copies
 # BookTitle1,Author1,Genre1,Book,3
 # MagazineTitle1,Author2,Genre2,Magazine,2
@@ -340,56 +799,61 @@ class Library:
 # 1,Alice
 # 2,Bob
 
-# Создание библиотеки из файла
-library = Library.from_csv('items.csv', 'users.csv')
 
-print(library)
+def main():
+    """Пример использования: библиотека из items.csv и users.csv"""
+    # Создание библиотеки из файла
+    library = Library.from_csv('items.csv', 'users.csv')
 
-# Поиск юзера по имени
-try:
-    user1 = next(user for user in library._users if user.name == 'Alice')
-except StopIteration:
-    print("User 'Alice' not found")
-    user1 = None
+    print(library)
 
-if user1:
-    # Взятие юзером книги и журнала из библиотеки
-    book1 = next(item for item in library._items if item.title == 'BookTitle1')
-    magazine1 = next(item for item in library._items if item.title == 'MagazineTitle1')
+    # Поиск юзера по имени
+    try:
+        user1 = next(user for user in library._users if user.name == 'Alice')
+    except StopIteration:
+        print("User 'Alice' not found")
+        user1 = None
 
-    user1.borrow_item(book1)
-    user1.borrow_item(magazine1)
+    if user1:
+        # Взятие юзером книги и журнала из библиотеки
+        book1 = next(item for item in library._items if item.title == 'BookTitle1')
+        magazine1 = next(item for item in library._items if item.title == 'MagazineTitle1')
 
-    # Резервирование книги пользователем
-    user2 = next(user for user in library._users if user.name == 'Bob')
-    user2.reserve_item(book1)
+        user1.borrow_item(book1)
+        user1.borrow_item(magazine1)
 
-    # Проверка статуса книг и юзеров
-    print(library)
-    print(user1)
-    print(user2)
+        # Резервирование книги пользователем
+        user2 = next(user for user in library._users if user.name == 'Bob')
+        user2.reserve_item(book1)
 
-    # Симуляция задержки
-    import time
+        # Проверка статуса книг и юзеров
+        print(library)
+        print(user1)
+        print(user2)
 
-    time.sleep(1)
+        # Симуляция задержки
+        time.sleep(1)
 
-    # Возврат книги и журнала пользователем
-    user1.return_item(book1)
-    user1.return_item(magazine1)
+        # Возврат книги и журнала пользователем
+        user1.return_item(book1)
+        user1.return_item(magazine1)
 
-    # Запись о транзакции в библиотеку
-    for transaction in user1.transaction_history:
-        library.record_transaction(transaction)
+        # Запись о транзакции в библиотеку
+        for transaction in user1.transaction_history:
+            library.record_transaction(transaction)
 
-    # Проверка статусов после возвращения книги
-    library.notify_reservations(book1)
+        # Проверка статусов после возвращения книги
+        library.notify_reservations(book1)
+
+        print(library)
+        print(user1)
+        print(user2)
+
+        # Поиск по типу
+        print("Books:", library.search_by_type("Book"))
+        print("Magazines:", library.search_by_type("Magazine"))
+        print("Textbooks:", library.search_by_type("Textbook"))
 
-    print(library)
-    print(user1)
-    print(user2)
 
-    # Поиск по типу
-    print("Books:", library.search_by_type("Book"))
-    print("Magazines:", library.search_by_type("Magazine"))
-    print("Textbooks:", library.search_by_type("Textbook"))
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+import argparse
+import contextlib
+import csv
+import io
+import os
+import random
+import tempfile
+import time
+import timeit
+import tracemalloc
+from datetime import datetime
+
+from Task3_Library import Book, Library, LibraryItem, Magazine, Textbook, Transaction, TransactionHistory, User
+from Task3_storage import SQLiteCatalogue
+
+_WORDS = ['war', 'peace', 'python', 'history', 'ocean', 'night', 'garden', 'machine', 'river', 'stone',
+          'silent', 'empire', 'journey', 'light', 'shadow', 'winter', 'code', 'city', 'star', 'memory']
+_GENRES = ['Fiction', 'Science', 'History', 'Fantasy', 'Programming', 'Poetry', 'Drama', 'Biography']
+
+
+def make_items(count, seed=0):
+    """count предметов со случайными названиями из словаря, ~count / 50 авторов и 8 жанров"""
+    rng = random.Random(seed)
+    items = []
+    for i in range(count):
+        title = ' '.join(rng.choice(_WORDS) for _ in range(rng.randint(2, 5))).title() + f' {i}'
+        author = f'Author {rng.randrange(max(1, count // 50))}'
+        genre = rng.choice(_GENRES)
+        kind = i % 3
+        if kind == 0:
+            items.append(Book(title, author, genre, copies=rng.randint(1, 3)))
+        elif kind == 1:
+            items.append(Magazine(title, author, genre, str(i % 12 + 1), copies=rng.randint(1, 3)))
+        else:
+            items.append(Textbook(title, author, genre, genre, copies=rng.randint(1, 3)))
+    return items
+
+
+def make_library(items):
+    library = Library()
+    library.add_items(items)
+    return library
+
+
+def bench_build(count):
+    """Время добавления count предметов: с индексами против простого списка"""
+    items = make_items(count)
+
+    def plain():
+        library = Library()
+        library._items.extend(items)
+
+    return timeit.timeit(lambda: make_library(items), number=1), timeit.timeit(plain, number=1)
+
+
+def bench_search(count, repeat):
+    """Поиск подстроки: индекс триграмм против перебора всех предметов; на каждый запрос"""
+    library = make_library(make_items(count))
+    items = library._items
+    queries = [
+        ('title', 'machine 12'),
+        ('title', 'shadow garden'),
+        ('title', 'ocean'),
+        ('author', 'author 7'),
+        ('genre', 'program'),
+        ('title', 'st'),
+    ]
+    results = {}
+    for field, query in queries:
+        search = getattr(library, 'search_by_' + field)
+        lowered = query.lower()
+        indexed = min(timeit.repeat(lambda: search(query), number=1, repeat=repeat))
+        scan = min(timeit.repeat(lambda: [item for item in items if lowered in getattr(item, field).lower()],
+                                 number=1, repeat=repeat))
+        results[f'{field} {query!r} ({len(search(query))} found)'] = (indexed, scan)
+    return results
+
+
+def bench_query(count, repeat):
+    """Запрос по нескольким полям: query против трех поисков и пересечения результатов вручную"""
+    library = make_library(make_items(count))
+    author = 'author 7'
+
+    def manual():
+        by_type = set(map(id, library.search_by_type('Textbook')))
+        by_author = set(map(id, library.search_by_author(author)))
+        return [item for item in library.search_by_genre('fantasy') if id(item) in by_type and id(item) in by_author]
+
+    def measure(function):
+        return min(timeit.repeat(function, number=1, repeat=repeat))
+
+    return {
+        'fantasy textbooks by one author': (
+            measure(lambda: library.query(genre='fantasy', item_type='Textbook', author=author)), measure(manual)),
+        'first page of 20 available books': (
+            measure(lambda: library.query(item_type='Book', available_only=True, limit=20)),
+            measure(lambda: [item for item in library.search_by_type('Book') if item.available_copies > 0][:20])),
+    }
+
+
+def bench_counts(count, repeat):
+    """Счетчики для панели доступности: битовые индексы против прохода по предметам"""
+    library = make_library(make_items(count))
+    user = User(1, 'Reader')
+    with contextlib.redirect_stdout(io.StringIO()):
+        for item in library._items[::3]:
+            user.borrow_item(item)
+    items = library._items
+
+    def measure(function):
+        return min(timeit.repeat(function, number=1, repeat=repeat))
+
+    return {
+        'available items': (
+            measure(lambda: library.count(available_only=True)),
+            measure(lambda: sum(1 for item in items if item.available_copies > 0))),
+        'available textbooks': (
+            measure(lambda: library.count(item_type='Textbook', available_only=True)),
+            measure(lambda: sum(1 for item in items if item.item_type == 'Textbook' and item.available_copies > 0))),
+        'books without reservation': (
+            measure(lambda: library.count(item_type='Book', reserved=False)),
+            measure(lambda: sum(1 for item in items if item.item_type == 'Book' and item.reserved_by is None))),
+    }
+
+
+def bench_borrow(count, repeat):
+    """Взятие и возврат предмета с обновлением битовых индексов и без библиотеки"""
+    indexed = make_library(make_items(count))._items[0]
+    plain = Book('Title', 'Author', 'Genre', copies=1)
+    user = User(1, 'Reader')
+
+    def cycle(item):
+        return lambda: (user.borrow_item(item), user.return_item(item))
+
+    return (min(timeit.repeat(cycle(indexed), number=1000, repeat=repeat)) / 1000,
+            min(timeit.repeat(cycle(plain), number=1000, repeat=repeat)) / 1000)
+
+
+def write_catalogue(file, items):
+    writer = csv.DictWriter(file, ['Title', 'Author', 'Genre', 'ItemType', 'Copies', 'IssueNumber', 'Subject'],
+                            extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(item.to_record() for item in items)
+
+
+def bench_loading(count, batch_size):
+    """Загрузка каталога из CSV: (время, пик памяти) для библиотеки в памяти и для хранилища SQLite"""
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        items_file = os.path.join(directory, 'items.csv')
+        users_file = os.path.join(directory, 'users.csv')
+        with open(items_file, 'w', newline='', encoding='utf-8') as file:
+            write_catalogue(file, make_items(count))
+        with open(users_file, 'w', encoding='utf-8') as file:
+            file.write('UserID,Name\n1,Alice\n')
+
+        def measure(name, load):
+            tracemalloc.start()
+            start = time.perf_counter()
+            library = load()
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results[name] = (elapsed, peak)
+            return library
+
+        measure('in memory', lambda: Library.from_csv(items_file, users_file, batch_size=batch_size))
+        store = SQLiteCatalogue(os.path.join(directory, 'catalogue.db'))
+        measure('SQLite store', lambda: Library.from_csv(items_file, users_file, store=store, batch_size=batch_size))
+        store.close()
+    return results
+
+
+class DictItem:
+    """Предмет с __dict__ и без интернирования - как LibraryItem до перехода на __slots__"""
+
+    def __init__(self, title, author, genre, item_type, copies=1):
+        self._title = title
+        self._author = author
+        self._genre = genre
+        self._item_type = item_type
+        self._total_copies = copies
+        self._available_copies = copies
+        self._status = 'available'
+        self._borrow_date = None
+        self._due_date = None
+        self._reserved_by = None
+        self._library = None
+        self._item_id = None
+
+
+class DictTransaction:
+    """Транзакция с __dict__ - как Transaction до истории столбцами"""
+
+    def __init__(self, user, item, action):
+        self.user = user
+        self.item = item
+        self.action = action
+        self.date = datetime.now()
+
+
+def bench_memory(count):
+    """Байт на предмет и на транзакцию: объекты с __dict__ против предметов со __slots__
+    и истории транзакций столбцами.
+
+    Предметы строятся из разобранного CSV, поэтому у каждой строки свои объекты строк жанра и типа.
+    """
+    text = io.StringIO()
+    write_catalogue(text, make_items(count))
+    user = User(1, 'Reader')
+
+    def measure(build):
+        tracemalloc.start()
+        objects = build()
+        size = tracemalloc.get_traced_memory()[0] / count
+        tracemalloc.stop()
+        del objects
+        return size
+
+    def items(item_class):
+        text.seek(0)
+        return [item_class(row['Title'], row['Author'], row['Genre'], row['ItemType'], int(row['Copies']))
+                for row in csv.DictReader(text)]
+
+    library = Library()
+    library.add_user(user)
+    book = Book('Title', 'Author', 'Genre')
+    library.add_item(book)
+    # Номер предмета из большого каталога, а не из кэша малых целых
+    book._item_id = count
+
+    def history():
+        transactions = TransactionHistory()
+        for _ in range(count):
+            transactions.append(Transaction(user, book, 'borrowed'))
+        return transactions
+
+    return {
+        'item': (measure(lambda: items(DictItem)), measure(lambda: items(LibraryItem))),
+        'transaction': (measure(lambda: [DictTransaction(user, book, 'borrowed') for _ in range(count)]),
+                        measure(history)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки Library")
+    parser.add_argument('-n', '--items', type=int, default=200_000)
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    args = parser.parse_args()
+
+    indexed, plain = bench_build(args.items)
+    print(f"add {args.items} items: with indexes {indexed:.2f} s, plain list {plain * 1e3:.1f} ms")
+    print(f"search ({args.items} items):")
+    for name, (indexed, scan) in bench_search(args.items, args.repeat).items():
+        print(f"  {name}: index {indexed * 1e3:.2f} ms, linear scan {scan * 1e3:.1f} ms")
+    print(f"query ({args.items} items):")
+    for name, (planned, manual) in bench_query(args.items, args.repeat).items():
+        print(f"  {name}: query {planned * 1e3:.2f} ms, separate searches {manual * 1e3:.1f} ms")
+    print(f"counts ({args.items} items):")
+    for name, (bitmap, scan) in bench_counts(args.items, args.repeat).items():
+        print(f"  {name}: bitmaps {bitmap * 1e6:.1f} us, scan {scan * 1e3:.1f} ms")
+    indexed, plain = bench_borrow(args.items, args.repeat)
+    print(f"borrow + return: with bitmap updates {indexed * 1e6:.1f} us, without library {plain * 1e6:.1f} us")
+    print(f"loading {args.items} items from CSV (batches of {args.batch_size}):")
+    for name, (elapsed, peak) in bench_loading(args.items, args.batch_size).items():
+        print(f"  {name}: {elapsed:.2f} s, peak {peak / 1e6:.1f} MB")
+    print(f"memory per object ({args.items} objects):")
+    for name, (before, after) in bench_memory(args.items).items():
+        print(f"  {name}: __dict__ {before:.0f} B, compact {after:.0f} B")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+import bisect
+import heapq
+import re
+import sys
+from array import array
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+class TextIndex:
+    """Индекс одного текстового поля: поиск подстроки без учета регистра.
+
+    Индексируются различные значения поля (у многих предметов один автор или жанр):
+    у значения есть номер, по номеру хранится массив id предметов.
+    - триграммы: триграмма -> массив номеров значений, в которых она встречается;
+      подстрока проверяется только у значений из самого короткого массива ее триграмм;
+    - слова: слово -> массив номеров значений, для поиска по началу слов.
+    id предметов - 0, 1, 2, ... в порядке добавления, поэтому все массивы отсортированы.
+    """
+
+    def __init__(self):
+        self._value_ids = {}
+        self._values = []
+        self._items = []
+        # id предмета -> номер его значения
+        self._item_values = array('I')
+        self._trigrams = {}
+        self._tokens = {}
+        # Отсортированный список слов для поиска по началу слова; строится при первом запросе
+        self._sorted_tokens = None
+
+    def __len__(self):
+        return sum(len(items) for items in self._items)
+
+    def add(self, item_id, text):
+        text = text.lower()
+        value_id = self._value_ids.get(text)
+        if value_id is None:
+            value_id = self._value_ids[text] = len(self._values)
+            self._values.append(text)
+            self._items.append(array('I'))
+            _append(self._trigrams, {text[i:i + 3] for i in range(len(text) - 2)}, value_id)
+            _append(self._tokens, set(_TOKEN_RE.findall(text)), value_id)
+            self._sorted_tokens = None
+        self._items[value_id].append(item_id)
+        self._item_values.append(value_id)
+
+    def value_of(self, item_id):
+        return self._item_values[item_id]
+
+    def match(self, query):
+        """Номера значений, содержащих подстроку query без учета регистра"""
+        query = query.lower()
+        return [value_id for value_id in self._candidates(query) if query in self._values[value_id]]
+
+    def count(self, value_ids):
+        """Число предметов с этими значениями"""
+        return sum(len(self._items[value_id]) for value_id in value_ids)
+
+    def iter_item_ids(self, value_ids):
+        """id предметов с этими значениями по возрастанию, без построения общего списка"""
+        return heapq.merge(*(self._items[value_id] for value_id in value_ids))
+
+    def search(self, query):
+        """id предметов, в поле которых есть подстрока query, по возрастанию"""
+        return self._item_ids(self.match(query))
+
+    def search_prefix(self, query):
+        """id предметов, у которых каждое слово query - начало какого-нибудь слова поля"""
+        words = _TOKEN_RE.findall(query.lower())
+        if not words:
+            return self._item_ids(range(len(self._values)))
+        if self._sorted_tokens is None:
+            self._sorted_tokens = sorted(self._tokens)
+        value_ids = None
+        for word in words:
+            start = bisect.bisect_left(self._sorted_tokens, word)
+            end = bisect.bisect_left(self._sorted_tokens, word + '\U0010ffff', start)
+            matches = set()
+            for token in self._sorted_tokens[start:end]:
+                matches.update(self._tokens[token])
+            value_ids = matches if value_ids is None else value_ids & matches
+            if not value_ids:
+                return []
+        return self._item_ids(sorted(value_ids))
+
+    def _candidates(self, query):
+        """Номера значений, в которых могут быть все триграммы query (проверяются подстрокой)"""
+        if len(query) < 3:
+            # Для коротких запросов триграмм нет - проверяются все различные значения
+            return range(len(self._values))
+        smallest = None
+        for trigram in {query[i:i + 3] for i in range(len(query) - 2)}:
+            posting = self._trigrams.get(trigram)
+            if posting is None:
+                return ()
+            if smallest is None or len(posting) < len(smallest):
+                smallest = posting
+        # Пересечение с остальными списками дороже проверки подстроки у кандидатов самого короткого
+        return smallest
+
+    def _item_ids(self, value_ids):
+        item_ids = [item_id for value_id in value_ids for item_id in self._items[value_id]]
+        # Списки каждого значения отсортированы, а у уникальных значений (названий) номера растут
+        # вместе с id предметов, поэтому сортировка почти упорядоченного списка дешевая
+        item_ids.sort()
+        return item_ids
+
+
+def _append(postings, keys, value_id):
+    for key in keys:
+        posting = postings.get(key)
+        if posting is None:
+            # setdefault создавал бы пустой массив и для уже известных ключей
+            posting = postings[key] = array('I')
+        posting.append(value_id)
+
+
+class Bitmap:
+    """Множество id предметов: бит id в bytearray. Число элементов хранится, поэтому len() - O(1).
+
+    Пересечение (&) выполняется над целыми числами из байтов, число элементов результата - popcount.
+    """
+
+    def __init__(self, bits=b'', count=0):
+        self._bits = bytearray(bits)
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, item_id):
+        byte = item_id >> 3
+        return byte < len(self._bits) and bool(self._bits[byte] >> (item_id & 7) & 1)
+
+    def __iter__(self):
+        return iter_bits(self._bits)
+
+    def __and__(self, other):
+        size = min(len(self._bits), len(other._bits))
+        bits = int.from_bytes(self._bits[:size], 'little') & int.from_bytes(other._bits[:size], 'little')
+        return Bitmap(bits.to_bytes(size, 'little'), bits.bit_count())
+
+    def complement(self, size):
+        """Множество id из range(size), которых нет в этом"""
+        byte_size = (size + 7) // 8
+        bits = int.from_bytes(self._bits[:byte_size], 'little') ^ ((1 << size) - 1)
+        return Bitmap(bits.to_bytes(byte_size, 'little'), bits.bit_count())
+
+    def add(self, item_id):
+        byte = item_id >> 3
+        if byte >= len(self._bits):
+            self._bits.extend(bytes(byte + 1 - len(self._bits)))
+        mask = 1 << (item_id & 7)
+        if not self._bits[byte] & mask:
+            self._bits[byte] |= mask
+            self._count += 1
+
+    def discard(self, item_id):
+        byte = item_id >> 3
+        mask = 1 << (item_id & 7)
+        if byte < len(self._bits) and self._bits[byte] & mask:
+            self._bits[byte] &= ~mask
+            self._count -= 1
+
+    def set(self, item_id, value):
+        if value:
+            self.add(item_id)
+        else:
+            self.discard(item_id)
+
+
+def iter_bits(data):
+    """Номера установленных битов по возрастанию; нулевые 64-битные слова пропускаются целиком"""
+    words = array('Q', bytes(data) + bytes(-len(data) % 8))
+    if sys.byteorder == 'big':
+        words.byteswap()
+    for index, word in enumerate(words):
+        base = index << 6
+        while word:
+            low = word & -word
+            yield base + low.bit_length() - 1
+            word ^= low
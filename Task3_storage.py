@@ -0,0 +1,207 @@
+import re
+import sqlite3
+
+# Столбец CSV каталога -> столбец таблицы items
+_COLUMNS = {
+    'Title': 'title',
+    'Author': 'author',
+    'Genre': 'genre',
+    'ItemType': 'item_type',
+    'IssueNumber': 'issue_number',
+    'Subject': 'subject',
+    'Copies': 'copies',
+    'Available': 'available',
+    'ReservedBy': 'reserved_by',
+    'Status': 'status',
+    'BorrowDate': 'borrow_date',
+    'DueDate': 'due_date',
+}
+# Столбцы, которые меняются при выдаче, возврате и брони
+_STATE_COLUMNS = ('Available', 'ReservedBy', 'Status', 'BorrowDate', 'DueDate')
+
+# У issue_number и subject нет типа: значения хранятся как есть (номер выпуска может быть числом).
+# Для поиска у текстовых полей есть столбцы, заполняемые в Python, как в TextIndex:
+# *_key - значение в нижнем регистре (lower() SQLite меняет регистр только у ASCII),
+# *_words - слова \w+ значения через пробел с пробелом в начале, для поиска по началу слов.
+# Даты выдачи и возврата - строки ISO 8601
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    item_id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    author TEXT NOT NULL,
+    genre TEXT NOT NULL,
+    item_type TEXT NOT NULL,
+    type_key TEXT NOT NULL,
+    issue_number,
+    subject,
+    copies INTEGER NOT NULL,
+    available INTEGER NOT NULL,
+    reserved_by INTEGER,
+    status TEXT,
+    borrow_date TEXT,
+    due_date TEXT,
+    title_key TEXT NOT NULL,
+    author_key TEXT NOT NULL,
+    genre_key TEXT NOT NULL,
+    title_words TEXT NOT NULL,
+    author_words TEXT NOT NULL,
+    genre_words TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_by_type ON items (type_key, available);
+CREATE INDEX IF NOT EXISTS items_by_available ON items (available);
+"""
+
+_TEXT_FIELDS = ('title', 'author', 'genre')
+_SEARCH_COLUMNS = [f'{field}_key' for field in _TEXT_FIELDS] + [f'{field}_words' for field in _TEXT_FIELDS]
+# Индекс триграмм над столбцами поиска (rowid - номер предмета): подстрока из трех и более символов
+# ищется по индексу, а не перебором таблицы. Без содержимого - тексты уже есть в items
+_TEXT_INDEX_SCHEMA = (f"CREATE VIRTUAL TABLE items_text USING fts5({', '.join(_SEARCH_COLUMNS)}, content='', "
+                      f"tokenize='trigram case_sensitive 1')")
+_SELECT_ITEMS = f"SELECT item_id, {', '.join(_COLUMNS.values())} FROM items"
+_INSERT_ITEM = (f"INSERT INTO items (item_id, type_key, {', '.join(_COLUMNS.values())}, {', '.join(_SEARCH_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * (len(_COLUMNS) + len(_SEARCH_COLUMNS) + 2))})")
+_INSERT_TEXT = (f"INSERT INTO items_text (rowid, {', '.join(_SEARCH_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * (len(_SEARCH_COLUMNS) + 1))})")
+_UPDATE_STATE = (f"UPDATE items SET {', '.join(f'{_COLUMNS[column]} = ?' for column in _STATE_COLUMNS)} "
+                 f"WHERE item_id = ?")
+# Короче триграммы подстроку по индексу не найти
+_MIN_INDEXED_LENGTH = 3
+_WORD_RE = re.compile(r'\w+')
+
+
+class SQLiteCatalogue:
+    """Каталог предметов в SQLite - для каталогов, которые не помещаются в память.
+
+    Работает со строками каталога (словарями со столбцами CSV, как в items.csv)
+    и номерами предметов 0, 1, 2, ... в порядке добавления; объекты предметов создает Library.
+    Поиск подстроки и по началу слов - с теми же правилами, что у TextIndex, по индексу триграмм FTS5;
+    подстроки короче трех символов (и весь поиск, если SQLite собран без FTS5 или старше 3.34) -
+    перебором всей таблицы. Тип и доступность - по индексам.
+    """
+
+    def __init__(self, file_name=':memory:'):
+        self.connection = sqlite3.connect(file_name)
+        self.connection.executescript(_SCHEMA)
+        # Файлы предыдущей версии - без столбцов состояния выдачи
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(items)")}
+        for column in ('status', 'borrow_date', 'due_date'):
+            if column not in columns:
+                self.connection.execute(f"ALTER TABLE items ADD COLUMN {column} TEXT")
+        self.text_index = self._create_text_index()
+        self._count = self.connection.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def _create_text_index(self):
+        """True, если индекс триграмм есть или создан; False, если SQLite его не поддерживает"""
+        if self.connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'items_text'").fetchone():
+            return True
+        try:
+            self.connection.execute(_TEXT_INDEX_SCHEMA)
+        except sqlite3.OperationalError:
+            return False
+        # Предметы, добавленные до появления индекса
+        self.connection.execute(f"INSERT INTO items_text (rowid, {', '.join(_SEARCH_COLUMNS)}) "
+                                f"SELECT item_id, {', '.join(_SEARCH_COLUMNS)} FROM items")
+        self.connection.commit()
+        return True
+
+    def __len__(self):
+        return self._count
+
+    def add_items(self, records):
+        """Добавление пачки строк одной транзакцией; возвращает номера добавленных предметов"""
+        rows = [(self._count + offset, record['ItemType'].lower(), *(record.get(column) for column in _COLUMNS),
+                 *_search_values(record))
+                for offset, record in enumerate(records)]
+        self.connection.executemany(_INSERT_ITEM, rows)
+        if self.text_index:
+            self.connection.executemany(_INSERT_TEXT, [(row[0], *row[-len(_SEARCH_COLUMNS):]) for row in rows])
+        self.connection.commit()
+        item_ids = range(self._count, self._count + len(rows))
+        self._count += len(rows)
+        return item_ids
+
+    def update_item(self, item_id, record):
+        """Сохранение изменяемых столбцов строки record: Available, ReservedBy (None - брони нет),
+        Status, BorrowDate и DueDate
+        """
+        self.connection.execute(_UPDATE_STATE, (*(record.get(column) for column in _STATE_COLUMNS), item_id))
+        self.connection.commit()
+
+    def get_item(self, item_id):
+        row = self.connection.execute(_SELECT_ITEMS + " WHERE item_id = ?", (item_id,)).fetchone()
+        return _record(row)[1] if row else None
+
+    def query(self, title=None, author=None, genre=None, item_type=None, available_only=False, reserved=None,
+              limit=None, offset=0, prefix=None):
+        """Пары (номер, строка каталога), подходящие под все условия, в порядке добавления.
+
+        Условия те же, что у Library.query; prefix - (поле, текст) для поиска по началу слов.
+        """
+        where, parameters = self._where(title, author, genre, item_type, available_only, reserved, prefix)
+        rows = self.connection.execute(f"{_SELECT_ITEMS}{where} ORDER BY item_id LIMIT ? OFFSET ?",
+                                       (*parameters, -1 if limit is None else limit, offset))
+        return [_record(row) for row in rows]
+
+    def count(self, item_type=None, available_only=False, reserved=None):
+        where, parameters = self._where(item_type=item_type, available_only=available_only, reserved=reserved)
+        return self.connection.execute(f"SELECT COUNT(*) FROM items{where}", parameters).fetchone()[0]
+
+    def _where(self, title=None, author=None, genre=None, item_type=None, available_only=False, reserved=None,
+               prefix=None):
+        conditions = []
+        parameters = []
+        # Фразы запроса к индексу триграмм: все условия по тексту, которые он может проверить
+        phrases = []
+        for field, text in zip(_TEXT_FIELDS, (title, author, genre)):
+            if text is not None:
+                text = text.lower()
+                if self.text_index and len(text) >= _MIN_INDEXED_LENGTH:
+                    phrases.append(_phrase(f'{field}_key', text))
+                else:
+                    conditions.append(f"instr({field}_key, ?) > 0")
+                    parameters.append(text)
+        if prefix is not None:
+            field, text = prefix
+            if field not in _TEXT_FIELDS:
+                raise ValueError(f"Unknown field: {field}")
+            # В *_words каждое слово начинается после пробела; подчеркивание входит в \w,
+            # поэтому экранируется для LIKE
+            for word in _WORD_RE.findall(text.lower()):
+                if self.text_index and len(word) + 1 >= _MIN_INDEXED_LENGTH:
+                    phrases.append(_phrase(f'{field}_words', ' ' + word))
+                else:
+                    conditions.append(f"{field}_words LIKE ? ESCAPE '\\'")
+                    parameters.append('% ' + word.replace('\\', '\\\\').replace('_', '\\_') + '%')
+        if phrases:
+            conditions.insert(0, "item_id IN (SELECT rowid FROM items_text WHERE items_text MATCH ?)")
+            parameters.insert(0, ' AND '.join(phrases))
+        if item_type is not None:
+            conditions.append("type_key = ?")
+            parameters.append(item_type.lower())
+        if available_only:
+            conditions.append("available > 0")
+        if reserved is not None:
+            conditions.append("reserved_by IS NOT NULL" if reserved else "reserved_by IS NULL")
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where, parameters
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+
+def _phrase(column, text):
+    """Условие FTS5: text подряд в столбце column. Триграммы фразы идут подряд,
+    поэтому совпадение - ровно вхождение подстроки
+    """
+    text = text.replace('"', '""')
+    return f'{column} : "{text}"'
+
+
+def _search_values(record):
+    texts = [record[column].lower() for column in ('Title', 'Author', 'Genre')]
+    return (*texts, *(' ' + ' '.join(_WORD_RE.findall(text)) for text in texts))
+
+
+def _record(row):
+    return row[0], dict(zip(_COLUMNS, row[1:]))
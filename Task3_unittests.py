@@ -1,7 +1,15 @@
+import gc
+import multiprocessing
+import os
+import tempfile
 import unittest
-from datetime import timedelta
+import weakref
+from datetime import datetime, timedelta
 from unittest.mock import patch
-from Task3_Library import Book, LibraryItem, Magazine, Textbook, User, Transaction, Library
+from Task3_Library import (Book, LibraryItem, Magazine, Textbook, User, Transaction, TransactionHistory, Library,
+                           iter_catalogue, iter_item_batches)
+from Task3_index import Bitmap, TextIndex
+from Task3_storage import SQLiteCatalogue
 
 
 class TestLibrarySystem(unittest.TestCase):
@@ -106,5 +114,379 @@ class TestLibrarySystem(unittest.TestCase):
         self.assertIn(self.textbook, result_textbooks)
 
 
+class TestSearchIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.library = Library()
+        titles = ["The Hobbit", "Hobbit Tales", "Python Crash Course", "Fluent Python", "It", "Dune"]
+        self.items = [Book(title, f"Author {i % 2}", "Fantasy" if i < 2 else "Programming")
+                      for i, title in enumerate(titles)]
+        self.library.add_items(self.items)
+
+    def linear(self, field, text):
+        return [item for item in self.items if text.lower() in getattr(item, field).lower()]
+
+    def test_matches_linear_scan(self):
+        # Индекс дает те же результаты и в том же порядке, что и перебор, в том числе для коротких запросов
+        for query in ["hobbit", "HOBBIT", "python", "on C", "it", "t", "", "e Hob", "missing", "ythonX"]:
+            self.assertEqual(self.library.search_by_title(query), self.linear('title', query), query)
+        for query in ["author 1", "Author", "r 0"]:
+            self.assertEqual(self.library.search_by_author(query), self.linear('author', query), query)
+        self.assertEqual(self.library.search_by_genre("gram"), self.items[2:])
+
+    def test_add_item_updates_index(self):
+        book = Book("Another Hobbit", "Someone", "Fantasy")
+        self.library.add_item(book)
+        self.assertEqual(self.library.search_by_title("hobbit"), [self.items[0], self.items[1], book])
+
+    def test_search_prefix(self):
+        self.assertEqual(self.library.search_prefix('title', "pyth"), [self.items[2], self.items[3]])
+        self.assertEqual(self.library.search_prefix('title', "flu py"), [self.items[3]])
+        self.assertEqual(self.library.search_prefix('title', "obbit"), [])
+
+    def test_shared_values_are_indexed_once(self):
+        index = TextIndex()
+        for item_id in range(5):
+            index.add(item_id, "Same Genre")
+        self.assertEqual(len(index), 5)
+        self.assertEqual(len(index._values), 1)
+        self.assertEqual(index.search("genre"), [0, 1, 2, 3, 4])
+
+
+class TestLibraryQuery(unittest.TestCase):
+
+    def setUp(self):
+        self.library = Library()
+        self.items = []
+        for i in range(30):
+            genre = "Fantasy" if i % 2 else "Science"
+            author = f"Author {i % 3}"
+            if i % 3 == 0:
+                item = Textbook(f"Title {i}", author, genre, "Physics")
+            elif i % 3 == 1:
+                item = Book(f"Title {i}", author, genre)
+            else:
+                item = Magazine(f"Title {i}", author, genre, i)
+            self.items.append(item)
+        self.library.add_items(self.items)
+
+    def test_combined_conditions(self):
+        result = self.library.query(genre="fantasy", item_type="textbook", author="author 0")
+        expected = [item for item in self.items
+                    if item.genre == "Fantasy" and item.item_type == "Textbook" and item.author == "Author 0"]
+        self.assertEqual(result, expected)
+        self.assertEqual(self.library.query(title="title 1", genre="science"),
+                         [item for item in self.items if item.title.startswith("Title 1") and item.genre == "Science"])
+
+    def test_available_only(self):
+        user = User(1, "Reader")
+        user.borrow_item(self.items[1])
+        result = self.library.query(item_type="Book", available_only=True)
+        self.assertNotIn(self.items[1], result)
+        self.assertEqual(len(result), 9)
+
+    def test_pagination(self):
+        books = self.library.search_by_type("Book")
+        self.assertEqual(self.library.query(item_type="Book", limit=3), books[:3])
+        self.assertEqual(self.library.query(item_type="Book", limit=3, offset=8), books[8:])
+        self.assertEqual(self.library.query(limit=2, offset=5), self.items[5:7])
+
+    def test_no_matches(self):
+        self.assertEqual(self.library.query(title="missing", item_type="Book"), [])
+        self.assertEqual(self.library.query(item_type="Scroll"), [])
+
+
+class TestBitmapIndexes(unittest.TestCase):
+
+    def setUp(self):
+        self.library = Library()
+        self.books = [Book(f"Book {i}", "Author", "Genre", copies=1) for i in range(10)]
+        self.magazines = [Magazine(f"Magazine {i}", "Author", "Genre", i, copies=2) for i in range(5)]
+        self.library.add_items(self.books + self.magazines)
+        self.alice = User(1, "Alice")
+        self.bob = User(2, "Bob")
+
+    def test_bitmap(self):
+        first, second = Bitmap(), Bitmap()
+        for item_id in (0, 5, 63, 64, 1000):
+            first.add(item_id)
+        for item_id in (5, 64, 2000):
+            second.add(item_id)
+        first.discard(0)
+        first.discard(1)
+        self.assertEqual(len(first), 4)
+        self.assertEqual(list(first & second), [5, 64])
+        self.assertEqual(len(first & second), 2)
+        self.assertNotIn(2000, first)
+        self.assertEqual(list(second.complement(8)), [0, 1, 2, 3, 4, 6, 7])
+
+    def test_borrow_and_return_update_counts(self):
+        self.assertEqual(self.library.count(available_only=True), 15)
+        self.assertEqual(self.library.count(item_type="book"), 10)
+        self.alice.borrow_item(self.books[3])
+        self.alice.borrow_item(self.magazines[0])
+        self.assertEqual(self.library.count(item_type="Book", available_only=True), 9)
+        # У журнала остался второй экземпляр
+        self.assertEqual(self.library.count(item_type="Magazine", available_only=True), 5)
+        self.assertNotIn(self.books[3], self.library.available_items())
+        self.alice.return_item(self.books[3])
+        self.assertEqual(self.library.count(item_type="Book", available_only=True), 10)
+
+    def test_reservations(self):
+        self.alice.borrow_item(self.books[0])
+        self.bob.reserve_item(self.books[0])
+        self.assertEqual(self.library.count(reserved=True), 1)
+        self.assertEqual(self.library.count(reserved=False), 14)
+        self.assertEqual(self.library.query(reserved=True), [self.books[0]])
+        self.bob.cancel_reservation(self.books[0])
+        self.assertEqual(self.library.count(reserved=True), 0)
+
+    def test_query_uses_bitmaps(self):
+        self.alice.borrow_item(self.books[1])
+        self.assertEqual(self.library.query(item_type="Book", available_only=True, limit=2),
+                         [self.books[0], self.books[2]])
+        self.assertEqual(self.library.query(title="book 1", available_only=True), [])
+        self.assertEqual(self.library.count(item_type="Scroll"), 0)
+
+
+class TestCatalogueLoading(unittest.TestCase):
+
+    ITEMS = (
+        "Title,Author,Genre,ItemType,Copies,IssueNumber,Subject\n"
+        "Dune,Herbert,Fiction,Book,2,,\n"
+        "Science Weekly,Editors,Science,Magazine,1,42,\n"
+        "Physics I,Feynman,Science,Textbook,3,,Physics\n"
+        "Dune Messiah,Herbert,Fiction,Book,1,,\n"
+    )
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.items_file = self.write('items.csv', self.ITEMS)
+        self.users_file = self.write('users.csv', "UserID,Name\n1,Alice\n2,Bob\n")
+
+    def write(self, name, text):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            file.write(text)
+        return path
+
+    def test_typed_columns(self):
+        items = LibraryItem.from_csv(self.items_file)
+        self.assertEqual([type(item) for item in items], [Book, Magazine, Textbook, Book])
+        self.assertEqual(items[1].issue_number, '42')
+        self.assertEqual(items[2].subject, 'Physics')
+        self.assertEqual(items[2].total_copies, 3)
+
+    def test_batches(self):
+        batches = list(iter_item_batches(self.items_file, batch_size=3))
+        self.assertEqual([len(batch) for batch in batches], [3, 1])
+
+    def test_unknown_type_is_an_error(self):
+        path = self.write('bad.csv', "Title,Author,Genre,ItemType,Copies\nScroll,Anon,History,Scroll,1\n")
+        with self.assertRaisesRegex(ValueError, "line 2.*Scroll"):
+            LibraryItem.from_csv(path)
+
+    def test_multiple_files_in_processes(self):
+        second = self.write('more.csv', "Title,Author,Genre,ItemType,Copies\nEmma,Austen,Fiction,Book,1\n")
+        batches = list(iter_catalogue([self.items_file, second], batch_size=10, processes=2))
+        self.assertEqual([item.title for batch in batches for item in batch],
+                         ["Dune", "Science Weekly", "Physics I", "Dune Messiah", "Emma"])
+        # Рабочие процессы отдают файл пачками, а не целиком
+        batches = list(iter_catalogue([self.items_file, second], batch_size=3, processes=2))
+        self.assertEqual([len(batch) for batch in batches], [3, 1, 1])
+
+    def test_error_in_worker_process(self):
+        bad = self.write('bad.csv', "Title,Author,Genre,ItemType,Copies\nScroll,Anon,History,Scroll,1\n")
+        with self.assertRaisesRegex(ValueError, "line 2.*Scroll"):
+            list(iter_catalogue([self.items_file, bad, self.items_file], batch_size=1, processes=2))
+        self.assertEqual(multiprocessing.active_children(), [])
+
+    def test_from_csv_into_store(self):
+        store = SQLiteCatalogue(os.path.join(self.directory.name, 'catalogue.db'))
+        self.addCleanup(store.close)
+        library = Library.from_csv(self.items_file, self.users_file, store=store, batch_size=2)
+        self.assertEqual(len(library), 4)
+        self.assertEqual(library._items, [])
+        self.assertEqual([item.title for item in library.search_by_title("dune")], ["Dune", "Dune Messiah"])
+        self.assertEqual(library.search_by_type("magazine")[0].issue_number, '42')
+        self.assertEqual([item.title for item in library.search_prefix('title', "mess")], ["Dune Messiah"])
+        self.assertEqual([item.title for item in library.query(genre="science", item_type="Textbook")], ["Physics I"])
+
+        user = library._users[0]
+        book = library.search_by_title("Dune Messiah")[0]
+        user.borrow_item(book)
+        self.assertEqual(library.count(item_type="Book", available_only=True), 1)
+        self.assertEqual(library.query(available_only=True, limit=1, offset=1)[0].title, "Science Weekly")
+        # Число свободных экземпляров сохранено в хранилище
+        self.assertEqual(library.search_by_title("Dune Messiah")[0].available_copies, 0)
+
+    def test_borrow_and_return_through_store(self):
+        path = os.path.join(self.directory.name, 'catalogue.db')
+        store = SQLiteCatalogue(path)
+        library = Library.from_csv(self.items_file, self.users_file, store=store)
+        alice, bob = library._users
+        alice.borrow_item(library.search_by_title("Dune Messiah")[0])
+        # Повторный поиск возвращает тот же объект, поэтому возврат находит взятый предмет
+        book = library.search_by_title("Dune Messiah")[0]
+        self.assertIn(book, alice.borrowed_items)
+        self.assertTrue(book.status.startswith('borrowed'))
+        bob.reserve_item(book)
+        alice.return_item(library.search_by_author("herbert")[1])
+        self.assertEqual(book.available_copies, 1)
+        self.assertEqual(library.count(item_type="Book", available_only=True), 2)
+        store.close()
+
+        # Бронь сохраняется с UserID и восстанавливается в новой библиотеке
+        store = SQLiteCatalogue(path)
+        self.addCleanup(store.close)
+        reopened = Library(store)
+        reopened.add_user(User(2, "Bob"))
+        self.assertEqual(reopened.search_by_title("Dune Messiah")[0].reserved_by.name, "Bob")
+        self.assertEqual(reopened.count(reserved=True), 1)
+
+    def test_borrow_state_survives_collected_object(self):
+        store = SQLiteCatalogue()
+        self.addCleanup(store.close)
+        library = Library.from_csv(self.items_file, self.users_file, store=store)
+        alice = library._users[0]
+        book = library.search_by_title("Dune Messiah")[0]
+        alice.borrow_item(book)
+        due_date = book.due_date
+        # Предмет больше нигде не используется, и объект удаляется
+        alice.borrowed_items.clear()
+        del book
+        gc.collect()
+        book = library.search_by_title("Dune Messiah")[0]
+        self.assertEqual(book.status, 'borrowed by Alice')
+        self.assertEqual(book.due_date, due_date)
+        self.assertEqual(book.due_date - book.borrow_date, timedelta(days=14))
+
+        alice.borrowed_items.append(book)
+        alice.return_item(book)
+        del book
+        gc.collect()
+        book = library.search_by_title("Dune Messiah")[0]
+        self.assertEqual((book.status, book.borrow_date, book.due_date), ('available', None, None))
+
+    def test_history_does_not_keep_items(self):
+        store = SQLiteCatalogue()
+        self.addCleanup(store.close)
+        library = Library.from_csv(self.items_file, self.users_file, store=store)
+        alice = library._users[0]
+        book = library.search_by_title("Dune Messiah")[0]
+        alice.borrow_item(book)
+        alice.return_item(book)
+        for transaction in alice.transaction_history:
+            library.record_transaction(transaction)
+        alive = weakref.ref(book)
+        del book
+        gc.collect()
+        self.assertIsNone(alive())
+        # Предмет и пользователь находятся по номерам при обращении
+        borrowed, returned = library._transactions
+        self.assertEqual((borrowed.item.title, borrowed.action, returned.action),
+                         ("Dune Messiah", 'borrowed', 'returned'))
+        self.assertIs(returned.user, alice)
+        self.assertIs(returned.item, borrowed.item)
+        self.assertLessEqual(abs(datetime.now() - returned.date), timedelta(seconds=1))
+
+
+class TestCompactObjects(unittest.TestCase):
+
+    def test_no_instance_dict(self):
+        user = User(1, "Reader")
+        book = Book("Title", "Author", "Genre")
+        objects = [book, Magazine("Title", "Author", "Genre", 1), Textbook("Title", "Author", "Genre", "Math"),
+                   user, Transaction(user, book, 'borrowed')]
+        for obj in objects:
+            self.assertFalse(hasattr(obj, '__dict__'), type(obj).__name__)
+
+    def test_transaction_history(self):
+        library = Library()
+        alice = User(1, "Alice")
+        library.add_user(alice)
+        book = Book("Dune", "Herbert", "Fiction")
+        library.add_item(book)
+        detached = Book("Emma", "Austen", "Fiction")
+        history = TransactionHistory([Transaction(alice, book, 'borrowed'),
+                                      Transaction(User(2, "Bob"), book, 'reserved'),
+                                      Transaction(alice, detached, 'borrowed', timestamp=0)])
+        self.assertEqual(len(history), 3)
+        self.assertEqual([(transaction.user.name, transaction.item.title, transaction.action)
+                          for transaction in history],
+                         [("Alice", "Dune", 'borrowed'), ("Bob", "Dune", 'reserved'), ("Alice", "Emma", 'borrowed')])
+        self.assertIs(history[-1].item, detached)
+        self.assertEqual(history[2].date, datetime.fromtimestamp(0))
+        self.assertEqual([transaction.action for transaction in history[:2]], ['borrowed', 'reserved'])
+        # Записи первой библиотеки хранятся номерами, а не объектами
+        self.assertEqual(list(history._item_ids), [0, -1, -1])
+        with self.assertRaises(IndexError):
+            history[3]
+
+    def test_genre_and_type_interned(self):
+        first = Book("A", "Author", "".join(["Fan", "tasy"]))
+        second = Book("B", "Author", "".join(["Fant", "asy"]))
+        self.assertIs(first.genre, second.genre)
+        item = LibraryItem("C", "Author", "Fantasy", "".join(["Bo", "ok"]))
+        self.assertIs(item.item_type, first.item_type)
+
+
+class TestStoreMatchesIndex(unittest.TestCase):
+
+    def setUp(self):
+        def items():
+            return [Book("Война и мир", "Лев Толстой", "Роман"),
+                    Book("Harry-Potter and the Stone", "J. K. Rowling", "Fantasy"),
+                    Magazine("ТОЛСТЫЙ журнал", "Редакция", "Публицистика", 3),
+                    Textbook("Analysis_I", "Зорич", "Математика", "Анализ"),
+                    Book("Anna Karenina", "Лев Толстой", "Роман")]
+
+        self.memory = Library()
+        self.memory.add_items(items())
+        self.store = SQLiteCatalogue()
+        self.addCleanup(self.store.close)
+        self.stored = Library(self.store)
+        self.stored.add_items(items())
+
+    def titles(self, items):
+        return [item.title for item in items]
+
+    def test_same_results(self):
+        self.assertTrue(self.store.text_index)
+        self.check_same_results()
+
+    def test_same_results_without_text_index(self):
+        # Так ищет SQLite без FTS5
+        self.store.text_index = False
+        self.check_same_results()
+
+    def test_text_index_filled_for_existing_file(self):
+        path = os.path.join(tempfile.mkdtemp(), 'catalogue.db')
+        self.addCleanup(os.remove, path)
+        store = SQLiteCatalogue(path)
+        store.add_items([Book("Война и мир", "Лев Толстой", "Роман").to_record()])
+        store.connection.execute("DROP TABLE items_text")
+        store.close()
+        store = SQLiteCatalogue(path)
+        self.addCleanup(store.close)
+        self.assertEqual([record['Title'] for _, record in store.query(title="ойна и")], ["Война и мир"])
+
+    def check_same_results(self):
+        searches = [('search_by_title', "война"), ('search_by_title', "ТОЛ"), ('search_by_author', "толстой"),
+                    ('search_by_genre', "РОМ"), ('search_by_title', "potter"), ('search_by_title', "-"),
+                    ('search_by_title', ""), ('search_by_title', 'y "'), ('search_by_title', "Y-Potter AND")]
+        for method, text in searches:
+            expected = self.titles(getattr(self.memory, method)(text))
+            self.assertEqual(self.titles(getattr(self.stored, method)(text)), expected, (method, text))
+            self.assertTrue(expected or text in ("-", 'y "'), (method, text))
+        for field, text in [('title', "potter"), ('title', "ТОЛ жур"), ('author', "лев"), ('title', "analysis"),
+                            ('title', "i"), ('title', "arry"), ('title', "an i_"), ('author', "j k")]:
+            self.assertEqual(self.titles(self.stored.search_prefix(field, text)),
+                             self.titles(self.memory.search_prefix(field, text)), (field, text))
+        self.assertEqual(self.titles(self.stored.query(author="ТОЛСТ", genre="роман", limit=1, offset=1)),
+                         self.titles(self.memory.query(author="ТОЛСТ", genre="роман", limit=1, offset=1)))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,41 @@
+import argparse
+import os
+import subprocess
+import sys
+
+MODULES = ('Task1_Roman_Numeral', 'Task2_Task_Manager', 'Task3_Library', 'main')
+
+
+def import_time_us(module):
+    """Суммарное время импорта модуля в микросекундах по выводу python -X importtime"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        raise RuntimeError(f"Cannot import {module}: {result.stderr.strip().splitlines()[-1]}")
+    # Формат строк: "import time: self [us] | cumulative | imported package"
+    for line in result.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1])
+    raise RuntimeError(f"No importtime data for {module}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Время импорта модулей (python -X importtime)")
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    parser.add_argument('-b', '--budget-ms', type=float, default=50.0, help="допустимое время импорта")
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    over_budget = False
+    for module in args.modules:
+        # Минимум по нескольким запускам: первый запуск может включать компиляцию .pyc
+        elapsed_ms = min(import_time_us(module) for _ in range(args.repeat)) / 1000
+        status = 'ok' if elapsed_ms <= args.budget_ms else 'OVER BUDGET'
+        over_budget = over_budget or elapsed_ms > args.budget_ms
+        print(f"{module}: {elapsed_ms:.1f} ms ({status})")
+    return 1 if over_budget else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,12 +1,14 @@
-import multiprocessing
-from concurrent.futures import ThreadPoolExecutor
+from __future__ import annotations
+
 from queue import Queue, Empty
+from typing import TYPE_CHECKING
 from urllib.parse import urlparse
 
-import bs4.element
-import pandas as pd
-import requests
-from bs4 import BeautifulSoup
+# Тяжелые зависимости (bs4, pandas, requests, concurrent.futures) импортируются лениво в методах,
+# чтобы импорт модуля не тратил время на их загрузку
+if TYPE_CHECKING:
+    import bs4.element
+    import pandas as pd
 
 
 class MultiThreaderCrawler:
@@ -15,6 +17,8 @@ class MultiThreaderCrawler:
         self.seed_url = seed_url
         self.root_url = '{}://{}'.format(urlparse(self.seed_url).scheme,
                                          urlparse(self.seed_url).netloc)
+        from concurrent.futures import ThreadPoolExecutor
+
         self.pool = ThreadPoolExecutor(max_workers=5)
         self.scraped_pages = set([])
         self.scraped_articles = list()
@@ -31,11 +35,15 @@ class MultiThreaderCrawler:
         self.scraped_articles.append((username.text.strip(), rating.text, views.text, title.text))
 
     def parse_articles(self, html):
+        from bs4 import BeautifulSoup
+
         soup = BeautifulSoup(html, 'html.parser')
         articles = soup.find_all("article", {"class": "tm-articles-list__item"})
         [self.parse_article(div) for div in articles]
 
     def scrape_info(self, html):
+        from bs4 import BeautifulSoup
+
         soup = BeautifulSoup(html, 'html5lib')
         web_page_paragraph_contents = soup('p')
         text = ''
@@ -51,6 +59,8 @@ class MultiThreaderCrawler:
             self.scrape_info(result.text)
 
     def scrape_page(self, url):
+        import requests
+
         try:
             res = requests.get(url, timeout=(3, 30))
             return res
@@ -79,12 +89,19 @@ class MultiThreaderCrawler:
     #     return
 
     def get_df(self) -> pd.DataFrame:
+        import pandas as pd
+
         return pd.DataFrame(self.scraped_articles, columns=["username", "rating", "views", "title"])
 
 
-cc = MultiThreaderCrawler('https://habr.com/ru/flows/design/articles/')
-cc.run_web_crawler()
-df = cc.get_df()
-# cc.info()
-df["rating"] = df["rating"].astype(int)
-print(df)
+def main():
+    cc = MultiThreaderCrawler('https://habr.com/ru/flows/design/articles/')
+    cc.run_web_crawler()
+    df = cc.get_df()
+    # cc.info()
+    df["rating"] = df["rating"].astype(int)
+    print(df)
+
+
+if __name__ == '__main__':
+    main()